@@ -4,12 +4,15 @@ Features: Login/Logout, Register Teachers/Students, CRUD for Subjects/Lessons/Qu
 Integrated with your backend at localhost:8001
 """
 
+import os
 import reflex as rx
 import httpx
 from typing import List, Optional
 from pydantic import BaseModel, ConfigDict
 
 API_URL = "https://audio-learning-system.onrender.com"
+# School to log in to when the backend hosts several schools (empty = default school)
+SCHOOL = os.getenv("AUDIO_LEARNING_SCHOOL", "")
 
 # ===================== MODELS =====================
 class Subject(BaseModel):
@@ -83,6 +86,11 @@ class State(rx.State):
     quizzes: List[Quiz] = []
     students: List[Student] = []
     
+    # Student directory paging/search
+    student_search: str = ""
+    students_next_cursor: str = ""
+    students_count: int = 0
+    
     # Subject Form
     subj_name: str = ""
     subj_desc: str = ""
@@ -111,7 +119,11 @@ class State(rx.State):
     # ============ HELPER METHODS ============
     
     def get_headers(self):
-        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        if SCHOOL:
+            # Proxies keep catalog copies per X-Tenant, not per token
+            headers["X-Tenant"] = SCHOOL
+        return headers
     
     def set_message(self, msg: str, msg_type: str = "info"):
         self.message = msg
@@ -135,6 +147,7 @@ class State(rx.State):
                         "username": self.login_username,
                         "password": self.login_password
                     },
+                    headers={"X-Tenant": SCHOOL} if SCHOOL else {},
                     timeout=10
                 )
                 
@@ -217,12 +230,24 @@ class State(rx.State):
                 print(f"Error loading subjects: {e}")
     
     async def load_lessons(self):
+        """Load every lesson, page by page (the backend pages /lessons/ by cursor)"""
         async with httpx.AsyncClient() as client:
             try:
-                res = await client.get(f"{API_URL}/lessons/", timeout=10)
-                if res.status_code == 200:
-                    data = res.json()
-                    self.lessons = [Lesson(**item) for item in data]
+                lessons = []
+                cursor = ""
+                while True:
+                    # Summary mode - the list only shows a short preview of the content
+                    params = {"summary": "true", "limit": 500}
+                    if cursor:
+                        params["cursor"] = cursor
+                    res = await client.get(f"{API_URL}/lessons/", params=params, timeout=10)
+                    if res.status_code != 200:
+                        return
+                    lessons += [Lesson(**item) for item in res.json()]
+                    cursor = res.headers.get("X-Next-Cursor", "")
+                    if not cursor:
+                        break
+                self.lessons = lessons
             except Exception as e:
                 print(f"Error loading lessons: {e}")
     
@@ -236,25 +261,43 @@ class State(rx.State):
             except Exception as e:
                 print(f"Error loading quizzes: {e}")
     
-    async def load_students(self):
+    async def load_students(self, more: bool = False):
+        """Load one page of students (the backend pages /auth/users)"""
+        params = {"role": "student", "limit": 100}
+        if self.student_search:
+            params["q"] = self.student_search
+        if more and self.students_next_cursor:
+            params["cursor"] = self.students_next_cursor
+        
         async with httpx.AsyncClient() as client:
             try:
                 res = await client.get(
-                    f"{API_URL}/auth/users?role=student",
+                    f"{API_URL}/auth/users",
+                    params=params,
                     headers=self.get_headers(),
                     timeout=10
                 )
                 if res.status_code == 200:
                     data = res.json()
-                    self.students = [Student(**item) for item in data]
+                    page = [Student(**item) for item in data]
+                    self.students = self.students + page if more else page
+                    self.students_next_cursor = res.headers.get("X-Next-Cursor", "")
+                    self.students_count = int(res.headers.get("X-Total-Count", len(self.students)))
+                    self.total_students = self.students_count
             except Exception as e:
                 print(f"Error loading students: {e}")
     
+    async def load_more_students(self):
+        await self.load_students(more=True)
+    
+    async def search_students(self):
+        await self.load_students()
+    
     def update_stats(self):
         self.total_subjects = len(self.subjects)
         self.total_lessons = len(self.lessons)
         self.total_quizzes = len(self.quizzes)
-        self.total_students = len(self.students)
+        self.total_students = self.students_count
 
     # ============ CREATE OPERATIONS ============
     
@@ -888,6 +931,18 @@ def students_tab():
         
         rx.divider(),
         
+        # Search
+        rx.hstack(
+            rx.input(
+                placeholder="Search by name, username or email",
+                on_change=State.set_student_search,
+                value=State.student_search,
+                width="100%"
+            ),
+            rx.button("Search", on_click=State.search_students, color_scheme="purple"),
+            width="100%"
+        ),
+        
         # Students List
         rx.cond(
             State.students.length() > 0,
@@ -916,6 +971,11 @@ def students_tab():
             rx.text("No students registered", color="gray")
         ),
         
+        rx.cond(
+            State.students_next_cursor != "",
+            rx.button("Load more", on_click=State.load_more_students, variant="outline", width="100%")
+        ),
+        
         spacing="4",
         width="100%"
     )
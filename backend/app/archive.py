@@ -0,0 +1,224 @@
+# archive.py - Hot/cold archival of StudentProgress
+# Rows older than PROGRESS_HOT_DAYS are moved out of student_progress into
+# student_progress_archive (zlib-compressed JSON, one blob per student per run)
+# and added to the running totals in student_progress_summary.
+# Reports read the summary plus the hot rows, so they stay small no matter
+# how many school years of history a student has.
+# student_progress_archived_lessons keeps what the summary counts for each
+# lesson: a retaken lesson (new hot row) is counted once, by its hot row, and
+# archiving it again replaces the old contribution instead of adding to it.
+#
+# Command line (run from the backend folder):
+#   python -m app.archive                  archive everything past the horizon (every school)
+#   python -m app.archive show <student>   print a student's archived rows (main database)
+import asyncio
+import json
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import StudentProgress, ProgressArchive, ProgressSummary, ArchivedLesson
+from .tenancy import shard_registry
+
+# Rows older than this many days are archived (one school year by default)
+PROGRESS_HOT_DAYS = int(os.getenv("PROGRESS_HOT_DAYS", "365"))
+# Rows moved per transaction, keeps the write lock short
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+# Scheduled archival, 0 turns the scheduler off
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "0"))
+
+
+def is_completed(progress) -> bool:
+    """
+    A row counts as completed once a quiz result was saved for it
+    (start-lesson creates rows with total_questions = 0)
+    """
+    return progress.total_questions > 0
+
+
+def progress_to_dict(progress: StudentProgress) -> dict:
+    return {
+        "id": progress.id,
+        "lesson_id": progress.lesson_id,
+        "score": progress.score,
+        "total_questions": progress.total_questions,
+        "percentage": progress.percentage,
+        "completed_at": progress.completed_at.isoformat() if progress.completed_at else None,
+    }
+
+
+def archive_student_rows(db: Session, student_id: int, rows: list) -> int:
+    """
+    Compress rows into one archive blob, add them to the summary and delete them
+    Returns the size of the compressed blob
+    """
+    data = zlib.compress(json.dumps([progress_to_dict(p) for p in rows]).encode(), 9)
+    times = [p.completed_at for p in rows if p.completed_at is not None]
+    db.add(ProgressArchive(
+        student_id=student_id,
+        row_count=len(rows),
+        oldest_at=min(times) if times else None,
+        newest_at=max(times) if times else None,
+        data=data
+    ))
+
+    summary = db.get(ProgressSummary, student_id)
+    if summary is None:
+        summary = ProgressSummary(student_id=student_id, lessons_started=0,
+                                  lessons_completed=0, percentage_sum=0)
+        db.add(summary)
+    # Lessons archived before: their old contribution is replaced, not added to
+    archived = {
+        lesson.lesson_id: lesson for lesson in db.query(ArchivedLesson).filter(
+            ArchivedLesson.student_id == student_id,
+            ArchivedLesson.lesson_id.in_([p.lesson_id for p in rows])
+        )
+    }
+    for progress in rows:
+        lesson = archived.get(progress.lesson_id)
+        if lesson is None:
+            lesson = ArchivedLesson(student_id=student_id, lesson_id=progress.lesson_id)
+            db.add(lesson)
+            summary.lessons_started += 1
+        elif lesson.completed:
+            summary.lessons_completed -= 1
+            summary.percentage_sum -= lesson.percentage
+        lesson.completed = is_completed(progress)
+        lesson.percentage = progress.percentage or 0
+        if lesson.completed:
+            summary.lessons_completed += 1
+            summary.percentage_sum += lesson.percentage
+    if times and (summary.last_completed_at is None or max(times) > summary.last_completed_at):
+        summary.last_completed_at = max(times)
+
+    db.query(StudentProgress).filter(
+        StudentProgress.id.in_([p.id for p in rows])
+    ).delete(synchronize_session=False)
+    return len(data)
+
+
+def archive_progress(db: Session = None, horizon_days: int = None, batch_size: int = None) -> dict:
+    """
+    Move every progress row older than the horizon to the cold archive
+    Each batch is its own transaction, so the job can be stopped and re-run safely
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    horizon_days = PROGRESS_HOT_DAYS if horizon_days is None else horizon_days
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=horizon_days)
+    result = {"archived_rows": 0, "archive_bytes": 0, "batches": 0}
+
+    try:
+        while True:
+            rows = db.query(StudentProgress).filter(
+                StudentProgress.completed_at < cutoff
+            ).order_by(StudentProgress.completed_at).limit(batch_size).all()
+            if not rows:
+                break
+
+            by_student = {}
+            for progress in rows:
+                by_student.setdefault(progress.student_id, []).append(progress)
+            for student_id, student_rows in by_student.items():
+                result["archive_bytes"] += archive_student_rows(db, student_id, student_rows)
+            db.commit()
+            db.expunge_all()
+
+            result["archived_rows"] += len(rows)
+            result["batches"] += 1
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+    return result
+
+
+def retaken_totals(db: Session, student_id: int = None) -> dict:
+    """
+    student_id -> (started, completed, percentage_sum) of the archived lessons
+    that also have a hot row - reports subtract these from the summary, so a
+    retaken lesson only counts once (with its newer result)
+    """
+    completed = case((ArchivedLesson.completed == True, 1), else_=0)
+    query = db.query(
+        ArchivedLesson.student_id,
+        func.count(ArchivedLesson.lesson_id),
+        func.coalesce(func.sum(completed), 0),
+        func.coalesce(func.sum(completed * ArchivedLesson.percentage), 0)
+    ).join(StudentProgress, and_(
+        StudentProgress.student_id == ArchivedLesson.student_id,
+        StudentProgress.lesson_id == ArchivedLesson.lesson_id
+    )).group_by(ArchivedLesson.student_id)
+    if student_id is not None:
+        query = query.filter(ArchivedLesson.student_id == student_id)
+    return {row[0]: tuple(row[1:]) for row in query}
+
+
+def load_archived_progress(db: Session, student_id: int) -> list:
+    """
+    Decompress every archived row of a student, oldest archive first
+    """
+    archives = db.query(ProgressArchive).filter(
+        ProgressArchive.student_id == student_id
+    ).order_by(ProgressArchive.id).all()
+    rows = []
+    for archive in archives:
+        rows.extend(json.loads(zlib.decompress(archive.data)))
+    return rows
+
+
+def archive_all_schools() -> dict:
+    """
+    Run archive_progress on the main database and every school database
+    """
+    results = {}
+    for tenant in shard_registry.tenants():
+        with shard_registry.lease(tenant) as shard:
+            db = shard.SessionLocal()
+            try:
+                results[tenant] = archive_progress(db)
+            finally:
+                db.close()
+    return results
+
+
+async def archive_loop():
+    """
+    Background task started from the lifespan hook when ARCHIVE_INTERVAL_HOURS > 0
+    """
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+        try:
+            await asyncio.to_thread(archive_all_schools)
+        except Exception as e:
+            print(f"Progress archival failed: {e}")
+
+
+def main(argv):
+    if argv[:1] == ["show"] and len(argv) == 2:
+        db = SessionLocal()
+        try:
+            for row in load_archived_progress(db, int(argv[1])):
+                print(json.dumps(row))
+        finally:
+            db.close()
+    elif not argv:
+        for tenant, result in archive_all_schools().items():
+            print(f"{tenant}: archived {result['archived_rows']} rows in {result['batches']} batches "
+                  f"({result['archive_bytes']} bytes compressed)")
+    else:
+        print("Usage: python -m app.archive [show <student_id>]")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,15 @@
 # auth.py - Core authentication utilities
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from .database import get_db
 from .models import User
+from .cache import TTLCache
+from .tenancy import DEFAULT_TENANT
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,30 +20,88 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours (matches routes_auth.py)
 
 # Password hashing context - we use bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib and python-jose are imported on first use to keep startup fast
+_pwd_context = None
+
+
+def get_pwd_context():
+    """
+    Build the bcrypt CryptContext the first time it is needed
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 # OAuth2 scheme - for getting token from request
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Cache for get_current_user - saves a database query on every authenticated request
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096"))
+
+# token -> (username, tenant) from the decoded claims, never kept past the token's "exp"
+token_cache = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+# (tenant, username) -> CachedUser snapshot
+user_cache = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+
+class CachedUser:
+    """
+    Slim copy of a User row that is safe to keep between requests
+    (not attached to any database session)
+    """
+    __slots__ = ("id", "username", "email", "first_name", "surname", "role", "created_at", "tenant")
+
+    def __init__(self, user: User, tenant: str = DEFAULT_TENANT):
+        self.tenant = tenant
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.first_name = user.first_name
+        self.surname = user.surname
+        self.role = user.role
+        self.created_at = user.created_at
+
+
+def invalidate_user(username: str, tenant: str = DEFAULT_TENANT):
+    """
+    Drop a cached user - call this after changing or deleting a user
+    """
+    user_cache.pop((tenant, username))
+
+
+def get_auth_cache_stats() -> dict:
+    """
+    Hit/miss counters for the token and user caches
+    """
+    return {
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats(),
+    }
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Check if plain password matches the hashed password
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
     Hash a password using bcrypt
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Create JWT access token
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -53,34 +112,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def decode_token(token: str):
+    """
+    (username, tenant) from a valid token, None if it is invalid or expired
+    Tokens issued before schools had their own databases belong to the default school
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
+    claims = (username, payload.get("tenant") or DEFAULT_TENANT)
+    expires_in = payload.get("exp", 0) - time.time()
+    token_cache.set(token, claims, ttl=expires_in)
+    return claims
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Get current user from JWT token
     This function will verify the token and return the user
+    get_db already picked the database of the token's school
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    claims = decode_token(token)
+    if claims is None:
         raise credentials_exception
-    
+    username, tenant = claims
+
+    cached_user = user_cache.get((tenant, username))
+    if cached_user is not None:
+        return cached_user
+
     user = db.query(User).filter(User.username == username).first()
     if user is None:
         raise credentials_exception
-    return user
+    cached_user = CachedUser(user, tenant)
+    user_cache.set((tenant, username), cached_user)
+    return cached_user
 
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """
     Check if current user is active
     """
-    if not current_user.is_active:
+    # User has no is_active column yet - treat everyone as active
+    if not getattr(current_user, "is_active", True):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
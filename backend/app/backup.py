@@ -0,0 +1,253 @@
+# backup.py - Online snapshots of the SQLite database
+# Copying audio_learning.db while the API runs can catch it half-written.
+# This uses SQLite's online backup API instead: pages are copied in small
+# steps from a single read snapshot, so writers are never blocked (WAL)
+# and each step only holds the GIL/disk for a moment.
+#
+# Command line (run from the backend folder):
+#   python -m app.backup snapshot          snapshot every database (main + schools) now
+#   python -m app.backup list              list snapshots, newest first
+#   python -m app.backup restore <file> [school]
+#                                          copy a snapshot back (stop the API first!)
+#
+# Snapshots are plain SQLite files and open anywhere, but the lessons table has
+# search triggers that call lesson_text(), a function only this app registers
+# (compression.register_sqlite_functions). Change lessons in a snapshot or a
+# restored database through the app or a script that registers it - the
+# sqlite3 shell can read lessons but not write them.
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from .compression import register_sqlite_functions
+from .database import SQLALCHEMY_DATABASE_URL, is_sqlite
+from .tenancy import shard_registry, tenant_path
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+# Scheduled snapshots, 0 turns the scheduler off
+BACKUP_INTERVAL_MINUTES = float(os.getenv("BACKUP_INTERVAL_MINUTES", "0"))
+# How many snapshots to keep (oldest are deleted first)
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+# Pages copied per step and the pause between steps
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+BACKUP_STEP_SLEEP_MS = float(os.getenv("BACKUP_STEP_SLEEP_MS", "5"))
+
+SNAPSHOT_SUFFIX = ".db"
+
+# Result of the last snapshot, shown on /health
+backup_status = {
+    "last_snapshot": None,
+    "last_duration_ms": None,
+    "last_bytes": None,
+    "last_error": None,
+    "snapshots": 0,
+}
+
+
+class BackupError(Exception):
+    """
+    Raised when a snapshot or restore cannot be done
+    """
+
+
+def database_path(url: str = None) -> str:
+    """
+    File path of the SQLite database behind DATABASE_URL
+    """
+    url = make_url(url or SQLALCHEMY_DATABASE_URL)
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:"):
+        raise BackupError("Backups are only supported for file-based SQLite databases")
+    return url.database
+
+
+def snapshot_name(db_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    return f"{stem}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}{SNAPSHOT_SUFFIX}"
+
+
+def copy_database(source_path: str, target_path: str,
+                  pages: int = BACKUP_PAGES_PER_STEP, sleep_ms: float = BACKUP_STEP_SLEEP_MS) -> int:
+    """
+    Copy source into target with the backup API, a few pages at a time
+    The source read transaction is held for the whole copy, so every step
+    reads the same snapshot and writes from other connections never make
+    the copy start over
+    Returns the number of pages copied
+    """
+    source = sqlite3.connect(source_path, isolation_level=None)
+    target = sqlite3.connect(target_path, isolation_level=None)
+    for conn in (source, target):
+        register_sqlite_functions(conn)
+    copied = {"pages": 0}
+
+    def progress(status, remaining, total):
+        copied["pages"] = total
+
+    try:
+        source.execute("PRAGMA busy_timeout=5000")
+        source.execute("BEGIN")
+        source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=progress, sleep=sleep_ms / 1000)
+        source.execute("COMMIT")
+    finally:
+        target.close()
+        source.close()
+    return copied["pages"]
+
+
+def check_integrity(path: str):
+    conn = sqlite3.connect(path)
+    register_sqlite_functions(conn)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise BackupError(f"{path} failed integrity check: {result}")
+
+
+def create_snapshot(backup_dir: str = None, db_path: str = None) -> dict:
+    """
+    Take a consistent snapshot of the live database into backup_dir
+    The copy is written to a .tmp file and renamed when complete, so a
+    crash never leaves a half-written snapshot that looks valid
+    """
+    db_path = db_path or database_path()
+    backup_dir = backup_dir or BACKUP_DIR
+    os.makedirs(backup_dir, exist_ok=True)
+
+    final_path = os.path.join(backup_dir, snapshot_name(db_path))
+    temp_path = final_path + ".tmp"
+    started = time.perf_counter()
+    try:
+        pages = copy_database(db_path, temp_path)
+        check_integrity(temp_path)
+        os.replace(temp_path, final_path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        backup_status["last_error"] = str(e)
+        raise
+
+    result = {
+        "path": final_path,
+        "pages": pages,
+        "bytes": os.path.getsize(final_path),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    backup_status.update(
+        last_snapshot=final_path,
+        last_duration_ms=result["duration_ms"],
+        last_bytes=result["bytes"],
+        last_error=None,
+    )
+    backup_status["snapshots"] += 1
+    return result
+
+
+def list_snapshots(backup_dir: str = None, db_path: str = None) -> list:
+    """
+    Snapshot file paths, newest first (only those of db_path if given)
+    """
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = os.path.splitext(os.path.basename(db_path))[0] + "-" if db_path else ""
+    paths = [
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        if name.endswith(SNAPSHOT_SUFFIX) and name.startswith(prefix)
+    ]
+    # Names embed the UTC timestamp, so they sort by age
+    return sorted(paths, reverse=True)
+
+
+def prune_snapshots(keep: int = None, backup_dir: str = None, db_path: str = None) -> list:
+    """
+    Delete all but the newest `keep` snapshots (of db_path if given), returns the deleted paths
+    """
+    keep = BACKUP_KEEP if keep is None else keep
+    old = list_snapshots(backup_dir, db_path)[max(0, keep):]
+    for path in old:
+        os.remove(path)
+    return old
+
+
+def restore_snapshot(snapshot_path: str, db_path: str = None) -> dict:
+    """
+    Copy a snapshot back over the live database
+    Stop the API first - the in-process auth and catalog caches
+    would otherwise keep serving the old data
+    """
+    if not os.path.exists(snapshot_path):
+        raise BackupError(f"Snapshot {snapshot_path} does not exist")
+    check_integrity(snapshot_path)
+
+    db_path = db_path or database_path()
+    started = time.perf_counter()
+    # Whole copy in one step - restore must not interleave with other writers
+    pages = copy_database(snapshot_path, db_path, pages=-1, sleep_ms=0)
+    return {
+        "path": db_path,
+        "pages": pages,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def all_database_paths() -> list:
+    """
+    The main database plus every school database (see tenancy.py)
+    """
+    return [database_path()] + [tenant_path(tenant) for tenant in shard_registry.tenants()[1:]]
+
+
+def snapshot_all() -> list:
+    """
+    Snapshot and prune every database, one after the other
+    """
+    results = []
+    for db_path in all_database_paths():
+        results.append(create_snapshot(db_path=db_path))
+        prune_snapshots(db_path=db_path)
+    return results
+
+
+async def backup_loop():
+    """
+    Background task started from the lifespan hook when BACKUP_INTERVAL_MINUTES > 0
+    """
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL_MINUTES * 60)
+        try:
+            await asyncio.to_thread(snapshot_all)
+        except Exception as e:
+            backup_status["last_error"] = str(e)
+            print(f"Scheduled backup failed: {e}")
+
+
+def main(argv):
+    if not is_sqlite:
+        print("Backups are only supported for SQLite")
+        return 1
+    command = argv[0] if argv else "snapshot"
+    if command == "snapshot":
+        for result in snapshot_all():
+            print(f"Snapshot {result['path']}: {result['bytes']} bytes in {result['duration_ms']} ms")
+    elif command == "list":
+        for path in list_snapshots():
+            print(f"{path}  {os.path.getsize(path)} bytes")
+    elif command == "restore" and len(argv) in (2, 3):
+        result = restore_snapshot(argv[1], tenant_path(argv[2]) if len(argv) == 3 else None)
+        print(f"Restored {argv[1]} into {result['path']} in {result['duration_ms']} ms")
+    else:
+        print("Usage: python -m app.backup [snapshot | list | restore <file> [school]]")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
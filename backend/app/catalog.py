@@ -0,0 +1,235 @@
+# catalog.py - Catalog version, ETags, conditional GET and the response cache
+# for subjects, lessons and quizzes
+# Every create/update/delete in the catalog routers calls bump_catalog_version(db)
+# before committing. GET routes add the catalog_cache_headers dependency, which
+# answers If-None-Match / If-Modified-Since with 304 straight from the cached
+# version - no database query on a cache hit. Full responses are built once
+# per version by catalog_response() and served from memory after that, along
+# with a gzip copy for clients that send Accept-Encoding: gzip.
+# Voice lookups by subject name go through subject_names, a per-version map.
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import HTTPException, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from .cache import ResponseCache
+from .compression import accepts_gzip, gzip_body
+from .models import CatalogVersion, Lesson, Subject, subject_name_key
+from .tenancy import DEFAULT_TENANT, TENANT_HEADER, Shard, get_shard
+
+# How long a worker trusts its cached version before re-reading it
+# (other worker processes' changes show up after at most this long)
+CATALOG_VERSION_TTL_SECONDS = float(os.getenv("CATALOG_VERSION_TTL_SECONDS", "1"))
+# Shared caches (reverse proxy) may serve a response this long without asking us
+CATALOG_PROXY_MAX_AGE_SECONDS = int(os.getenv("CATALOG_PROXY_MAX_AGE_SECONDS", "10"))
+
+# Serialized catalog responses kept in memory (per worker)
+CATALOG_CACHE_MAX_BYTES = int(os.getenv("CATALOG_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CATALOG_CACHE_MAX_ENTRY_BYTES = int(os.getenv("CATALOG_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+
+# Browsers and apps always revalidate (cheap 304), proxies may hold it briefly
+CATALOG_CACHE_CONTROL = f"public, max-age=0, s-maxage={CATALOG_PROXY_MAX_AGE_SECONDS}, must-revalidate"
+# Proxies key copies on the X-Tenant header only, so a request whose school came
+# from the token (header missing or naming another school) must not be stored
+CATALOG_PRIVATE_CACHE_CONTROL = "private, max-age=0, must-revalidate"
+# The gzip copy of a response gets its own ETag (like Apache's mod_deflate)
+GZIP_ETAG_SUFFIX = "-gzip"
+EPOCH = datetime(1970, 1, 1)
+
+
+class CatalogVersionCache:
+    """
+    Per-school (version, updated_at), refreshed from the database at most
+    once every ttl_seconds, dropped right after a local bump commits
+    """
+
+    def __init__(self, ttl_seconds: float = 1):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, shard: Shard):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(shard.tenant)
+        if entry is not None and now - entry[2] < self.ttl_seconds:
+            return entry[0], entry[1]
+
+        db = shard.ReadSessionLocal()
+        try:
+            row = db.get(CatalogVersion, 1)
+            version, updated_at = (row.version, row.updated_at or EPOCH) if row else (0, EPOCH)
+        finally:
+            db.close()
+        with self._lock:
+            self._entries[shard.tenant] = (version, updated_at, now)
+        return version, updated_at
+
+    def forget(self, tenant: str):
+        with self._lock:
+            self._entries.pop(tenant, None)
+
+
+class SubjectNameIndex:
+    """
+    Per-school map of normalized subject name -> (subject id, first lesson id)
+    over the live subjects, built with one query once per catalog version
+    A lookup is one dict probe; None for the lesson means the subject has none
+    """
+
+    def __init__(self):
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, tenant: str, version: int, name: str):
+        with self._lock:
+            entry = self._maps.get(tenant)
+        if entry is None or entry[0] != version:
+            entry = (version, self._build(db))
+            with self._lock:
+                self._maps[tenant] = entry
+        return entry[1].get(subject_name_key(name))
+
+    @staticmethod
+    def _build(db: Session) -> dict:
+        first_lesson = select(Lesson.id).where(
+            Lesson.topic_id == Subject.id
+        ).order_by(Lesson.order, Lesson.id).limit(1).correlate(Subject).scalar_subquery()
+        rows = db.query(Subject.name_key, Subject.id, first_lesson).filter(
+            Subject.is_deleted == False,
+            Subject.name_key.isnot(None)
+        ).all()
+        return {name_key: (subject_id, lesson_id) for name_key, subject_id, lesson_id in rows}
+
+    def forget(self, tenant: str):
+        with self._lock:
+            self._maps.pop(tenant, None)
+
+
+catalog_versions = CatalogVersionCache(ttl_seconds=CATALOG_VERSION_TTL_SECONDS)
+response_cache = ResponseCache(max_bytes=CATALOG_CACHE_MAX_BYTES, max_entry_bytes=CATALOG_CACHE_MAX_ENTRY_BYTES)
+subject_names = SubjectNameIndex()
+
+
+def forget_catalog(tenant: str):
+    """
+    Drop the cached version, responses and name map of a school (after its catalog changed)
+    """
+    catalog_versions.forget(tenant)
+    response_cache.invalidate(tenant)
+    subject_names.forget(tenant)
+
+
+def bump_catalog_version(db: Session):
+    """
+    Call before db.commit() in any route that changes subjects, lessons or quizzes
+    The bump is part of the same transaction, so it only counts if the change does
+    """
+    db.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    tenant = db.info.get("tenant", DEFAULT_TENANT)
+    event.listen(db, "after_commit", lambda session: forget_catalog(tenant), once=True)
+
+
+def gzip_etag(etag: str) -> str:
+    return etag[:-1] + GZIP_ETAG_SUFFIX + '"'
+
+
+def matching_etag(if_none_match: str, etag: str):
+    """
+    The ETag of the client's copy if If-None-Match holds the current version, else None
+    Either encoding of the same version is still current
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in (etag, "*"):
+            return etag
+        if candidate == gzip_etag(etag):
+            return candidate
+    return None
+
+
+def not_modified_since(if_modified_since: str, updated_at: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    return updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def catalog_cache_headers(request: Request, response: Response) -> dict:
+    """
+    Dependency for catalog GET routes - sets ETag, Last-Modified and
+    Cache-Control, or stops the request with 304 if the client's copy is current
+    Routes that return their own Response must copy the returned headers onto it
+    """
+    shard = get_shard(request)
+    version, updated_at = catalog_versions.get(shard)
+    # No header means the default school, the same as for a request without a token
+    header_tenant = (request.headers.get(TENANT_HEADER) or DEFAULT_TENANT).lower()
+    headers = {
+        "ETag": f'"{shard.tenant}-{version}"',
+        "Last-Modified": format_datetime(updated_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True),
+        "Cache-Control": CATALOG_CACHE_CONTROL if header_tenant == shard.tenant else CATALOG_PRIVATE_CACHE_CONTROL,
+        # Not Authorization: every user of a school shares the proxy's copy
+        "Vary": f"{TENANT_HEADER}, Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    etag = headers["ETag"]
+    if if_none_match is not None:
+        matched = matching_etag(if_none_match, etag)
+        fresh = matched is not None
+        # A gzip client revalidating its gzip copy gets that copy's ETag back
+        if fresh and accepts_gzip(request):
+            etag = matched
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and not_modified_since(if_modified_since, updated_at)
+    if fresh:
+        raise HTTPException(status_code=304, headers={**headers, "ETag": etag})
+
+    response.headers.update(headers)
+    return headers
+
+
+def catalog_response(request: Request, cache_headers: dict, build, adapter: TypeAdapter = None) -> Response:
+    """
+    Serve a catalog GET from the response cache, building it on a miss
+    build() returns (data, extra_headers); data goes through adapter (the
+    route's response model) when given, so ORM rows serialize exactly as before
+    The key holds the ETag, so a version bump makes old entries unreachable
+    The gzip copy is made once with the entry and sent as-is to clients that accept it
+    """
+    key = (request.state.tenant, cache_headers["ETag"], request.url.path, request.url.query)
+
+    def build_body():
+        data, extra_headers = build()
+        if adapter is not None:
+            body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        else:
+            body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+        return body, extra_headers, gzip_body(body)
+
+    body, extra_headers, gzipped = response_cache.get_or_build(key, build_body)
+    headers = {**cache_headers, **extra_headers}
+    if gzipped is not None and accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = gzip_etag(cache_headers["ETag"])
+        body = gzipped
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,93 @@
+# compression.py - Compressed lesson storage and gzip for API responses
+# Long lesson bodies are stored zlib-compressed in the lessons.content column
+# (SQLite keeps the BLOB as-is in a TEXT column). Short ones stay plain text,
+# and plain rows written before compression still read back unchanged.
+# Responses are gzipped when the client sends Accept-Encoding: gzip - catalog
+# responses once per catalog version (see catalog.py), the rest by GZipMiddleware.
+# SQL code that needs the text (the full-text index triggers, see search.py)
+# reads it through the lesson_text() function registered on every connection.
+# It is a Python function, so only connections that call
+# register_sqlite_functions() have it: make_engine and run_migrations do, and
+# so must any script or tool that inserts, updates or deletes lessons. Other
+# clients (the sqlite3 shell, DB browsers) can read everything, but a write
+# to lessons fails there with "no such function: lesson_text".
+import gzip
+import os
+import zlib
+
+from fastapi import Request
+from sqlalchemy.types import Text, TypeDecorator
+
+# Lesson bodies shorter than this are stored uncompressed (not worth the CPU)
+LESSON_COMPRESS_MIN_BYTES = int(os.getenv("LESSON_COMPRESS_MIN_BYTES", "512"))
+LESSON_COMPRESS_LEVEL = int(os.getenv("LESSON_COMPRESS_LEVEL", "6"))
+# Responses smaller than this are sent as they are
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+# Per-request compression (GZipMiddleware) - cheaper level, runs on every response
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+# Cached catalog responses are compressed once per catalog version (on the
+# request that missed), so they get a stronger level
+CATALOG_GZIP_LEVEL = int(os.getenv("CATALOG_GZIP_LEVEL", "6"))
+
+
+def compress_text(value: str, level: int = None):
+    """
+    zlib bytes for long text, the text itself for short text
+    """
+    data = value.encode()
+    if len(data) < LESSON_COMPRESS_MIN_BYTES:
+        return value
+    return zlib.compress(data, LESSON_COMPRESS_LEVEL if level is None else level)
+
+
+def decompress_text(value) -> str:
+    if isinstance(value, (bytes, memoryview)):
+        return zlib.decompress(value).decode()
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored zlib-compressed on SQLite
+    Other databases get plain text, so the column type never changes
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+
+def register_sqlite_functions(dbapi_connection):
+    """
+    lesson_text(content) - the plain text of a lessons.content value, for SQL
+    """
+    dbapi_connection.create_function("lesson_text", 1, decompress_text, deterministic=True)
+
+
+def accepts_gzip(request: Request) -> bool:
+    """
+    True if Accept-Encoding allows gzip (and does not set q=0 for it)
+    """
+    for coding in request.headers.get("accept-encoding", "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def gzip_body(body: bytes, level: int = None):
+    """
+    gzip a response body, or None when it is too small to bother
+    """
+    if len(body) < GZIP_MIN_BYTES:
+        return None
+    # mtime=0 keeps the bytes identical for identical bodies
+    return gzip.compress(body, CATALOG_GZIP_LEVEL if level is None else level, mtime=0)
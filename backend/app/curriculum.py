@@ -0,0 +1,487 @@
+# curriculum.py - Bulk import of whole courses (subject -> lessons -> quizzes)
+# The upload is parsed while it streams in, one subject at a time. Each
+# validated subject is spooled to a temp file, so memory stays flat however
+# big the curriculum is, and nothing touches the database until the upload
+# is complete. Then existing parent subjects are checked with one query and
+# everything is written with bulk INSERT ... RETURNING in one transaction.
+#
+# JSON: an array of subjects, or one subject per line (NDJSON)
+#   [{"name": "Science", "description": "...", "lessons": [
+#       {"title": "Plants", "content": "...", "duration": "15 min", "order": 1,
+#        "quizzes": [{"question": "...", "option_a": "...", "option_b": "...",
+#                     "option_c": "...", "option_d": "...", "correct_answer": "A"}]}]}]
+#   A subject with "id" instead of "name" adds its lessons to an existing subject,
+#   and so does a "name" that a live subject already has (case and spacing ignored)
+# CSV: one row per quiz (or per lesson without quizzes), rows of the same
+#   subject and lesson next to each other. Columns:
+#   subject, subject_id, subject_description, lesson, content, duration, order,
+#   question, option_a, option_b, option_c, option_d, correct_answer
+import codecs
+import csv
+import json
+import os
+import re
+import tempfile
+
+from pydantic import ValidationError
+from sqlalchemy import and_, func, insert, or_
+from sqlalchemy.orm import Session
+
+from .catalog import bump_catalog_version
+from .models import Subject, Lesson, Quiz, subject_name_key
+from .schemas import CurriculumSubject, CurriculumLesson, CurriculumQuiz
+from .segments import lesson_segments
+
+# Largest import accepted in one request (subjects + lessons + quizzes)
+CURRICULUM_IMPORT_MAX_ITEMS = int(os.getenv("CURRICULUM_IMPORT_MAX_ITEMS", "100000"))
+# A single JSON subject (with its lessons) larger than this is rejected
+CURRICULUM_MAX_SUBJECT_BYTES = int(os.getenv("CURRICULUM_MAX_SUBJECT_BYTES", str(16 * 1024 * 1024)))
+# Subjects written per bulk INSERT round
+CURRICULUM_IMPORT_BATCH = int(os.getenv("CURRICULUM_IMPORT_BATCH", "200"))
+# Validated subjects are kept in memory up to this size, then spill to disk
+CURRICULUM_SPOOL_BYTES = 8 * 1024 * 1024
+
+CSV_SUBJECT_FIELDS = ("subject_id", "subject", "subject_description")
+QUIZ_FIELDS = ("question", "option_a", "option_b", "option_c", "option_d", "correct_answer")
+
+
+class CurriculumTooLarge(Exception):
+    """
+    Raised when an import has more than CURRICULUM_IMPORT_MAX_ITEMS items
+    """
+
+
+# Text the bracket scan skips in one step: anything but brackets and quotes, and whole strings
+SCAN_FILLER = re.compile(r'(?:[^{}\[\]"]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+# The rest of a string the chunk cut off, up to (not including) its closing quote
+SCAN_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*')
+
+
+class JSONSubjectStream:
+    """
+    Incremental parser for a JSON array (or NDJSON) of subject objects
+    feed() returns the subjects completed by that chunk
+    """
+
+    WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.buffer = ""
+        self.started = False
+        self.bracketed = False
+        self.finished = False
+        self.decoder = json.JSONDecoder()
+        # Bracket scan of the value at the start of the buffer, resumed on every
+        # chunk, so a subject is decoded once - when its closing bracket arrives
+        self.scan_pos = 0
+        self.depth = 0
+        self.in_string = False
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        subjects = []
+        while True:
+            subject = self._next()
+            if subject is None:
+                break
+            subjects.append(subject)
+        if len(self.buffer) > CURRICULUM_MAX_SUBJECT_BYTES:
+            raise ValueError("subject is too large or the JSON is invalid")
+        return subjects
+
+    def close(self) -> list:
+        subjects = self.feed("")
+        if self.buffer.strip(self.WHITESPACE):
+            # Whatever is left could not be decoded - report the decoder's error
+            self.decoder.raw_decode(self.buffer.lstrip(self.WHITESPACE + ","))
+        if self.bracketed and not self.finished:
+            raise ValueError("JSON array is not closed")
+        return subjects
+
+    def _skip(self, pos: int, separators: str) -> int:
+        while pos < len(self.buffer) and self.buffer[pos] in separators:
+            pos += 1
+        return pos
+
+    def _next(self):
+        pos = self._skip(0, self.WHITESPACE)
+        if pos == len(self.buffer):
+            return None
+        if self.finished:
+            raise ValueError("unexpected data after the JSON array")
+        if not self.started:
+            self.started = True
+            self.bracketed = self.buffer[pos] == "["
+            if self.bracketed:
+                pos += 1
+        pos = self._skip(pos, self.WHITESPACE + ",")
+        if pos < len(self.buffer) and self.buffer[pos] == "]" and self.bracketed:
+            self.finished = True
+            self.buffer = self.buffer[pos + 1:]
+            return None
+        if pos < len(self.buffer) and self.buffer[pos] in "{[":
+            if not self._value_complete(pos):
+                # Cut off mid-subject - keep the scan state, wait for the next chunk
+                self.buffer = self.buffer[pos:]
+                self.scan_pos -= pos
+                return None
+            # Brackets balance, so a decode error here is invalid JSON
+            subject, end = self.decoder.raw_decode(self.buffer, pos)
+        else:
+            try:
+                subject, end = self.decoder.raw_decode(self.buffer, pos)
+            except json.JSONDecodeError:
+                # Not an object - may be cut off too, the next chunk decides
+                self.buffer = self.buffer[pos:]
+                return None
+        self.buffer = self.buffer[end:]
+        self.scan_pos = 0
+        return subject
+
+    def _value_complete(self, pos: int) -> bool:
+        """
+        Scan the new part of the buffer for the bracket that closes the value at pos
+        Only text that arrived since the last call is looked at
+        """
+        if self.scan_pos <= pos:
+            self.scan_pos, self.depth, self.in_string = pos, 0, False
+        buffer = self.buffer
+        i = self.scan_pos
+        while True:
+            if self.in_string:
+                i = SCAN_STRING_REST.match(buffer, i).end()
+                if i == len(buffer) or buffer[i] == "\\":
+                    # The string (or the escape it ends on) has not fully arrived
+                    self.scan_pos = i
+                    return False
+                self.in_string = False
+                i += 1
+            i = SCAN_FILLER.match(buffer, i).end()
+            if i == len(buffer):
+                self.scan_pos = i
+                return False
+            char = buffer[i]
+            i += 1
+            if char == '"':
+                # A string the chunk cut off
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.scan_pos = i
+                    return True
+
+
+class CSVSubjectStream:
+    """
+    Incremental parser for the flat CSV layout, grouping consecutive rows
+    into nested subject objects (a subject is emitted when the next one starts)
+    """
+
+    def __init__(self):
+        self.pending = ""  # text after the last newline
+        self.record = ""  # lines of a row whose quoted field is still open
+        self.header = None
+        self.row_number = 0
+        self.subject = None
+        self.subject_key = None
+
+    def feed(self, text: str) -> list:
+        lines = (self.pending + text).split("\n")
+        self.pending = lines.pop()
+        subjects = []
+        for line in lines:
+            self._line(line + "\n", subjects)
+        return subjects
+
+    def close(self) -> list:
+        subjects = []
+        if self.pending:
+            self._line(self.pending, subjects)
+            self.pending = ""
+        if self.record:
+            raise ValueError("unterminated quoted field")
+        if self.subject is not None:
+            subjects.append(self.subject)
+            self.subject = None
+        return subjects
+
+    def _line(self, line: str, subjects: list):
+        self.record += line
+        # An odd number of quotes means a quoted field continues on the next line
+        if self.record.count('"') % 2:
+            return
+        record, self.record = self.record, ""
+        fields = next(csv.reader([record]), [])
+        self.row_number += 1
+        if self.header is None:
+            self.header = [name.strip().lower() for name in fields]
+            return
+        if not any(field.strip() for field in fields):
+            return
+        row = {name: value.strip() for name, value in zip(self.header, fields) if value.strip()}
+        self._row(row, f"row {self.row_number}", subjects)
+
+    def _row(self, row: dict, path: str, subjects: list):
+        key = tuple(row.get(name) for name in CSV_SUBJECT_FIELDS[:2])
+        if self.subject is None or key != self.subject_key:
+            if self.subject is not None:
+                subjects.append(self.subject)
+            self.subject_key = key
+            self.subject = {"_path": path, "description": row.get("subject_description", ""), "lessons": []}
+            if row.get("subject_id"):
+                self.subject["id"] = row["subject_id"]
+            if row.get("subject"):
+                self.subject["name"] = row["subject"]
+
+        lessons = self.subject["lessons"]
+        if "lesson" in row and (not lessons or lessons[-1]["title"] != row["lesson"]):
+            lesson = {"_path": path, "title": row["lesson"], "content": row.get("content"), "quizzes": []}
+            for name in ("duration", "order"):
+                if name in row:
+                    lesson[name] = row[name]
+            lessons.append(lesson)
+
+        if "question" in row:
+            if not lessons:
+                raise ValueError(f"{path}: quiz without a lesson")
+            quiz = {name: row[name] for name in QUIZ_FIELDS if name in row}
+            quiz["_path"] = path
+            lessons[-1]["quizzes"].append(quiz)
+
+
+def validation_error(e: ValidationError) -> str:
+    first = e.errors()[0]
+    return f"{'.'.join(str(p) for p in first['loc'])}: {first['msg']}"
+
+
+class CurriculumImport:
+    """
+    One import: feed() the upload chunk by chunk, close(), then save(db)
+    Every subject, lesson and quiz gets an entry in results (in upload order)
+    """
+
+    def __init__(self, is_csv: bool):
+        self.parser = CSVSubjectStream() if is_csv else JSONSubjectStream()
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.spool = tempfile.SpooledTemporaryFile(max_size=CURRICULUM_SPOOL_BYTES, mode="w+")
+        self.results = []
+        self.existing_ids = set()
+        self.name_keys = set()
+        # name_key -> id of the live subject with that name (existing or created here)
+        self.subject_ids = {}
+        self.subjects = 0
+        self.created = 0
+
+    def feed(self, chunk: bytes):
+        for subject in self.parser.feed(self.decoder.decode(chunk)):
+            self._add_subject(subject)
+
+    def close(self):
+        for subject in self.parser.feed(self.decoder.decode(b"", final=True)) + self.parser.close():
+            self._add_subject(subject)
+
+    def _result(self, path: str, kind: str) -> int:
+        if len(self.results) >= CURRICULUM_IMPORT_MAX_ITEMS:
+            raise CurriculumTooLarge(f"Curriculum has more than {CURRICULUM_IMPORT_MAX_ITEMS} items")
+        self.results.append({"path": path, "kind": kind, "status": "error"})
+        return len(self.results) - 1
+
+    def _fail(self, index: int, error: str):
+        self.results[index]["error"] = error
+
+    def _add_subject(self, data):
+        """
+        Validate one subject with its lessons and quizzes and spool the valid parts
+        Invalid items are reported; the children of an invalid item are skipped
+        """
+        path = data.get("_path") if isinstance(data, dict) else None
+        path = path or f"subjects[{self.subjects}]"
+        self.subjects += 1
+        index = self._result(path, "subject")
+        if not isinstance(data, dict):
+            return self._fail(index, "Subject must be an object")
+        try:
+            subject = CurriculumSubject(**{k: v for k, v in data.items() if not k.startswith("_")})
+        except ValidationError as e:
+            return self._fail(index, validation_error(e))
+        if subject.id is None and not subject.name:
+            return self._fail(index, "Subject needs a name (new) or an id (existing)")
+
+        record = {"r": index, "lessons": []}
+        if subject.id is not None:
+            record["id"] = subject.id
+            self.existing_ids.add(subject.id)
+        else:
+            record["name"] = subject.name
+            record["description"] = subject.description or ""
+            self.name_keys.add(subject_name_key(subject.name))
+
+        for position, lesson_data in enumerate(subject.lessons):
+            lesson_path = lesson_data.get("_path") or f"{path}.lessons[{position}]"
+            lesson_index = self._result(lesson_path, "lesson")
+            try:
+                lesson = CurriculumLesson(**{k: v for k, v in lesson_data.items() if not k.startswith("_")})
+            except ValidationError as e:
+                self._fail(lesson_index, validation_error(e))
+                continue
+            lesson_record = {
+                "r": lesson_index,
+                "title": lesson.title,
+                "content": lesson.content,
+                "duration": lesson.duration or "15 min",
+                "order": lesson.order,
+                "position": position,
+                "quizzes": [],
+            }
+            for number, quiz_data in enumerate(lesson.quizzes):
+                quiz_index = self._result(quiz_data.get("_path") or f"{lesson_path}.quizzes[{number}]", "quiz")
+                try:
+                    quiz = CurriculumQuiz(**{k: v for k, v in quiz_data.items() if not k.startswith("_")})
+                except ValidationError as e:
+                    self._fail(quiz_index, validation_error(e))
+                    continue
+                if quiz.correct_answer.upper() not in ["A", "B", "C", "D"]:
+                    self._fail(quiz_index, "Correct answer must be A, B, C, or D")
+                    continue
+                quiz_record = quiz.model_dump()
+                quiz_record["correct_answer"] = quiz.correct_answer.upper()
+                quiz_record["r"] = quiz_index
+                lesson_record["quizzes"].append(quiz_record)
+            record["lessons"].append(lesson_record)
+
+        self.spool.write(json.dumps(record) + "\n")
+
+    def _batches(self):
+        self.spool.seek(0)
+        batch = []
+        for line in self.spool:
+            batch.append(json.loads(line))
+            if len(batch) >= CURRICULUM_IMPORT_BATCH:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _mark(self, index: int, row_id: int, status: str = "created"):
+        result = self.results[index]
+        result["status"] = status
+        result["id"] = row_id
+        if status == "created":
+            self.created += 1
+
+    def save(self, db: Session, teacher_id: int):
+        """
+        Write every valid item in one transaction with bulk inserts
+        """
+        # Existing parents (by id or by name): one query, also gives where their lessons end
+        next_order = {}
+        if self.existing_ids or self.name_keys:
+            for subject_id, name_key, last_order in db.query(
+                Subject.id, Subject.name_key, func.max(Lesson.order)
+            ).outerjoin(
+                Lesson, Lesson.topic_id == Subject.id
+            ).filter(
+                # is_deleted inside the OR too, so each side can use its own index
+                or_(
+                    Subject.id.in_(self.existing_ids),
+                    and_(Subject.name_key.in_(self.name_keys), Subject.is_deleted == False)
+                ),
+                Subject.is_deleted == False
+            ).group_by(Subject.id).all():
+                next_order[subject_id] = last_order + 1 if last_order is not None else 0
+                if name_key in self.name_keys:
+                    self.subject_ids[name_key] = subject_id
+
+        try:
+            for batch in self._batches():
+                self._save_batch(db, batch, teacher_id, next_order)
+            if self.created:
+                bump_catalog_version(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            for result in self.results:
+                if result["status"] == "created":
+                    result.update(status="error", id=None, error="Import was rolled back")
+            self.created = 0
+            raise
+        finally:
+            self.spool.close()
+
+    def _save_batch(self, db: Session, batch: list, teacher_id: int, next_order: dict):
+        # Records naming the same new subject share one insert
+        new_subjects = {}
+        for record in batch:
+            if "id" not in record:
+                name_key = subject_name_key(record["name"])
+                if name_key in self.subject_ids:
+                    record["id"] = self.subject_ids[name_key]
+                    self._mark(record["r"], record["id"], status="existing")
+                else:
+                    new_subjects.setdefault(name_key, []).append(record)
+            elif record["id"] in next_order:
+                self._mark(record["r"], record["id"], status="existing")
+            else:
+                self._fail(record["r"], "Subject not found")
+                for lesson in record["lessons"]:
+                    self._fail(lesson["r"], "Subject was not imported")
+
+        if new_subjects:
+            ids = db.execute(
+                insert(Subject).returning(Subject.id, sort_by_parameter_order=True),
+                [{"name": records[0]["name"], "description": records[0]["description"],
+                  "teacher_id": teacher_id, "is_deleted": False} for records in new_subjects.values()]
+            ).scalars().all()
+            for (name_key, records), subject_id in zip(new_subjects.items(), ids):
+                self.subject_ids[name_key] = subject_id
+                for number, record in enumerate(records):
+                    record["id"] = subject_id
+                    self._mark(record["r"], subject_id, status="existing" if number else "created")
+
+        lessons = []
+        for record in batch:
+            if self.results[record["r"]]["status"] == "error":
+                continue
+            base = next_order.get(record["id"], 0)
+            for lesson in record["lessons"]:
+                lesson["topic_id"] = record["id"]
+                if lesson["order"] is None:
+                    lesson["order"] = base + lesson["position"]
+                lessons.append(lesson)
+                # A later record for the same subject continues after these lessons
+                next_order[record["id"]] = max(next_order.get(record["id"], 0), lesson["order"] + 1)
+        if not lessons:
+            return
+
+        ids = db.execute(
+            insert(Lesson).returning(Lesson.id, sort_by_parameter_order=True),
+            [{"topic_id": lesson["topic_id"], "title": lesson["title"], "content": lesson["content"],
+              "segments": lesson_segments(lesson["content"]),
+              "duration": lesson["duration"], "order": lesson["order"]} for lesson in lessons]
+        ).scalars().all()
+        quizzes = []
+        for lesson, lesson_id in zip(lessons, ids):
+            self._mark(lesson["r"], lesson_id)
+            for quiz in lesson["quizzes"]:
+                quiz["lesson_id"] = lesson_id
+                quizzes.append(quiz)
+        if not quizzes:
+            return
+
+        ids = db.execute(
+            insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+            [{name: quiz[name] for name in ("lesson_id",) + QUIZ_FIELDS} for quiz in quizzes]
+        ).scalars().all()
+        for quiz, quiz_id in zip(quizzes, ids):
+            self._mark(quiz["r"], quiz_id)
+
+    def summary(self) -> dict:
+        return {
+            "total": len(self.results),
+            "created": self.created,
+            "failed": sum(1 for result in self.results if result["status"] == "error"),
+            "results": self.results
+        }
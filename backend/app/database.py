@@ -1,38 +1,227 @@
+from fastapi import Request
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
+import os
+import re
+from dotenv import load_dotenv
 
-# SQLite database URL - this will create a file called "audio_learning.db"
+load_dotenv()
+
+# After load_dotenv - compression.py reads its settings at import
+from .compression import register_sqlite_functions
+
+# SQLite database URL - by default this will create a file called "audio_learning.db"
 # We used SQLite because it's simple and works offline
-SQLALCHEMY_DATABASE_URL = "sqlite:///./audio_learning.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./audio_learning.db")
+
+# SQLite performance profile - applied to every new connection
+# WAL lets readers and the writer work at the same time
+SQLITE_PRAGMAS = {
+    # Only takes effect on a new database (before the first table) - lets the
+    # trash purge hand freed pages back (purge.py, enable-vacuum for old files)
+    "auto_vacuum": os.getenv("SQLITE_AUTO_VACUUM", "INCREMENTAL"),
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative cache_size means KiB instead of pages (default: 64 MB)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Connection pools - reads and writes use separate pools
+# Readers never wait behind the writer (WAL), and SQLite only allows one
+# writer at a time anyway, so the write pool stays small
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "2"))
+DB_WRITE_MAX_OVERFLOW = int(os.getenv("DB_WRITE_MAX_OVERFLOW", "2"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# HTTP methods served from the read-only pool
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
 
-# Create database engine
-# check_same_thread=False for SQLite only - allows multiple threads
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+
+def make_engine(pool_size: int, max_overflow: int, read_only: bool = False, url: str = None):
+    """
+    Create an engine with the SQLite profile applied on connect
+    Read-only engines also set PRAGMA query_only, so a stray write fails loudly
+    url defaults to DATABASE_URL (per-school databases pass their own)
+    """
+    url = url or SQLALCHEMY_DATABASE_URL
+    sqlite = url.startswith("sqlite")
+    # check_same_thread=False for SQLite only - allows multiple threads
+    new_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if sqlite else {},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    if sqlite:
+        @event.listens_for(new_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection)
+            register_sqlite_functions(dbapi_connection)
+            if read_only:
+                apply_sqlite_pragmas(dbapi_connection, {"query_only": "ON"})
+    return new_engine
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict = None):
+    """
+    Run the PRAGMA statements of the performance profile on a raw connection
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in (pragmas or SQLITE_PRAGMAS).items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+# Create database engines
+# engine is the writer (also used for migrations), read_engine serves GET requests
+engine = make_engine(DB_WRITE_POOL_SIZE, DB_WRITE_MAX_OVERFLOW)
+read_engine = make_engine(DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, read_only=True)
+
+
+def get_sqlite_pragmas() -> dict:
+    """
+    Read back the pragmas SQLite is really using (for /health)
+    """
+    if not is_sqlite:
+        return {}
+    with read_engine.connect() as conn:
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in list(SQLITE_PRAGMAS) + ["query_only"]
+        }
+
+
+def get_pool_status() -> dict:
+    """
+    Connection pool numbers for /health
+    """
+    return {
+        "read": {
+            "size": DB_READ_POOL_SIZE,
+            "max_overflow": DB_READ_MAX_OVERFLOW,
+            "checked_out": read_engine.pool.checkedout(),
+        },
+        "write": {
+            "size": DB_WRITE_POOL_SIZE,
+            "max_overflow": DB_WRITE_MAX_OVERFLOW,
+            "checked_out": engine.pool.checkedout(),
+        },
+    }
 
 # Create SessionLocal class - we use this to talk to database
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions on the read-only pool
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Create Base class - all our database models inherit from this
 Base = declarative_base()
 
 
 # Dependency function - to get database session
-def get_db():
+def get_db(request: Request):
     """
     This function gives us database session
+    The session is on the database of the request's school (see tenancy.py)
+    GET requests get a session from the read-only pool, everything else the writer pool
     After use, it closes automatically
     """
-    db = SessionLocal()
+    from .tenancy import get_shard
+
+    shard = get_shard(request)
+    db = shard.ReadSessionLocal() if request.method in READ_METHODS else shard.SessionLocal()
+    db.info["tenant"] = shard.tenant
     try:
         yield db
     finally:
         db.close()
 
+
+# Alembic migrations live next to the app package
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, "migrations")
+# Revision that matches databases built by Base.metadata.create_all before migrations
+BASELINE_REVISION = "0001"
+
+
+def get_migration_heads() -> set:
+    """
+    Latest revision id(s), read straight from the migration files
+    (importing alembic costs ~0.25 s, too much for every cold start)
+    """
+    revisions = set()
+    parents = set()
+    versions_dir = os.path.join(MIGRATIONS_DIR, "versions")
+    for name in os.listdir(versions_dir):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, name), encoding="utf-8") as f:
+            source = f.read()
+        revision = re.search(r"^revision = [\"'](.+?)[\"']", source, re.M)
+        down_revision = re.search(r"^down_revision = (.+)$", source, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if down_revision:
+            parents.update(re.findall(r"[\"'](.+?)[\"']", down_revision.group(1)))
+    return revisions - parents
+
+
+def schema_is_current(bind=None) -> bool:
+    """
+    One cheap query: is the database already at the latest migration?
+    """
+    try:
+        with (bind or engine).connect() as conn:
+            current = set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except OperationalError:
+        # No alembic_version table yet
+        return False
+    return current == get_migration_heads()
+
+
+def ensure_schema(bind=None):
+    """
+    Run migrations only when the database (default: the main one) is behind
+    """
+    if not schema_is_current(bind):
+        run_migrations(bind.url.render_as_string(hide_password=False) if bind is not None else None)
+
+
+def run_migrations(url: str = None):
+    """
+    Bring the database schema up to date (alembic upgrade head)
+    Databases created before migrations existed are stamped as the baseline first
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    config.attributes["configure_logger"] = False
+
+    # make_engine, not create_engine: migrations that write lessons fire the
+    # search triggers, which need lesson_text() registered on the connection
+    target = make_engine(1, 0, url=url) if url else engine
+    with target.begin() as conn:
+        tables = set(inspect(conn).get_table_names())
+        config.attributes["connection"] = conn
+        if "users" in tables and "alembic_version" not in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+    if url:
+        target.dispose()
+
 # Create all tables
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully!")
\ No newline at end of file
+    run_migrations()
+    print("✅ Database tables created successfully!")
@@ -0,0 +1,206 @@
+# hashing.py - Runs bcrypt hashing/verification on a worker pool
+# bcrypt takes ~250 ms per call, so it must never run on the event loop
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .auth import get_password_hash, verify_password
+
+# "thread" works well because bcrypt releases the GIL while hashing
+# "process" isolates hashing completely from the API process
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# How many hashes may wait for a free worker before new ones are rejected
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+
+class HashQueueFull(Exception):
+    """
+    Raised when too many hashes are already waiting for a worker
+    """
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordHashPool:
+    """
+    Bounded worker pool for password hashing
+    Keeps track of queue depth and latency of every job
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 2, max_queue: int = 64):
+        if mode not in ("thread", "process"):
+            raise ValueError("PASSWORD_HASH_POOL must be 'thread' or 'process'")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # (loop, future) of bulk jobs waiting for a free slot
+        self._waiters = []
+        self._latencies = deque(maxlen=1024)
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        """Jobs running on workers plus jobs allowed to wait"""
+        return self.workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Executor:
+        # Created on first use so importing the app stays cheap
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="password-hash"
+                        )
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise HashQueueFull(retry_after=self.estimated_wait())
+            self._in_flight += 1
+
+    async def _acquire_waiting(self):
+        """
+        Wait for a free slot instead of failing (bulk jobs, see hash_many)
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._in_flight < self.capacity:
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+
+    def ensure_capacity(self):
+        """
+        Fail fast before doing any other work if the queue is already full
+        """
+        with self._lock:
+            if self._in_flight < self.capacity:
+                return
+            self.rejected += 1
+        raise HashQueueFull(retry_after=self.estimated_wait())
+
+    def _release(self, elapsed: float):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+            self._latencies.append(elapsed)
+            waiters, self._waiters = self._waiters, []
+        # Runs on a worker thread - wake the waiters on their own event loop
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def estimated_wait(self) -> int:
+        """
+        Rough number of seconds until a queue slot frees up
+        """
+        if not self._latencies:
+            return 1
+        average = sum(self._latencies) / len(self._latencies)
+        waves = self._in_flight / self.workers
+        return max(1, round(average * waves))
+
+    async def run(self, fn, *args, wait: bool = False):
+        """
+        Run fn(*args) on the pool without blocking the event loop
+        Raises HashQueueFull instead of queueing without limit,
+        or with wait=True waits until a slot is free
+        """
+        if wait:
+            await self._acquire_waiting()
+        else:
+            self._acquire()
+        start = time.perf_counter()
+        try:
+            job = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(time.perf_counter() - start)
+            raise
+        # The slot is freed when the job itself ends - a cancelled request
+        # (client gone) stops waiting, but its hash keeps a worker busy
+        job.add_done_callback(lambda _: self._release(time.perf_counter() - start))
+        return await asyncio.wrap_future(job)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: list) -> list:
+        """
+        Hash a whole batch in parallel on every worker
+        Never has more than one job per worker in flight, so logins can still queue,
+        and waits for a slot when logins fill the queue - a roster is never cut short
+        """
+        limit = asyncio.Semaphore(self.workers)
+
+        async def hash_one(password):
+            async with limit:
+                return await self.run(get_password_hash, password, wait=True)
+
+        return await asyncio.gather(*(hash_one(p) for p in passwords))
+
+    def stats(self) -> dict:
+        """
+        Queue depth and latency numbers for /health
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        result = {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+        if latencies:
+            result["latency_ms"] = {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# Shared pool used by the auth routes
+password_hasher = PasswordHashPool(
+    mode=PASSWORD_HASH_POOL,
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE
+)
@@ -1,27 +1,97 @@
-from fastapi import FastAPI, Depends
+from .startup import import_started, startup_stats, mark, prewarm, PREWARM, FirstResponseTimer
+import asyncio
+import os
+import time
+import anyio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from . database import engine, Base, get_db
-from . import models
-from .models import Lesson, Subject
+from . database import get_db, ensure_schema, get_sqlite_pragmas, get_pool_status
+from .models import Lesson
+from .auth import get_auth_cache_stats
+from .hashing import HashQueueFull, password_hasher
+from . import rate_limit
+from .write_queue import WriteQueueFull, write_queue
+from .backup import BACKUP_INTERVAL_MINUTES, backup_loop, backup_status
+from .archive import ARCHIVE_INTERVAL_HOURS, archive_loop
+from .purge import PURGE_INTERVAL_HOURS, purge_loop
 from .routes_auth import router as auth_router
 from .routes_lessons import router as lessons_router
 from .routes_quiz import router as quiz_router
 from .routes_progress import router as progress_router
+from .routes_tenants import router as tenants_router
+from .routes_sync import router as sync_router
+from .tenancy import ShardLeases, get_shard, shard_registry
+from .compression import GZIP_MIN_BYTES, GZIP_LEVEL
+from .catalog import bump_catalog_version, catalog_cache_headers, catalog_response, catalog_versions, response_cache, subject_names
 
-# Create all database tables
-Base.metadata.create_all(bind=engine)
-models.Base.metadata.create_all(bind=engine)
+# Sync (def) routes and dependencies run on this many worker threads
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+# Create/upgrade database tables (Alembic migrations in backend/migrations)
+# Only a version check unless a migration is pending
+schema_check_started = time.perf_counter()
+ensure_schema()
+mark("schema_check_ms", schema_check_started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown hook - starts pre-warming, scheduled backups, archival and trash purge, stops background workers when the server exits
+    """
+    # All database work runs in the threadpool, so its size caps DB concurrency
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    prewarm_task = asyncio.create_task(prewarm()) if PREWARM else None
+    backup_task = asyncio.create_task(backup_loop()) if BACKUP_INTERVAL_MINUTES > 0 else None
+    archive_task = asyncio.create_task(archive_loop()) if ARCHIVE_INTERVAL_HOURS > 0 else None
+    purge_task = asyncio.create_task(purge_loop()) if PURGE_INTERVAL_HOURS > 0 else None
+    yield
+    for task in (prewarm_task, backup_task, archive_task, purge_task):
+        if task is not None:
+            task.cancel()
+    password_hasher.shutdown()
+    shard_registry.close_all()
+    write_queue.stop()
 
-app = FastAPI()
 
 # Create FastAPI application
 app = FastAPI(
     title="Audio Learning System API",
     description="Backend API for visually impaired students learning system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+
+@app.exception_handler(HashQueueFull)
+async def hash_queue_full_handler(request: Request, exc: HashQueueFull):
+    """
+    Too many logins/registrations at once - ask the client to retry later
+    """
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Server is busy, please try again shortly"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(WriteQueueFull)
+async def write_queue_full_handler(request: Request, exc: WriteQueueFull):
+    """
+    The database writer is too far behind - ask the client to retry later
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy saving data, please try again shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+# gzip for responses that are not pre-compressed (catalog routes bring their own copy)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
 # Allow frontend to connect to our API
 app.add_middleware(
     CORSMiddleware,
@@ -30,12 +100,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(FirstResponseTimer)
+# Outermost - a school's shard is released only after the whole response went out
+app.add_middleware(ShardLeases)
 
 # Include authentication routes
 app.include_router(auth_router)
 app.include_router(lessons_router)
 app.include_router(quiz_router)
 app.include_router(progress_router)
+app.include_router(tenants_router)
+app.include_router(sync_router)
 
 # Welcome endpoint
 @app.get("/")
@@ -51,12 +126,23 @@ async def root():
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+def health_check():
     return {
         "status": "healthy",
         "message": "API works well! All systems operational ✅",
         "database": "Connected",
-        "authentication": "Ready"
+        "sqlite_pragmas": get_sqlite_pragmas(),
+        "db_pool": get_pool_status(),
+        "authentication": "Ready",
+        "auth_cache": get_auth_cache_stats(),
+        "password_hashing": password_hasher.stats(),
+        # Read at call time - set_login_limiter() may have swapped the backend
+        "login_rate_limit": rate_limit.login_limiter.stats(),
+        "write_queue": write_queue.stats(),
+        "shards": shard_registry.stats(),
+        "backup": backup_status,
+        "catalog_cache": response_cache.stats(),
+        "startup": startup_stats
     }
 
 # Info endpoint
@@ -90,7 +176,7 @@ async def api_info():
 
 # Test endpoint - Add sample subject
 @app.post("/test/add-subject")
-async def add_test_subject(db: Session = Depends(get_db)):
+def add_test_subject(db: Session = Depends(get_db)):
     """
     Test endpoint - Add a sample subject to database
     """
@@ -102,6 +188,7 @@ async def add_test_subject(db: Session = Depends(get_db)):
     )
     
     db.add(test_subject)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(test_subject)
     
@@ -114,27 +201,40 @@ async def add_test_subject(db: Session = Depends(get_db)):
         }
     }
 
-# CHANGE IT TO THIS:
 @app.get("/lessons/{lesson_id}")
-async def get_lesson(lesson_id: str, db: Session = Depends(get_db)): # Change 'int' to 'str'
-    
-    # Check if the input is a number (like "1") or a word (like "english")
-    if lesson_id.isdigit():
-        # If it's a number, find by ID
-        lesson = db.query(Lesson).filter(Lesson.id == int(lesson_id)).first()
-    else:
-        # If it's a word, find the subject first, then the lesson
-        subject = db.query(Subject).filter(Subject.name.ilike(lesson_id)).first()
-        if not subject:
-            return {"detail": "Subject not found"}
-        lesson = db.query(Lesson).filter(Lesson.subject_id == subject.id).first()
-
-    if not lesson:
-        return {"detail": "Lesson not found"}
+def get_lesson(
+    lesson_id: str,  # a lesson id, or a subject name (voice lookups) for its first lesson
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    def build():
+        # Check if the input is a number (like "1") or a word (like "english")
+        if lesson_id.isdigit():
+            # If it's a number, find by ID
+            lesson = db.query(Lesson).filter(
+                Lesson.id == int(lesson_id),
+                Lesson.is_deleted == False
+            ).first()
+        else:
+            # If it's a word, it names a subject - its first lesson comes from the name map
+            version, _ = catalog_versions.get(get_shard(request))
+            found = subject_names.lookup(db, request.state.tenant, version, lesson_id)
+            if not found:
+                return {"detail": "Subject not found"}, {}
+            subject_id, first_lesson_id = found
+            lesson = db.get(Lesson, first_lesson_id) if first_lesson_id else None
 
-    return {
-        "id": lesson.id,
-        "title": lesson.title,
-        "content": lesson.content
-    }
+        if not lesson:
+            return {"detail": "Lesson not found"}, {}
+
+        return {
+            "id": lesson.id,
+            "title": lesson.title,
+            "content": lesson.content
+        }, {}
+
+    return catalog_response(request, cache_headers, build)
 
+# How long importing this module took (reported in /health)
+mark("import_ms", import_started)
@@ -2,10 +2,11 @@
 # Location: backend/models.py
 # Add/Update these models
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, LargeBinary, UniqueConstraint, false, func
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 from .database import Base
+from .compression import CompressedText
 
 # ==================== USER MODEL ====================
 # ADD THESE FIELDS if not present:
@@ -27,23 +28,64 @@ class User(Base):
     progress = relationship("StudentProgress", back_populates="student")
 
 
+# Indexes for the user directory (/auth/users): role filter + keyset paging on id,
+# and lower() expression indexes so case-insensitive prefix search is a range scan
+Index("ix_users_role_id", User.role, User.id)
+Index("ix_users_username_lower", func.lower(User.username))
+Index("ix_users_email_lower", func.lower(User.email))
+Index("ix_users_first_name_lower", func.lower(User.first_name))
+Index("ix_users_surname_lower", func.lower(User.surname))
+
+
 # ==================== SUBJECT MODEL ====================
 # ADD THESE FIELDS if not present:
 
+def subject_name_key(name: str) -> str:
+    """
+    Normalized subject name (case and spacing ignored) - what voice lookups match on
+    """
+    return " ".join(name.split()).casefold()
+
+
+def _name_key_default(context):
+    return subject_name_key(context.get_current_parameters()["name"])
+
+
 class Subject(Base):
     __tablename__ = "subjects"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
+    # Filled in from name on insert (ORM and bulk inserts alike)
+    name_key = Column(String(100), default=_name_key_default)
     description = Column(Text, default="")
     teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     is_deleted = Column(Boolean, default=False)  # ADD THIS for soft delete
     deleted_at = Column(DateTime, nullable=True)  # ADD THIS for soft delete
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Every change (including trash/restore) moves this forward - delta sync reads it
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     teacher = relationship("User", back_populates="subjects")
-    lessons = relationship("Lesson", back_populates="subject", cascade="all, delete-orphan")
+    # In display order, so subject.lessons (and the bundle's selectinload) come out sorted
+    lessons = relationship("Lesson", back_populates="subject", cascade="all, delete-orphan",
+                           order_by="(Lesson.order, Lesson.id)")
+
+    __table_args__ = (
+        # Only live subjects - used by every "is_deleted == False" listing
+        Index("ix_subjects_live", "id", sqlite_where=is_deleted == False),
+        # One live subject per name; a trashed one keeps its key for the restore check
+        Index("ux_subjects_name_key_live", "name_key", unique=True,
+              sqlite_where=is_deleted == False, postgresql_where=is_deleted == False),
+        # Trash view: deleted subjects of one teacher
+        Index("ix_subjects_teacher_deleted", "teacher_id", "is_deleted"),
+        # Trash purge (purge.py): trashed subjects by age
+        Index("ix_subjects_trash_deleted_at", "deleted_at",
+              sqlite_where=is_deleted == True, postgresql_where=is_deleted == True),
+        # Delta sync (/sync/changes)
+        Index("ix_subjects_updated_at", "updated_at"),
+    )
 
 class Topic(Base):
     __tablename__ = "topics"
@@ -63,16 +105,29 @@ class Lesson(Base):
     id = Column(Integer, primary_key=True, index=True)
     topic_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
     title = Column(String(200), nullable=False)
-    content = Column(Text, nullable=False)
+    # zlib-compressed on disk when long (see compression.py)
+    content = Column(CompressedText, nullable=False)
+    # Sentence offsets into content, packed (see segments.py) - only loaded when asked for
+    segments = deferred(Column(LargeBinary, nullable=True))
     duration = Column(String(50), default="15 min")
-    order = Column(Integer, default=0)
+    # NOT NULL - the lesson list pages on (topic_id, order, id)
+    order = Column(Integer, nullable=False, default=0)
+    # Set together with its subject's is_deleted (trash and restore cascade)
+    is_deleted = Column(Boolean, nullable=False, default=False, server_default=false())
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     subject = relationship("Subject", back_populates="lessons")
-    quizzes = relationship("Quiz", back_populates="lesson", cascade="all, delete-orphan")
+    quizzes = relationship("Quiz", back_populates="lesson", cascade="all, delete-orphan", order_by="Quiz.id")
     progress = relationship("StudentProgress", back_populates="lesson")
 
+    __table_args__ = (
+        # Lessons of a subject in display order
+        Index("ix_lessons_topic_order", "topic_id", "order", "id"),
+        Index("ix_lessons_updated_at", "updated_at"),
+    )
+
 
 # ==================== QUIZ MODEL ====================
 # Your existing Quiz model should work:
@@ -88,11 +143,19 @@ class Quiz(Base):
     option_c = Column(String(200), nullable=False)
     option_d = Column(String(200), nullable=False)
     correct_answer = Column(String(1), nullable=False)  # 'A', 'B', 'C', or 'D'
+    # Set together with its lesson's is_deleted (trash and restore cascade)
+    is_deleted = Column(Boolean, nullable=False, default=False, server_default=false())
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     lesson = relationship("Lesson", back_populates="quizzes")
 
+    __table_args__ = (
+        Index("ix_quizzes_lesson_id", "lesson_id"),
+        Index("ix_quizzes_updated_at", "updated_at"),
+    )
+
 
 # ==================== DELETED ITEM MODEL ====================
 # ADD THIS NEW MODEL for trash functionality:
@@ -110,6 +173,22 @@ class DeletedItem(Base):
     # Relationships (optional)
     teacher = relationship("User")
 
+    __table_args__ = (
+        # Tombstones for delta sync (/sync/changes)
+        Index("ix_deleted_items_deleted_at", "deleted_at"),
+    )
+
+
+# ==================== CATALOG VERSION ====================
+# Single row, bumped on every subject/lesson/quiz change (see catalog.py)
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 
 # ==================== STUDENT PROGRESS MODEL ====================
 # Your existing StudentProgress model should work:
@@ -128,3 +207,63 @@ class StudentProgress(Base):
     # Relationships
     student = relationship("User", back_populates="progress")
     lesson = relationship("Lesson", back_populates="progress")
+
+    __table_args__ = (
+        # One progress row per student and lesson (also serves student_id lookups)
+        UniqueConstraint("student_id", "lesson_id", name="uq_student_progress_student_lesson"),
+        Index("ix_student_progress_lesson_id", "lesson_id"),
+        # Archival job picks rows older than the hot horizon
+        Index("ix_student_progress_completed_at", "completed_at"),
+    )
+
+
+# ==================== PROGRESS ARCHIVE ====================
+# Old StudentProgress rows are moved out of the hot table by app/archive.py
+
+class ProgressArchive(Base):
+    """
+    Cold storage - one row per student per archive run,
+    the progress rows are zlib-compressed JSON in data
+    """
+    __tablename__ = "student_progress_archive"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    row_count = Column(Integer, nullable=False)
+    oldest_at = Column(DateTime)
+    newest_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    data = Column(LargeBinary, nullable=False)
+
+
+class ProgressSummary(Base):
+    """
+    Running totals of everything archived for a student,
+    reports add these to the hot rows instead of reading the archive
+    """
+    __tablename__ = "student_progress_summary"
+
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    lessons_started = Column(Integer, nullable=False, default=0)
+    lessons_completed = Column(Integer, nullable=False, default=0)
+    percentage_sum = Column(Integer, nullable=False, default=0)
+    last_completed_at = Column(DateTime)
+
+
+class ArchivedLesson(Base):
+    """
+    The archived result of each (student, lesson) - what the summary counts for it
+    A lesson archived again replaces its old contribution, and reports leave it
+    out while the student has a newer hot row for the same lesson
+    """
+    __tablename__ = "student_progress_archived_lessons"
+
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    lesson_id = Column(Integer, primary_key=True)
+    completed = Column(Boolean, nullable=False, default=False)
+    percentage = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Trash purge drops the rows of purged lessons
+        Index("ix_student_progress_archived_lessons_lesson_id", "lesson_id"),
+    )
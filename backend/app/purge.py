@@ -0,0 +1,221 @@
+# purge.py - Emptying the trash
+# A trashed subject (and its lessons and quizzes, trashed with it) can be
+# restored for TRASH_RETENTION_DAYS. After that the purge deletes the rows for
+# good, in batches of set-based DELETEs, and leaves one DeletedItem record per
+# purged subject. DeletedItem rows (these records and the lesson/quiz
+# tombstones read by delta sync) are kept for the same window; sync clients
+# whose cursor is older than that get a full copy instead (routes_sync.py).
+# Student progress on purged lessons moves to the cold archive first (archive.py),
+# so reports keep the history and no row points at a lesson id SQLite may reuse.
+# Freed pages go back to the filesystem with PRAGMA incremental_vacuum when the
+# database has auto_vacuum=INCREMENTAL (new databases do, see database.py).
+#
+# Command line (run from the backend folder):
+#   python -m app.purge                  purge every school now
+#   python -m app.purge enable-vacuum    switch existing databases to auto_vacuum=INCREMENTAL (runs VACUUM once)
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from .archive import archive_student_rows
+from .database import SessionLocal
+from .models import Subject, Lesson, Quiz, DeletedItem, StudentProgress, ArchivedLesson
+from .tenancy import shard_registry
+
+# Trashed subjects can be restored for this many days
+TRASH_RETENTION_DAYS = int(os.getenv("TRASH_RETENTION_DAYS", "30"))
+# Subjects (with their lessons and quizzes) deleted per transaction
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "100"))
+# Scheduled purge, 0 turns the scheduler off
+PURGE_INTERVAL_HOURS = float(os.getenv("PURGE_INTERVAL_HOURS", "0"))
+# Free pages returned to the filesystem per run, 0 means all of them
+PURGE_VACUUM_PAGES = int(os.getenv("PURGE_VACUUM_PAGES", "0"))
+
+# PRAGMA auto_vacuum value for INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def retention_cutoff() -> datetime:
+    """
+    Trash and tombstones older than this are purged
+    """
+    return datetime.utcnow() - timedelta(days=TRASH_RETENTION_DAYS)
+
+
+def purge_subjects(db: Session, subject_ids: list) -> dict:
+    """
+    Delete trashed subjects with their lessons and quizzes (one DELETE per table)
+    A DeletedItem row records each subject and how much went with it
+    Progress on the lessons is archived (it stays in the students' totals) and deleted
+    """
+    lesson_ids = select(Lesson.id).where(Lesson.topic_id.in_(subject_ids))
+    lesson_counts = dict(db.query(Lesson.topic_id, func.count(Lesson.id)).filter(
+        Lesson.topic_id.in_(subject_ids)
+    ).group_by(Lesson.topic_id).all())
+
+    subjects = db.query(Subject).filter(Subject.id.in_(subject_ids)).all()
+    db.execute(insert(DeletedItem), [
+        {
+            "item_type": "subject",
+            "item_id": subject.id,
+            "teacher_id": subject.teacher_id,
+            "item_data": json.dumps({
+                "id": subject.id,
+                "name": subject.name,
+                "description": subject.description,
+                "created_at": subject.created_at,
+                "deleted_at": subject.deleted_at,
+                "lessons": lesson_counts.get(subject.id, 0),
+            }, default=str),
+        }
+        for subject in subjects
+    ])
+
+    progress = db.query(StudentProgress).filter(StudentProgress.lesson_id.in_(lesson_ids)).all()
+    by_student = {}
+    for row in progress:
+        by_student.setdefault(row.student_id, []).append(row)
+    for student_id, rows in by_student.items():
+        archive_student_rows(db, student_id, rows)
+    db.flush()
+    # The summary keeps their totals; a purged lesson is never retaken, and its
+    # id may come back for a new lesson that must not match the old results
+    db.execute(delete(ArchivedLesson).where(ArchivedLesson.lesson_id.in_(lesson_ids)))
+
+    quizzes = db.execute(delete(Quiz).where(Quiz.lesson_id.in_(lesson_ids))).rowcount
+    lessons = db.execute(delete(Lesson).where(Lesson.topic_id.in_(subject_ids))).rowcount
+    db.execute(delete(Subject).where(Subject.id.in_(subject_ids)))
+    return {"subjects": len(subjects), "lessons": lessons, "quizzes": quizzes, "progress_rows": len(progress)}
+
+
+def purge_trash(db: Session = None, retention_days: int = None, batch_size: int = None) -> dict:
+    """
+    Delete everything trashed before the retention window, then old DeletedItem rows,
+    then give the freed pages back (incremental vacuum)
+    Each batch is its own transaction, so the job can be stopped and re-run safely
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    retention_days = TRASH_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = {"subjects": 0, "lessons": 0, "quizzes": 0, "progress_rows": 0,
+              "deleted_items": 0, "batches": 0, "pages_freed": 0}
+
+    try:
+        while True:
+            subject_ids = [row.id for row in db.query(Subject.id).filter(
+                Subject.is_deleted == True,
+                Subject.deleted_at < cutoff
+            ).order_by(Subject.deleted_at).limit(batch_size).all()]
+            if not subject_ids:
+                break
+            for name, count in purge_subjects(db, subject_ids).items():
+                result[name] += count
+            db.commit()
+            result["batches"] += 1
+
+        while True:
+            old_items = select(DeletedItem.id).where(
+                DeletedItem.deleted_at < cutoff
+            ).order_by(DeletedItem.deleted_at).limit(batch_size)
+            count = db.execute(delete(DeletedItem).where(DeletedItem.id.in_(old_items))).rowcount
+            db.commit()
+            if not count:
+                break
+            result["deleted_items"] += count
+            result["batches"] += 1
+
+        result["pages_freed"] = incremental_vacuum(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+    return result
+
+
+def incremental_vacuum(db: Session, pages: int = None) -> int:
+    """
+    Return free pages to the filesystem, returns how many were freed
+    Does nothing (0) unless the database has auto_vacuum=INCREMENTAL
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return 0
+    if db.execute(text("PRAGMA auto_vacuum")).scalar() != AUTO_VACUUM_INCREMENTAL:
+        return 0
+    pages = PURGE_VACUUM_PAGES if pages is None else pages
+    before = db.execute(text("PRAGMA freelist_count")).scalar()
+    # executescript runs the pragma to the end - execute() would free a single page
+    db.connection().connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    return before - db.execute(text("PRAGMA freelist_count")).scalar()
+
+
+def enable_incremental_vacuum(engine) -> bool:
+    """
+    Switch an existing SQLite database to auto_vacuum=INCREMENTAL
+    Needs a full VACUUM (rewrites the file, takes the write lock), so it is a command, not a startup step
+    Returns False when it already was
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() == AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+    return True
+
+
+def purge_all_schools() -> dict:
+    """
+    Run purge_trash on the main database and every school database
+    """
+    results = {}
+    for tenant in shard_registry.tenants():
+        with shard_registry.lease(tenant) as shard:
+            db = shard.SessionLocal()
+            try:
+                results[tenant] = purge_trash(db)
+            finally:
+                db.close()
+    return results
+
+
+async def purge_loop():
+    """
+    Background task started from the lifespan hook when PURGE_INTERVAL_HOURS > 0
+    """
+    while True:
+        await asyncio.sleep(PURGE_INTERVAL_HOURS * 3600)
+        try:
+            await asyncio.to_thread(purge_all_schools)
+        except Exception as e:
+            print(f"Trash purge failed: {e}")
+
+
+def main(argv):
+    if argv == ["enable-vacuum"]:
+        for tenant in shard_registry.tenants():
+            with shard_registry.lease(tenant) as shard:
+                changed = enable_incremental_vacuum(shard.engine)
+            print(f"{tenant}: {'auto_vacuum=INCREMENTAL' if changed else 'already incremental'}")
+    elif not argv:
+        for tenant, result in purge_all_schools().items():
+            print(f"{tenant}: purged {result['subjects']} subjects, {result['lessons']} lessons, "
+                  f"{result['quizzes']} quizzes ({result['progress_rows']} progress rows archived) "
+                  f"and {result['deleted_items']} old deleted items "
+                  f"in {result['batches']} batches, freed {result['pages_freed']} pages")
+    else:
+        print("Usage: python -m app.purge [enable-vacuum]")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
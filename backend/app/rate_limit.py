@@ -0,0 +1,123 @@
+# rate_limit.py - Token bucket rate limiting for expensive routes (login)
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Tuple
+
+from fastapi import HTTPException, Request, status
+
+from .tenancy import resolve_tenant
+
+# Per username: burst of LOGIN_USER_BURST attempts, refilled at LOGIN_USER_PER_MINUTE
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "5"))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "10"))
+# Per client IP (a whole classroom can share one IP, so this is higher)
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "60"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "120"))
+# Buckets kept in memory before the least recently used ones are dropped
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class RateLimiter(ABC):
+    """
+    Interface for rate limiter backends
+    The in-memory backend is per process; a shared backend (e.g. redis)
+    only needs to implement take() to be used across workers
+    """
+
+    @abstractmethod
+    def take(self, key: str, burst: int, per_minute: float) -> Tuple[bool, int]:
+        """
+        Take one token from the bucket for key
+        Returns (allowed, retry_after_seconds)
+        """
+
+    def reset(self, key: str) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Token buckets stored in this process, bounded with LRU eviction
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key: str, burst: int, per_minute: float) -> Tuple[bool, int]:
+        rate = per_minute / 60.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(burst), now]
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                tokens, last = bucket
+                bucket[0] = min(float(burst), tokens + (now - last) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return True, 0
+
+            self.limited += 1
+            retry_after = math.ceil((1 - bucket[0]) / rate) if rate > 0 else 60
+            return False, max(1, retry_after)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+login_limiter: RateLimiter = InMemoryRateLimiter(max_keys=RATE_LIMIT_MAX_KEYS)
+
+
+def set_login_limiter(limiter: RateLimiter):
+    """
+    Swap the limiter backend (e.g. for one shared between workers)
+    """
+    global login_limiter
+    login_limiter = limiter
+
+
+def check_login_rate(request: Request, username: str):
+    """
+    Raise 429 with Retry-After if this IP or username is sending too many logins
+    Usernames are only unique within a school, so the user bucket is per school
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    checks = [
+        (f"login:ip:{client_ip}", LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE),
+        (f"login:user:{resolve_tenant(request)}:{(username or '').lower()}", LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE),
+    ]
+    for key, burst, per_minute in checks:
+        allowed, retry_after = login_limiter.take(key, burst, per_minute)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please wait and try again",
+                headers={"Retry-After": str(retry_after)}
+            )
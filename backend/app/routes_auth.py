@@ -1,27 +1,65 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import ValidationError
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import timedelta
+import csv
+import io
+import json
+import os
 
 from .database import get_db
 from .models import User
-from .schemas import UserCreate, UserResponse, Token, PasswordReset
+from .schemas import UserCreate, UserResponse, Token, PasswordReset, BulkRegisterResult
 
 # Import from auth.py to avoid duplication
 from .auth import (
-    get_password_hash,
-    verify_password,
     create_access_token,
     get_current_user,
+    invalidate_user,
     oauth2_scheme,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     SECRET_KEY
 )
+from .hashing import password_hasher
+from .rate_limit import check_login_rate
+from .tenancy import resolve_tenant
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Largest roster accepted by /auth/register/bulk in one request
+BULK_REGISTER_MAX_ROWS = int(os.getenv("BULK_REGISTER_MAX_ROWS", "5000"))
+# Page size for the user directory
+USERS_PAGE_SIZE = 100
+USERS_MAX_PAGE_SIZE = 500
+ROSTER_FIELDS = ["username", "email", "password", "first_name", "surname", "role"]
+
+
+def parse_roster(body: bytes, content_type: str) -> list:
+    """
+    Turn a CSV or JSON roster into a list of dicts
+    JSON may be a list of users or {"users": [...]}
+    """
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(text))
+        return [
+            {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            for row in reader
+        ]
+
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("users", [])
+    if not isinstance(data, list):
+        raise ValueError("Roster must be a list of users")
+    return data
+
 # ==================== ROUTES ====================
 
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=UserResponse)
@@ -29,9 +67,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     Register new user (student or teacher)
     Required fields: first_name, username, email, password, role
+    Database calls run in the threadpool so they never block the event loop
     """
     # Check if username exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await run_in_threadpool(db.query(User).filter(User.username == user_data.username).first)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,7 +78,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = await run_in_threadpool(db.query(User).filter(User.email == user_data.email).first)
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -54,7 +93,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user - FIXED: Uses password_hash field
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     
     new_user = User(
         first_name=user_data.first_name,
@@ -66,15 +105,166 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(db.commit)
+    await run_in_threadpool(db.refresh, new_user)
     
     return new_user
 
 
+@router.post("/register/bulk", response_model=BulkRegisterResult)
+async def register_bulk(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Register a whole class roster at once (teachers only)
+    Body is JSON or CSV (Content-Type: text/csv) with columns:
+    username, email, password, first_name, surname, role (defaults to student)
+    Valid rows are created in one transaction, every row gets a result
+    """
+    if current_user.role != "teacher":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only teachers can import rosters"
+        )
+
+    try:
+        rows = parse_roster(await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read roster: {e}"
+        )
+
+    if len(rows) > BULK_REGISTER_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Roster has more than {BULK_REGISTER_MAX_ROWS} rows"
+        )
+
+    results = []
+    valid = []  # (result, UserCreate) pairs still waiting to be created
+
+    # Validate every row on its own
+    for index, row in enumerate(rows, start=1):
+        result = {"row": index, "status": "error"}
+        results.append(result)
+        if not isinstance(row, dict):
+            result["error"] = "Row must be an object"
+            continue
+        result["username"] = row.get("username")
+        if not row.get("role"):
+            row = {**row, "role": "student"}
+        try:
+            user_data = UserCreate(**{key: row.get(key) for key in ROSTER_FIELDS if row.get(key) is not None})
+        except ValidationError as e:
+            first = e.errors()[0]
+            result["error"] = f"{'.'.join(str(p) for p in first['loc'])}: {first['msg']}"
+            continue
+        if user_data.role not in ["student", "teacher"]:
+            result["error"] = "Role must be 'student' or 'teacher'"
+            continue
+        valid.append((result, user_data))
+
+    # Duplicates inside the roster itself
+    seen_usernames = set()
+    seen_emails = set()
+    unique = []
+    for result, user_data in valid:
+        if user_data.username in seen_usernames:
+            result["error"] = "Username repeated in roster"
+        elif user_data.email in seen_emails:
+            result["error"] = "Email repeated in roster"
+        else:
+            seen_usernames.add(user_data.username)
+            seen_emails.add(user_data.email)
+            unique.append((result, user_data))
+
+    def without_taken(pending):
+        """
+        Rows whose username and email are still free - one query for the whole batch
+        The others get their error
+        """
+        existing = db.query(User.username, User.email).filter(or_(
+            User.username.in_([user_data.username for _, user_data in pending]),
+            User.email.in_([user_data.email for _, user_data in pending])
+        )).all()
+        taken_usernames = {username for username, _ in existing}
+        taken_emails = {email for _, email in existing}
+        free = []
+        for result, user_data in pending:
+            if user_data.username in taken_usernames:
+                result["error"] = "Username already exists"
+            elif user_data.email in taken_emails:
+                result["error"] = "Email already exists"
+            else:
+                free.append((result, user_data))
+        return free
+
+    # Conflicts with existing users
+    if unique:
+        unique = await run_in_threadpool(without_taken, unique)
+
+    # Hash passwords in parallel on the hashing pool
+    hashes = dict(zip(
+        (user_data.username for _, user_data in unique),
+        await password_hasher.hash_many([user_data.password for _, user_data in unique])
+    ))
+
+    # One transaction for the whole roster
+    def save(pending):
+        new_users = [
+            User(
+                first_name=user_data.first_name,
+                surname=user_data.surname or "",
+                email=user_data.email,
+                username=user_data.username,
+                password_hash=hashes[user_data.username],
+                role=user_data.role
+            )
+            for _, user_data in pending
+        ]
+        try:
+            db.add_all(new_users)
+            db.flush()
+            ids = [user.id for user in new_users]
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+        for (result, _), user_id in zip(pending, ids):
+            result["status"] = "created"
+            result["id"] = user_id
+        return new_users
+
+    new_users = []
+    while unique:
+        saved = await run_in_threadpool(save, unique)
+        if saved is not None:
+            new_users = saved
+            break
+        # Someone registered one of the names after the check - report those rows, save the rest
+        free = await run_in_threadpool(without_taken, unique)
+        if len(free) == len(unique):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Roster conflicts with existing users"
+            )
+        unique = free
+
+    return {
+        "total": len(results),
+        "created": len(new_users),
+        "failed": len(results) - len(new_users),
+        "results": results
+    }
+
+
 @router.post("/login", response_model=Token)
 async def login(
     user_data: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -89,12 +279,16 @@ async def login(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username and password required"
         )
+
+    # Admission control - reject early instead of queueing more bcrypt work
+    check_login_rate(request, username)
+    password_hasher.ensure_capacity()
     
     # Find user
-    user = db.query(User).filter(User.username == username).first()
+    user = await run_in_threadpool(db.query(User).filter(User.username == username).first)
     
     # Verify password
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await password_hasher.verify(password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
@@ -108,7 +302,8 @@ async def login(
             "user_id": user.id,
             "username": user.username,
             "role": user.role,
-            "sub": user.username
+            "sub": user.username,
+            "tenant": resolve_tenant(request)
         },
         expires_delta=access_token_expires
     )
@@ -129,15 +324,19 @@ async def login(
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """
     OAuth2 compatible token login (for Swagger UI)
     """
-    user = db.query(User).filter(User.username == form_data.username).first()
+    check_login_rate(request, form_data.username)
+    password_hasher.ensure_capacity()
+
+    user = await run_in_threadpool(db.query(User).filter(User.username == form_data.username).first)
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await password_hasher.verify(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -150,7 +349,8 @@ async def login_for_access_token(
             "user_id": user.id,
             "username": user.username,
             "role": user.role,
-            "sub": user.username
+            "sub": user.username,
+            "tenant": resolve_tenant(request)
         },
         expires_delta=access_token_expires
     )
@@ -170,14 +370,21 @@ async def login_for_access_token(
     }
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_users(
+def get_users(
+    response: Response,
     role: str = None,
+    q: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(USERS_PAGE_SIZE, ge=1, le=USERS_MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get list of users
+    Get one page of users, ordered by id
     Optional filter by role (student or teacher)
+    Optional q = prefix search over username, first_name, surname and email
+    Pass the X-Next-Cursor response header back as ?cursor= to get the next page
+    X-Total-Count holds the number of users matching the filters
     Requires authentication
     """
     query = db.query(User)
@@ -189,8 +396,28 @@ async def get_users(
                 detail="Role must be 'student' or 'teacher'"
             )
         query = query.filter(User.role == role)
-    
-    users = query.all()
+
+    if q and q.strip():
+        # lower(col) >= prefix AND lower(col) < prefix + max char
+        # is a range scan on the lower() indexes, unlike LIKE/ilike
+        prefix = q.strip().lower()
+        upper = prefix + "\uffff"
+        query = query.filter(or_(*(
+            and_(func.lower(column) >= prefix, func.lower(column) < upper)
+            for column in (User.username, User.first_name, User.surname, User.email)
+        )))
+
+    total = query.with_entities(func.count(User.id)).scalar()
+
+    if cursor is not None:
+        query = query.filter(User.id > cursor)
+
+    # Fetch one extra row to know if there is another page
+    users = query.order_by(User.id).limit(limit + 1).all()
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
+    response.headers["X-Total-Count"] = str(total)
     return users
 
 
@@ -214,7 +441,7 @@ async def reset_password(
     Requires teacher role to reset other users' passwords
     """
     # Find user
-    user = db.query(User).filter(User.username == username).first()
+    user = await run_in_threadpool(db.query(User).filter(User.username == username).first)
     
     if not user:
         raise HTTPException(
@@ -230,8 +457,9 @@ async def reset_password(
         )
     
     # Update password
-    user.password_hash = get_password_hash(password_data.new_password)
-    db.commit()
+    user.password_hash = await password_hasher.hash(password_data.new_password)
+    await run_in_threadpool(db.commit)
+    invalidate_user(username, current_user.tenant)
     
     return {
         "message": f"Password reset successfully for {username}",
@@ -240,7 +468,7 @@ async def reset_password(
 
 
 @router.delete("/users/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -270,7 +498,9 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
+    username = user.username
     db.delete(user)
     db.commit()
+    invalidate_user(username, current_user.tenant)
     
     return {"message": "User deleted successfully", "success": True}
\ No newline at end of file
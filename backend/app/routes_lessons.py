@@ -1,24 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 from datetime import datetime
+import csv
 import json
+import os
 from .database import get_db
-from .models import Subject, Lesson, Quiz, DeletedItem, User
-from .schemas import SubjectCreate, SubjectResponse, LessonCreate, LessonResponse
+from .models import Subject, Lesson, Quiz, DeletedItem, User, subject_name_key
+from .schemas import SubjectCreate, SubjectResponse, SubjectBundle, LessonCreate, LessonResponse, LessonSearchHit, LessonSegmentPage, CurriculumImportResult
 from .routes_auth import get_current_user
+from .catalog import bump_catalog_version, catalog_cache_headers, catalog_response
+from .curriculum import CurriculumImport, CurriculumTooLarge
+from .routes_sync import add_tombstone
+from .search import SEARCH_MAX_PAGE_SIZE, search_lessons
+from .segments import SEGMENTS_MAX_PAGE_SIZE, lesson_segments, segment_items, segment_spans
 
 router = APIRouter(prefix="/lessons", tags=["Lessons"])
 
+# Lesson listings (GET /lessons/)
+LESSON_FIELDS = ("id", "topic_id", "title", "content", "duration", "order", "created_at")
+# Characters of content kept in summary=true listings
+LESSON_SUMMARY_CHARS = int(os.getenv("LESSON_SUMMARY_CHARS", "120"))
+LESSONS_MAX_PAGE_SIZE = 500
+
+# Response models, used to serialize cached catalog responses
+SUBJECT_LIST = TypeAdapter(List[SubjectResponse])
+SUBJECT_ONE = TypeAdapter(SubjectResponse)
+SUBJECT_BUNDLE = TypeAdapter(SubjectBundle)
+LESSON_LIST = TypeAdapter(List[LessonResponse])
+
 # ==================== SUBJECT ROUTES ====================
 
 @router.get("/subjects", response_model=List[SubjectResponse])
-async def get_subjects(db: Session = Depends(get_db)):
-    return db.query(Subject).filter(Subject.is_deleted == False).all()
+def get_subjects(
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    def build():
+        return db.query(Subject).filter(Subject.is_deleted == False).all(), {}
+
+    return catalog_response(request, cache_headers, build, SUBJECT_LIST)
 
 
 @router.get("/subjects/trash", response_model=List[SubjectResponse])
-async def get_trash_subjects(
+def get_trash_subjects(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -29,24 +59,76 @@ async def get_trash_subjects(
 
 
 @router.get("/subjects/{subject_id}", response_model=SubjectResponse)
-async def get_subject(subject_id: int, db: Session = Depends(get_db)):
-    subject = db.query(Subject).filter(
-        Subject.id == subject_id,
+def get_subject(
+    subject_id: int,
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    def build():
+        subject = db.query(Subject).filter(
+            Subject.id == subject_id,
+            Subject.is_deleted == False
+        ).first()
+
+        if not subject:
+            raise HTTPException(status_code=404, detail="Subject not found")
+
+        return subject, {}
+
+    return catalog_response(request, cache_headers, build, SUBJECT_ONE)
+
+
+def check_name_free(db: Session, name_key: str):
+    """
+    Live subject names are unique (case and spacing ignored) so a spoken name finds one subject
+    """
+    taken = db.query(Subject.id).filter(
+        Subject.name_key == name_key,
         Subject.is_deleted == False
     ).first()
 
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
+    if taken:
+        raise HTTPException(status_code=400, detail="A subject with this name already exists")
 
-    return subject
+
+@router.get("/subjects/{subject_id}/bundle", response_model=SubjectBundle)
+def get_subject_bundle(
+    subject_id: int,
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    """
+    The subject with its lessons (in order) and each lesson's quizzes, in one response
+    Three queries however many lessons there are: subject, lessons, quizzes
+    """
+    def build():
+        subject = db.query(Subject).options(
+            # Same trash filter as every other catalog read
+            selectinload(Subject.lessons.and_(Lesson.is_deleted == False))
+            .selectinload(Lesson.quizzes.and_(Quiz.is_deleted == False))
+        ).filter(
+            Subject.id == subject_id,
+            Subject.is_deleted == False
+        ).first()
+
+        if not subject:
+            raise HTTPException(status_code=404, detail="Subject not found")
+
+        return subject, {}
+
+    return catalog_response(request, cache_headers, build, SUBJECT_BUNDLE)
 
 
 @router.post("/subjects", response_model=SubjectResponse, status_code=201)
-async def create_subject(
+def create_subject(
     subject_data: SubjectCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    check_name_free(db, subject_name_key(subject_data.name))
+
     subject = Subject(
         name=subject_data.name,
         description=subject_data.description or "",
@@ -54,13 +136,27 @@ async def create_subject(
         is_deleted=False
     )
     db.add(subject)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(subject)
     return subject
 
 
+def cascade_trash(db: Session, subject_id: int, is_deleted: bool):
+    """
+    Move a subject's lessons and their quizzes to or from the trash with it
+    Two set-based UPDATEs, no matter how many rows (updated_at moves too, for delta sync)
+    """
+    db.query(Lesson).filter(Lesson.topic_id == subject_id).update(
+        {Lesson.is_deleted: is_deleted}, synchronize_session=False
+    )
+    db.query(Quiz).filter(
+        Quiz.lesson_id.in_(select(Lesson.id).where(Lesson.topic_id == subject_id))
+    ).update({Quiz.is_deleted: is_deleted}, synchronize_session=False)
+
+
 @router.delete("/subjects/{subject_id}")
-async def delete_subject(
+def delete_subject(
     subject_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -78,13 +174,15 @@ async def delete_subject(
 
     subject.is_deleted = True
     subject.deleted_at = datetime.utcnow()
+    cascade_trash(db, subject_id, True)
+    bump_catalog_version(db)
     db.commit()
 
     return {"success": True, "message": "Subject moved to trash"}
 
 
 @router.post("/subjects/{subject_id}/undo")
-async def restore_subject(
+def restore_subject(
     subject_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -97,58 +195,211 @@ async def restore_subject(
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
+    if subject.name_key is not None:
+        check_name_free(db, subject.name_key)
+
     subject.is_deleted = False
     subject.deleted_at = None
+    cascade_trash(db, subject_id, False)
+    bump_catalog_version(db)
     db.commit()
 
     return {"success": True, "message": "Subject restored"}
 
 
+# ==================== CURRICULUM IMPORT ====================
+
+@router.post("/import", response_model=CurriculumImportResult)
+async def import_curriculum(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import whole subjects with their lessons and quizzes at once (teachers only)
+    Body is JSON (array of subjects or NDJSON) or CSV (Content-Type: text/csv),
+    see curriculum.py for the layout. The body is parsed as it arrives and
+    valid items are created in one transaction; every item gets a result
+    with its new id
+    """
+    if current_user.role != "teacher":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only teachers can import curricula"
+        )
+
+    curriculum = CurriculumImport(is_csv="csv" in request.headers.get("content-type", ""))
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(curriculum.feed, chunk)
+        await run_in_threadpool(curriculum.close)
+    except CurriculumTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read curriculum: {e}"
+        )
+
+    await run_in_threadpool(curriculum.save, db, current_user.id)
+    return curriculum.summary()
+
+
 # ==================== LESSON ROUTES ====================
 # ⚠️ CRITICAL: Route order matters! Specific routes BEFORE generic ones
 
 # ✅ SPECIFIC routes first (with literal path segments like "by-subject")
 @router.get("/by-subject/{subject_id}", response_model=List[LessonResponse])
-async def get_lessons_by_subject(
+def get_lessons_by_subject(
     subject_id: int,
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
     db: Session = Depends(get_db)
 ):
     """
     Get all lessons for a specific subject
     """
-    subject = db.query(Subject).filter(
-        Subject.id == subject_id,
-        Subject.is_deleted == False
-    ).first()
+    def build():
+        subject = db.query(Subject).filter(
+            Subject.id == subject_id,
+            Subject.is_deleted == False
+        ).first()
 
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
+        if not subject:
+            raise HTTPException(status_code=404, detail="Subject not found")
+
+        return db.query(Lesson).filter(Lesson.topic_id == subject_id).all(), {}
 
-    return db.query(Lesson).filter(Lesson.topic_id == subject_id).all()
+    return catalog_response(request, cache_headers, build, LESSON_LIST)
+
+
+@router.get("/search", response_model=List[LessonSearchHit])
+def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    subject_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over lesson titles and content, best match first
+    X-Search-Match says whether the hits contain all of the words or, when no
+    lesson does, any of them; pass X-Next-Cursor back as cursor= for more
+    The cursor is "<match>:<offset>", so later pages keep the first page's mode
+    """
+    offset, cursor_match = 0, None
+    if cursor:
+        cursor_match, _, offset_text = cursor.rpartition(":")
+        try:
+            offset = int(offset_text)
+        except ValueError:
+            offset = -1
+        if offset < 0 or cursor_match not in ("", "all", "any"):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # A bare offset (older clients) continues an 'all' search
+        cursor_match = cursor_match or "all"
+
+    def build():
+        hits, match = search_lessons(db, q, limit + 1, offset, subject_id, cursor_match)
+        headers = {"X-Search-Match": match}
+        if len(hits) > limit:
+            hits = hits[:limit]
+            headers["X-Next-Cursor"] = f"{match}:{offset + limit}"
+        return hits, headers
+
+    return catalog_response(request, cache_headers, build)
 
 
 # ✅ ROOT routes AFTER specific routes
 @router.get("/", response_model=List[LessonResponse])
-async def get_all_lessons(
+def get_all_lessons(
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
     topic_id: int = None,
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=LESSONS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    fields: Optional[str] = None
 ):
     """
     Get all lessons, optionally filtered by topic_id
+    Listing screens should ask for summary=true (content cut to a short preview)
+    or only the fields they show, e.g. fields=id,topic_id,title
+    Pages are ordered by (topic_id, order, id); pass the X-Next-Cursor header
+    back as cursor= for the next page (stays fast at any depth, unlike skip)
     """
-    query = db.query(Lesson)
-    
-    if topic_id:
-        query = query.filter(Lesson.topic_id == topic_id)
-    
-    lessons = query.offset(skip).limit(limit).all()
-    return lessons
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in LESSON_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown lesson fields: {', '.join(unknown)}"
+            )
+    else:
+        selected = list(LESSON_FIELDS)
+
+    after = ()
+    if cursor:
+        try:
+            after = tuple(int(part) for part in cursor.split(":"))
+        except ValueError:
+            after = ()
+        if len(after) != 3:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def build():
+        # Key columns are always read for the cursor, and only returned if selected
+        names = list(dict.fromkeys(["topic_id", "order", "id"] + selected))
+        columns = [getattr(Lesson, name) for name in names]
+        query = db.query(*columns).filter(Lesson.is_deleted == False).order_by(
+            Lesson.topic_id, Lesson.order, Lesson.id
+        )
+
+        if topic_id:
+            query = query.filter(Lesson.topic_id == topic_id)
+
+        if after:
+            if topic_id:
+                # Equality on topic_id plus a range on (order, id) keeps it one index seek
+                query = query.filter(tuple_(Lesson.order, Lesson.id) > after[1:])
+            else:
+                query = query.filter(tuple_(Lesson.topic_id, Lesson.order, Lesson.id) > after)
+        elif skip:
+            query = query.offset(skip)
+
+        rows = query.limit(limit + 1).all()
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            headers["X-Next-Cursor"] = f"{last.topic_id}:{last.order}:{last.id}"
+
+        # Plain dicts straight to JSON - skips building ORM objects and pydantic models
+        lessons = []
+        for row in rows:
+            item = {name: getattr(row, name) for name in selected}
+            # Content is stored compressed, so the preview is cut after decompressing
+            if summary and item.get("content") is not None:
+                item["content"] = item["content"][:LESSON_SUMMARY_CHARS]
+            if item.get("created_at") is not None:
+                item["created_at"] = item["created_at"].isoformat()
+            lessons.append(item)
+        return lessons, headers
+
+    return catalog_response(request, cache_headers, build)
 
 
 @router.post("/", response_model=LessonResponse, status_code=201)
-async def create_lesson(
+def create_lesson(
     lesson_data: LessonCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -168,19 +419,89 @@ async def create_lesson(
         topic_id=lesson_data.topic_id,
         title=lesson_data.title,
         content=lesson_data.content,
+        segments=lesson_segments(lesson_data.content),
         duration=lesson_data.duration or "15 min",
         order=lesson_data.order or 0
     )
 
     db.add(lesson)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(lesson)
     return lesson
 
 
 # ✅ DYNAMIC routes with {id} LAST
+def get_live_lesson(db: Session, lesson_id: int):
+    """
+    Title, content and stored segments of a lesson that is not in the trash
+    """
+    lesson = db.query(Lesson.title, Lesson.content, Lesson.segments).filter(
+        Lesson.id == lesson_id,
+        Lesson.is_deleted == False
+    ).first()
+
+    if not lesson:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+
+    return lesson
+
+
+@router.get("/{lesson_id}/segments", response_model=LessonSegmentPage)
+def get_lesson_segments(
+    lesson_id: int,
+    request: Request,
+    start: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=SEGMENTS_MAX_PAGE_SIZE),
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    """
+    A page of the lesson's sentences, in reading order, from segment index start
+    Players speak each segment as it comes and resume later with start=<index>
+    """
+    def build():
+        lesson = get_live_lesson(db, lesson_id)
+        spans = segment_spans(lesson.content, lesson.segments)
+        return {
+            "lesson_id": lesson_id,
+            "title": lesson.title,
+            "total": len(spans),
+            "start": start,
+            "segments": segment_items(lesson.content, spans, start, limit),
+        }, {}
+
+    return catalog_response(request, cache_headers, build)
+
+
+@router.get("/{lesson_id}/segments/stream")
+def stream_lesson_segments(
+    lesson_id: int,
+    start: int = Query(0, ge=0),
+    cache_headers: dict = Depends(catalog_cache_headers),
+    db: Session = Depends(get_db)
+):
+    """
+    All segments from index start on as NDJSON, one segment per line, so a
+    player can start speaking the first sentence before the rest has arrived
+    X-Segment-Count holds the total number of segments of the lesson
+    """
+    lesson = get_live_lesson(db, lesson_id)
+    spans = segment_spans(lesson.content, lesson.segments)
+    items = segment_items(lesson.content, spans, start)
+
+    def lines():
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+    # GZipMiddleware holds chunks back in its compressor until the end; a set
+    # Content-Encoding makes it pass each line through as soon as it is yielded
+    headers = {**cache_headers, "X-Segment-Count": str(len(spans)), "Content-Encoding": "identity"}
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+
 @router.delete("/{lesson_id}")
-async def delete_lesson(
+def delete_lesson(
     lesson_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -193,6 +514,11 @@ async def delete_lesson(
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
 
+    # Its quizzes go with it (cascade) - offline copies must drop them too
+    for quiz in lesson.quizzes:
+        add_tombstone(db, "quiz", quiz, current_user.id)
+    add_tombstone(db, "lesson", lesson, current_user.id)
     db.delete(lesson)
+    bump_catalog_version(db)
     db.commit()
     return {"success": True, "message": "Lesson deleted"}
\ No newline at end of file
@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 from .database import get_db
-from .models import StudentProgress, User, Lesson, Topic, Subject
-from .schemas import ProgressResponse, StudentProgressReport
+from .models import StudentProgress, ProgressSummary, User, Lesson, Topic, Subject
+from .schemas import ProgressResponse, ProgressSubmit, StudentProgressReport
 from .auth import get_current_active_user
+from .write_queue import WriteBehindQueue
+from .tenancy import get_write_queue
+from .archive import is_completed, retaken_totals
 
 router = APIRouter(prefix="/progress", tags=["Progress Tracking"])
 
 
 @router.get("/my-progress", response_model=List[ProgressResponse])
-async def get_my_progress(
+def get_my_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -32,7 +37,7 @@ async def get_my_progress(
 
 
 @router.get("/lesson/{lesson_id}", response_model=ProgressResponse)
-async def get_lesson_progress(
+def get_lesson_progress(
     lesson_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -61,13 +66,15 @@ async def get_lesson_progress(
 
 
 @router.post("/start-lesson/{lesson_id}")
-async def start_lesson(
+def start_lesson(
     lesson_id: int,
     db: Session = Depends(get_db),
+    write_queue: WriteBehindQueue = Depends(get_write_queue),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Mark that student has started a lesson
+    The insert goes through the write queue and is committed with other writes
     """
     if current_user.role != "student":
         raise HTTPException(
@@ -76,80 +83,143 @@ async def start_lesson(
         )
     
     # Check if lesson exists
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = db.query(Lesson.id).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Lesson with ID {lesson_id} does not exist!"
         )
-    
-    # Check if progress already exists
-    existing = db.query(StudentProgress).filter(
-        StudentProgress.student_id == current_user.id,
-        StudentProgress.lesson_id == lesson_id
-    ).first()
-    
-    if existing:
-        # Just update last_accessed
-        existing.last_accessed = datetime.utcnow()
-        db.commit()
-        return {"message": "Lesson progress updated!", "progress": existing}
-    
-    # Create new progress
-    progress = StudentProgress(
-        student_id=current_user.id,
-        lesson_id=lesson_id,
-        is_completed=False
-    )
-    
-    db.add(progress)
-    db.commit()
-    db.refresh(progress)
-    
-    return {"message": "Lesson has started!", "progress": progress}
 
+    student_id = current_user.id
 
-@router.get("/report", response_model=StudentProgressReport)
-async def get_progress_report(
+    def insert_if_missing(writer_db: Session):
+        # Keeps an existing score - starting again only re-reads it
+        writer_db.execute(
+            sqlite_insert(StudentProgress)
+            .values(student_id=student_id, lesson_id=lesson_id, score=0,
+                    total_questions=0, percentage=0, completed_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["student_id", "lesson_id"])
+        )
+        progress = writer_db.query(StudentProgress).filter(
+            StudentProgress.student_id == student_id,
+            StudentProgress.lesson_id == lesson_id
+        ).first()
+        return ProgressResponse.model_validate(progress, from_attributes=True)
+
+    return {
+        "message": "Lesson has started!",
+        "progress": write_queue.write(insert_if_missing)
+    }
+
+
+@router.post("/submit", response_model=ProgressResponse, status_code=status.HTTP_201_CREATED)
+def submit_progress(
+    progress_data: ProgressSubmit,
     db: Session = Depends(get_db),
+    write_queue: WriteBehindQueue = Depends(get_write_queue),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get detailed progress report for student
+    Save a quiz result for the current student (one row per lesson, latest result wins)
+    Writes are group-committed by the write queue; the response is only sent
+    after the commit, so the student's next read already sees it
     """
     if current_user.role != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only students can get progress report!"
+            detail="Only students can save progress!"
         )
-    
-    # Get all progress
-    all_progress = db.query(StudentProgress).filter(
-        StudentProgress.student_id == current_user.id
+
+    if progress_data.total_questions < 0 or not 0 <= progress_data.score <= progress_data.total_questions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Score must be between 0 and total_questions"
+        )
+
+    lesson = db.query(Lesson.id).filter(Lesson.id == progress_data.lesson_id).first()
+    if not lesson:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lesson with ID {progress_data.lesson_id} does not exist!"
+        )
+
+    values = {
+        "student_id": current_user.id,
+        "lesson_id": progress_data.lesson_id,
+        "score": progress_data.score,
+        "total_questions": progress_data.total_questions,
+        "percentage": round(progress_data.score / progress_data.total_questions * 100)
+        if progress_data.total_questions else 0,
+        "completed_at": datetime.utcnow(),
+    }
+
+    def upsert(writer_db: Session):
+        statement = sqlite_insert(StudentProgress).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["student_id", "lesson_id"],
+            set_={key: statement.excluded[key] for key in
+                  ("score", "total_questions", "percentage", "completed_at")}
+        ).returning(StudentProgress.id)
+        return writer_db.execute(statement).scalar()
+
+    progress_id = write_queue.write(upsert)
+    return {"id": progress_id, **values}
+
+
+def build_report(db: Session, student) -> dict:
+    """
+    Combine the archived totals (one summary row) with the student's hot progress rows
+    """
+    hot = db.query(StudentProgress).filter(
+        StudentProgress.student_id == student.id
     ).all()
-    
-    total_lessons_started = len(all_progress)
-    completed_lessons = len([p for p in all_progress if p.is_completed])
-    total_quiz_attempts = sum([p.quiz_attempts for p in all_progress])
-    
-    # Calculate average score
-    scores = [p.quiz_score for p in all_progress if p.quiz_score is not None]
-    average_score = sum(scores) / len(scores) if scores else 0
-    
+    summary = db.get(ProgressSummary, student.id)
+
+    completed = [p for p in hot if is_completed(p)]
+    # Archived lessons the student took again count with their hot row only
+    retaken_started, retaken_completed, retaken_percentage = retaken_totals(db, student.id).get(student.id, (0, 0, 0))
+    archived_started = (summary.lessons_started if summary else 0) - retaken_started
+    archived_completed = (summary.lessons_completed if summary else 0) - retaken_completed
+    percentage_sum = (sum(p.percentage or 0 for p in completed)
+                      + (summary.percentage_sum if summary else 0) - retaken_percentage)
+
+    total_lessons_started = len(hot) + archived_started
+    completed_lessons = len(completed) + archived_completed
+    average_score = percentage_sum / completed_lessons if completed_lessons else 0
+
     return {
-        "student_id": current_user.id,
-        "student_name": f"{current_user.first_name} {current_user.surname}",
+        "student_id": student.id,
+        "student_name": f"{student.first_name} {student.surname}",
         "total_lessons_started": total_lessons_started,
         "completed_lessons": completed_lessons,
         "completion_rate": (completed_lessons / total_lessons_started * 100) if total_lessons_started > 0 else 0,
         "average_score": round(average_score, 2),
-        "total_quiz_attempts": total_quiz_attempts,
-        "lessons": all_progress
+        # Every completed row is one scored quiz attempt
+        "total_quiz_attempts": completed_lessons,
+        "archived_lessons": archived_started,
+        "lessons": hot
     }
 
 
+@router.get("/report", response_model=StudentProgressReport)
+def get_progress_report(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get detailed progress report for student
+    """
+    if current_user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can get progress report!"
+        )
+    
+    return build_report(db, current_user)
+
+
 @router.get("/students/{student_id}/report", response_model=StudentProgressReport)
-async def get_student_report(
+def get_student_report(
     student_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -171,37 +241,17 @@ async def get_student_report(
             detail=f"Student with ID {student_id} does not exist!"
         )
     
-    # Get student progress
-    all_progress = db.query(StudentProgress).filter(
-        StudentProgress.student_id == student_id
-    ).all()
-    
-    total_lessons_started = len(all_progress)
-    completed_lessons = len([p for p in all_progress if p.is_completed])
-    total_quiz_attempts = sum([p.quiz_attempts for p in all_progress])
-    
-    scores = [p.quiz_score for p in all_progress if p.quiz_score is not None]
-    average_score = sum(scores) / len(scores) if scores else 0
-    
-    return {
-        "student_id": student.id,
-        "student_name": f"{student.first_name} {student.surname}",
-        "total_lessons_started": total_lessons_started,
-        "completed_lessons": completed_lessons,
-        "completion_rate": (completed_lessons / total_lessons_started * 100) if total_lessons_started > 0 else 0,
-        "average_score": round(average_score, 2),
-        "total_quiz_attempts": total_quiz_attempts,
-        "lessons": all_progress
-    }
+    return build_report(db, student)
 
 
 @router.get("/all-students")
-async def get_all_students_progress(
+def get_all_students_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get progress summary for all students (Teachers only)
+    Grouped queries instead of one progress query per student
     """
     if current_user.role != "teacher":
         raise HTTPException(
@@ -211,28 +261,42 @@ async def get_all_students_progress(
     
     # Get all students
     students = db.query(User).filter(User.role == "student").all()
-    
+
+    completed = case((StudentProgress.total_questions > 0, 1), else_=0)
+    hot_totals = {
+        row.student_id: row for row in db.query(
+            StudentProgress.student_id,
+            func.count(StudentProgress.id).label("started"),
+            func.sum(completed).label("completed"),
+            func.sum(completed * func.coalesce(StudentProgress.percentage, 0)).label("percentage_sum")
+        ).group_by(StudentProgress.student_id)
+    }
+    summaries = {summary.student_id: summary for summary in db.query(ProgressSummary)}
+    retaken = retaken_totals(db)
+
     reports = []
     for student in students:
-        progress = db.query(StudentProgress).filter(
-            StudentProgress.student_id == student.id
-        ).all()
-        
-        total_started = len(progress)
-        completed = len([p for p in progress if p.is_completed])
-        scores = [p.quiz_score for p in progress if p.quiz_score is not None]
-        avg_score = sum(scores) / len(scores) if scores else 0
+        hot = hot_totals.get(student.id)
+        summary = summaries.get(student.id)
+        retaken_started, retaken_completed, retaken_percentage = retaken.get(student.id, (0, 0, 0))
+        total_started = ((hot.started if hot else 0) + (summary.lessons_started if summary else 0)
+                         - retaken_started)
+        total_completed = ((hot.completed if hot else 0) + (summary.lessons_completed if summary else 0)
+                           - retaken_completed)
+        percentage_sum = ((hot.percentage_sum if hot else 0) + (summary.percentage_sum if summary else 0)
+                          - retaken_percentage)
+        avg_score = percentage_sum / total_completed if total_completed else 0
         
         reports.append({
             "student_id": student.id,
             "student_name": f"{student.first_name} {student.surname}",
             "email": student.email,
             "lessons_started": total_started,
-            "lessons_completed": completed,
+            "lessons_completed": total_completed,
             "average_score": round(avg_score, 2)
         })
     
     return {
         "total_students": len(students),
         "students": reports
-    }
\ No newline at end of file
+    }
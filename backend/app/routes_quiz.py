@@ -1,7 +1,8 @@
 # ==================== COMPLETE routes_quiz.py ====================
 # This file handles ALL quiz operations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -9,14 +10,22 @@ from .database import get_db
 from .models import Quiz, Lesson
 from .schemas import QuizCreate, QuizResponse
 from .routes_auth import get_current_user
+from .catalog import bump_catalog_version, catalog_cache_headers, catalog_response
+from .routes_sync import add_tombstone
 from .models import User
 
 router = APIRouter(prefix="/quizzes", tags=["Quizzes"])
 
+# Response models, used to serialize cached catalog responses
+QUIZ_LIST = TypeAdapter(List[QuizResponse])
+QUIZ_ONE = TypeAdapter(QuizResponse)
+
 # ==================== QUIZ ROUTES ====================
 
 @router.get("/", response_model=List[QuizResponse])
-async def get_quizzes(
+def get_quizzes(
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
     lesson_id: int = None,
     db: Session = Depends(get_db)
 ):
@@ -24,36 +33,43 @@ async def get_quizzes(
     Get all quizzes
     Optional filter by lesson_id
     """
-    query = db.query(Quiz)
-    
-    if lesson_id:
-        query = query.filter(Quiz.lesson_id == lesson_id)
-    
-    quizzes = query.all()
-    return quizzes
+    def build():
+        query = db.query(Quiz).filter(Quiz.is_deleted == False)
+
+        if lesson_id:
+            query = query.filter(Quiz.lesson_id == lesson_id)
+
+        return query.all(), {}
+
+    return catalog_response(request, cache_headers, build, QUIZ_LIST)
 
 
 @router.get("/{quiz_id}", response_model=QuizResponse)
-async def get_quiz(
+def get_quiz(
     quiz_id: int,
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
     db: Session = Depends(get_db)
 ):
     """
     Get specific quiz by ID
     """
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
-    
-    if not quiz:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Quiz not found"
-        )
-    
-    return quiz
+    def build():
+        quiz = db.query(Quiz).filter(Quiz.id == quiz_id, Quiz.is_deleted == False).first()
+
+        if not quiz:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Quiz not found"
+            )
+
+        return quiz, {}
+
+    return catalog_response(request, cache_headers, build, QUIZ_ONE)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=QuizResponse)
-async def create_quiz(
+def create_quiz(
     quiz_data: QuizCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -63,7 +79,10 @@ async def create_quiz(
     Requires authentication
     """
     # Verify lesson exists
-    lesson = db.query(Lesson).filter(Lesson.id == quiz_data.lesson_id).first()
+    lesson = db.query(Lesson).filter(
+        Lesson.id == quiz_data.lesson_id,
+        Lesson.is_deleted == False
+    ).first()
     
     if not lesson:
         raise HTTPException(
@@ -89,6 +108,7 @@ async def create_quiz(
     )
     
     db.add(new_quiz)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(new_quiz)
     
@@ -96,7 +116,7 @@ async def create_quiz(
 
 
 @router.put("/{quiz_id}", response_model=QuizResponse)
-async def update_quiz(
+def update_quiz(
     quiz_id: int,
     quiz_data: QuizCreate,
     db: Session = Depends(get_db),
@@ -128,6 +148,7 @@ async def update_quiz(
     quiz.option_d = quiz_data.option_d
     quiz.correct_answer = quiz_data.correct_answer.upper()
     
+    bump_catalog_version(db)
     db.commit()
     db.refresh(quiz)
     
@@ -135,7 +156,7 @@ async def update_quiz(
 
 
 @router.delete("/{quiz_id}")
-async def delete_quiz(
+def delete_quiz(
     quiz_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -151,7 +172,9 @@ async def delete_quiz(
             detail="Quiz not found"
         )
     
+    add_tombstone(db, "quiz", quiz, current_user.id)
     db.delete(quiz)
+    bump_catalog_version(db)
     db.commit()
     
     return {
@@ -161,20 +184,28 @@ async def delete_quiz(
 
 
 @router.get("/lessons/{lesson_id}", response_model=List[QuizResponse])
-async def get_quizzes_by_lesson(
+def get_quizzes_by_lesson(
     lesson_id: int,
+    request: Request,
+    cache_headers: dict = Depends(catalog_cache_headers),
     db: Session = Depends(get_db)
 ):
     """
     Get all quizzes for a specific lesson
     """
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    
-    if not lesson:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lesson not found"
-        )
-    
-    quizzes = db.query(Quiz).filter(Quiz.lesson_id == lesson_id).all()
-    return quizzes
\ No newline at end of file
+    def build():
+        lesson = db.query(Lesson.id).filter(
+            Lesson.id == lesson_id,
+            Lesson.is_deleted == False
+        ).first()
+
+        if not lesson:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lesson not found"
+            )
+
+        # Quizzes share their lesson's trash state
+        return db.query(Quiz).filter(Quiz.lesson_id == lesson_id).all(), {}
+
+    return catalog_response(request, cache_headers, build, QUIZ_LIST)
\ No newline at end of file
@@ -0,0 +1,131 @@
+# ==================== routes_sync.py ====================
+# Delta sync for offline clients (the desktop app's offline_lessons.db)
+# GET /sync/changes?since=<cursor> returns the subjects, lessons and quizzes
+# changed after the cursor plus the ids deleted since then, and a new cursor.
+# Changes come from updated_at on the catalog tables; trashed subjects (and
+# their lessons and quizzes) are is_deleted rows, deleted lessons/quizzes leave
+# a DeletedItem tombstone. Tombstones are purged after TRASH_RETENTION_DAYS
+# (purge.py), so an older cursor gets a full copy with reset=true.
+#
+# The cursor is "<catalog version>:<microseconds since 1970>". When the
+# catalog version has not moved the answer is empty and comes straight from
+# the cached version - no database query.
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import LargeBinary
+from sqlalchemy.orm import Session
+
+from .catalog import EPOCH, catalog_versions
+from .database import get_db
+from .models import Subject, Lesson, Quiz, DeletedItem
+from .purge import retention_cutoff
+from .schemas import SyncChanges
+from .tenancy import get_shard
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+# Rows changed this recently are sent again on the next sync, so a write that
+# took its timestamp before a slower concurrent commit is never skipped
+SYNC_LAG_SECONDS = float(os.getenv("SYNC_LAG_SECONDS", "5"))
+
+
+def make_cursor(version: int, moment: datetime) -> str:
+    return f"{version}:{(moment - EPOCH) // timedelta(microseconds=1)}"
+
+
+def parse_cursor(cursor: str) -> tuple:
+    try:
+        version, micros = (int(part) for part in cursor.split(":"))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor"
+        )
+    return version, EPOCH + timedelta(microseconds=micros)
+
+
+def add_tombstone(db: Session, item_type: str, item, teacher_id: int):
+    """
+    Record a hard-deleted lesson or quiz so offline clients drop it on their next sync
+    """
+    data = {
+        column.name: getattr(item, column.name)
+        for column in item.__table__.columns
+        # Derived binary data (lesson segments) can be recomputed from the content
+        if not isinstance(column.type, LargeBinary)
+    }
+    db.add(DeletedItem(
+        item_type=item_type,
+        item_id=item.id,
+        teacher_id=teacher_id,
+        item_data=json.dumps(data, default=str)
+    ))
+
+
+# ==================== SYNC ROUTES ====================
+
+@router.get("/changes", response_model=SyncChanges)
+def get_changes(
+    request: Request,
+    since: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Catalog changes since the cursor (everything when since is missing)
+    Clients apply deleted ids first, then upsert the rows, then store the cursor
+    reset=true means the client's copy cannot be patched (e.g. the server was
+    restored from a backup) - drop the local catalog and keep this full copy
+    """
+    version, _ = catalog_versions.get(get_shard(request))
+    now = datetime.utcnow()
+    reset = False
+    since_at = None
+
+    if since:
+        since_version, since_at = parse_cursor(since)
+        if since_version == version:
+            # Nothing written since the last sync
+            return {"cursor": since}
+        if since_version > version or since_at < retention_cutoff():
+            reset, since_at = True, None
+
+    horizon = now - timedelta(seconds=SYNC_LAG_SECONDS)
+    cursor = make_cursor(version, max(horizon, since_at) if since_at else horizon)
+
+    subjects = db.query(Subject)
+    lessons = db.query(Lesson)
+    quizzes = db.query(Quiz)
+    if since_at is None:
+        return {
+            "cursor": cursor,
+            "reset": reset,
+            "subjects": subjects.filter(Subject.is_deleted == False).all(),
+            "lessons": lessons.filter(Lesson.is_deleted == False).all(),
+            "quizzes": quizzes.filter(Quiz.is_deleted == False).all(),
+        }
+
+    changed_subjects = subjects.filter(Subject.updated_at > since_at).all()
+    changed_lessons = lessons.filter(Lesson.updated_at > since_at).all()
+    changed_quizzes = quizzes.filter(Quiz.updated_at > since_at).all()
+    tombstones = db.query(DeletedItem.item_type, DeletedItem.item_id).filter(
+        DeletedItem.deleted_at > since_at,
+        DeletedItem.item_type.in_(("lesson", "quiz"))
+    ).all()
+    return {
+        "cursor": cursor,
+        "subjects": [subject for subject in changed_subjects if not subject.is_deleted],
+        "lessons": [lesson for lesson in changed_lessons if not lesson.is_deleted],
+        "quizzes": [quiz for quiz in changed_quizzes if not quiz.is_deleted],
+        "deleted": {
+            "subjects": [subject.id for subject in changed_subjects if subject.is_deleted],
+            "lessons": [lesson.id for lesson in changed_lessons if lesson.is_deleted]
+                       + [item_id for item_type, item_id in tombstones if item_type == "lesson"],
+            "quizzes": [quiz.id for quiz in changed_quizzes if quiz.is_deleted]
+                       + [item_id for item_type, item_id in tombstones if item_type == "quiz"],
+        },
+    }
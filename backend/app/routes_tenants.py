@@ -0,0 +1,69 @@
+# ==================== routes_tenants.py ====================
+# Cross-school admin views - each query runs on every school database in parallel
+
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import User, Subject, Lesson, StudentProgress
+from .routes_auth import get_current_user
+from .tenancy import DEFAULT_TENANT, shard_registry
+
+router = APIRouter(prefix="/tenants", tags=["Schools"])
+
+# Usernames (comma-separated) of the default school allowed to look across
+# schools - anyone can register as a teacher, so the role alone is not enough
+PLATFORM_ADMINS = {
+    name.strip() for name in os.getenv("PLATFORM_ADMINS", "").split(",") if name.strip()
+}
+
+
+def require_platform_admin(current_user: User = Depends(get_current_user)):
+    """
+    Only the PLATFORM_ADMINS accounts of the default (hosting) school may look across schools
+    """
+    if current_user.tenant != DEFAULT_TENANT or current_user.username not in PLATFORM_ADMINS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only platform administrators can view all schools!"
+        )
+    return current_user
+
+
+def school_counts(db: Session) -> dict:
+    return {
+        "teachers": db.query(func.count(User.id)).filter(User.role == "teacher").scalar(),
+        "students": db.query(func.count(User.id)).filter(User.role == "student").scalar(),
+        "subjects": db.query(func.count(Subject.id)).filter(Subject.is_deleted == False).scalar(),
+        "lessons": db.query(func.count(Lesson.id)).filter(Lesson.is_deleted == False).scalar(),
+        "progress_rows": db.query(func.count(StudentProgress.id)).scalar(),
+    }
+
+
+# ==================== SCHOOL ROUTES ====================
+
+@router.get("/")
+def get_tenants(current_user: User = Depends(require_platform_admin)):
+    """
+    List every school with a database
+    """
+    return {"tenants": shard_registry.tenants(), "registry": shard_registry.stats()}
+
+
+@router.get("/summary")
+def get_tenants_summary(current_user: User = Depends(require_platform_admin)):
+    """
+    User, catalog and progress counts for every school
+    """
+    counts = shard_registry.fan_out(school_counts)
+    totals = {}
+    for school in counts.values():
+        for key, value in school.items():
+            totals[key] = totals.get(key, 0) + value
+    return {
+        "total_schools": len(counts),
+        "totals": totals,
+        "schools": counts
+    }
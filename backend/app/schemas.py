@@ -35,6 +35,21 @@ class Token(BaseModel):
     token_type: str
     user: UserResponse
 
+class BulkRegisterRow(BaseModel):
+    """Result for one row of a bulk roster import"""
+    row: int
+    username: Optional[str] = None
+    status: str  # 'created' or 'error'
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkRegisterResult(BaseModel):
+    """Schema for bulk roster import response"""
+    total: int
+    created: int
+    failed: int
+    results: List[BulkRegisterRow]
+
 class PasswordReset(BaseModel):
     """Schema for password reset"""
     new_password: str
@@ -81,6 +96,31 @@ class LessonResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LessonSearchHit(BaseModel):
+    """One /lessons/search result - snippet marks the matched words with <b></b>"""
+    id: int
+    topic_id: int
+    subject_name: str
+    title: str
+    snippet: str
+    score: float  # higher is more relevant
+
+class LessonSegment(BaseModel):
+    """One sentence of a lesson - start/end are character offsets into its content"""
+    index: int
+    paragraph: int
+    start: int
+    end: int
+    text: str
+
+class LessonSegmentPage(BaseModel):
+    """Schema for GET /lessons/{id}/segments - segments from index start on"""
+    lesson_id: int
+    title: str
+    total: int
+    start: int
+    segments: List[LessonSegment]
+
 # ==================== QUIZ SCHEMAS ====================
 
 class QuizCreate(BaseModel):
@@ -104,10 +144,78 @@ class QuizResponse(BaseModel):
     option_d: str
     correct_answer: str
     created_at: datetime
-    
+
     class Config:
         from_attributes = True
 
+# ==================== SUBJECT BUNDLE SCHEMAS ====================
+
+class BundleLesson(LessonResponse):
+    """A lesson with its quiz questions"""
+    quizzes: List[QuizResponse] = []
+
+class SubjectBundle(SubjectResponse):
+    """Schema for /lessons/subjects/{id}/bundle - everything a student session needs"""
+    lessons: List[BundleLesson] = []
+
+# ==================== CURRICULUM IMPORT SCHEMAS ====================
+
+class CurriculumQuiz(BaseModel):
+    """One quiz question of an imported lesson"""
+    question: str
+    option_a: str
+    option_b: str
+    option_c: str
+    option_d: str
+    correct_answer: str  # 'A', 'B', 'C', or 'D'
+
+class CurriculumLesson(BaseModel):
+    """One imported lesson (quizzes are validated one by one)"""
+    title: str
+    content: str
+    duration: Optional[str] = "15 min"
+    order: Optional[int] = None  # defaults to its position in the subject
+    quizzes: List[dict] = []
+
+class CurriculumSubject(BaseModel):
+    """One imported subject - a new one by name, or an existing one by id"""
+    id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = ""
+    lessons: List[dict] = []
+
+class CurriculumImportItem(BaseModel):
+    """Result for one subject, lesson or quiz of a curriculum import"""
+    path: str  # e.g. subjects[0].lessons[2].quizzes[1] or row 7 (CSV)
+    kind: str  # 'subject', 'lesson' or 'quiz'
+    status: str  # 'created', 'existing' or 'error'
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class CurriculumImportResult(BaseModel):
+    """Schema for curriculum import response"""
+    total: int
+    created: int
+    failed: int
+    results: List[CurriculumImportItem]
+
+# ==================== SYNC SCHEMAS ====================
+
+class SyncDeleted(BaseModel):
+    """Ids removed since the cursor"""
+    subjects: List[int] = []
+    lessons: List[int] = []
+    quizzes: List[int] = []
+
+class SyncChanges(BaseModel):
+    """Schema for /sync/changes - apply deleted first, then the rows"""
+    cursor: str
+    reset: bool = False  # drop the local catalog before applying
+    subjects: List[SubjectResponse] = []
+    lessons: List[LessonResponse] = []
+    quizzes: List[QuizResponse] = []
+    deleted: SyncDeleted = SyncDeleted()
+
 # ==================== PROGRESS SCHEMAS ====================
 
 class ProgressCreate(BaseModel):
@@ -118,6 +226,12 @@ class ProgressCreate(BaseModel):
     total_questions: int
     percentage: Optional[int] = None
 
+class ProgressSubmit(BaseModel):
+    """Schema for a student saving their own quiz result"""
+    lesson_id: int
+    score: int
+    total_questions: int
+
 class ProgressResponse(BaseModel):
     """Schema for progress response"""
     id: int
@@ -135,9 +249,16 @@ class StudentProgressItem(BaseModel):
     score: int | None = None
 
 class StudentProgressReport(BaseModel):
+    """Progress report - totals include archived history, lessons only the recent rows"""
     student_id: int
-    username: str
-    progress: List[StudentProgressItem]
+    student_name: str
+    total_lessons_started: int
+    completed_lessons: int
+    completion_rate: float
+    average_score: float
+    total_quiz_attempts: int
+    archived_lessons: int = 0
+    lessons: List[ProgressResponse]
     
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,117 @@
+# search.py - Full-text lesson search (GET /lessons/search)
+# On SQLite the lessons_fts table (FTS5, migration 0007) indexes lesson titles
+# and content; triggers on the lessons table keep it up to date on every write.
+# Hits are ranked with BM25 (title matches count more than content matches)
+# and come with a snippet of the content around the matched words.
+import os
+import re
+from typing import Optional
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+
+from .models import Lesson, Subject
+
+SEARCH_MAX_PAGE_SIZE = 50
+# BM25 weight of a title match relative to a content match
+SEARCH_TITLE_WEIGHT = float(os.getenv("SEARCH_TITLE_WEIGHT", "10"))
+# Words of content around the matches in each snippet
+SEARCH_SNIPPET_WORDS = int(os.getenv("SEARCH_SNIPPET_WORDS", "16"))
+
+FTS_QUERY = f"""
+    SELECT lessons.id, lessons.topic_id, subjects.name AS subject_name, lessons.title,
+           snippet(lessons_fts, 1, '<b>', '</b>', '…', :words) AS snippet,
+           bm25(lessons_fts, :title_weight, 1.0) AS rank
+    FROM lessons_fts
+    JOIN lessons ON lessons.id = lessons_fts.rowid
+    JOIN subjects ON subjects.id = lessons.topic_id
+    WHERE lessons_fts MATCH :match AND subjects.is_deleted = 0 {{subject_filter}}
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def match_query(q: str, any_term: bool = False) -> Optional[str]:
+    """
+    FTS5 query for free text: every word quoted (so no word is read as
+    FTS5 syntax), the last one as a prefix, so "photosynth" already matches
+    None when q has no words at all
+    """
+    terms = [f'"{term}"' for term in re.findall(r"\w+", q.lower())]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return (" OR " if any_term else " ").join(terms)
+
+
+def search_lessons(db: Session, q: str, limit: int, offset: int = 0, subject_id: int = None, match: str = None):
+    """
+    Up to limit hits, best first, and how they matched:
+    'all' - every word is in the lesson
+    'any' - no lesson has them all, so lessons with some of them
+    Without match the mode is picked on the first page; later pages pass the
+    first page's mode back (the route keeps it in the cursor)
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return _search_like(db, q, limit, offset, subject_id), "all"
+
+    sql = text(FTS_QUERY.format(
+        subject_filter="AND lessons.topic_id = :subject_id" if subject_id else ""
+    ))
+    params = {
+        "words": SEARCH_SNIPPET_WORDS,
+        "title_weight": SEARCH_TITLE_WEIGHT,
+        "limit": limit,
+        "offset": offset,
+        "subject_id": subject_id,
+    }
+    rows = []
+    for mode in (match,) if match else ("all", "any"):
+        words = match_query(q, any_term=mode == "any")
+        if words is None:
+            break
+        rows = db.execute(sql, dict(params, match=words)).mappings().all()
+        if rows or match or offset or " " not in words:
+            break
+    return [
+        {
+            "id": row["id"],
+            "topic_id": row["topic_id"],
+            "subject_name": row["subject_name"],
+            "title": row["title"],
+            "snippet": row["snippet"],
+            # bm25() is lower-is-better; flip it so higher means more relevant
+            "score": -row["rank"],
+        }
+        for row in rows
+    ], mode
+
+
+def _search_like(db: Session, q: str, limit: int, offset: int, subject_id: int = None):
+    """
+    Other databases have no lessons_fts - every word must be in the title or content
+    """
+    query = db.query(Lesson, Subject.name).join(Subject, Subject.id == Lesson.topic_id).filter(
+        Subject.is_deleted == False
+    )
+    if subject_id:
+        query = query.filter(Lesson.topic_id == subject_id)
+    words = re.findall(r"\w+", q)
+    if not words:
+        return []
+    query = query.filter(and_(*(
+        or_(Lesson.title.ilike(f"%{word}%"), Lesson.content.ilike(f"%{word}%"))
+        for word in words
+    )))
+    rows = query.order_by(Lesson.id).limit(limit).offset(offset).all()
+    return [
+        {
+            "id": lesson.id,
+            "topic_id": lesson.topic_id,
+            "subject_name": subject_name,
+            "title": lesson.title,
+            "snippet": lesson.content[:200],
+            "score": 0.0,
+        }
+        for lesson, subject_name in rows
+    ]
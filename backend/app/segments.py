@@ -0,0 +1,123 @@
+# segments.py - Lessons split into sentences for progressive playback
+# A lesson body is split once, when it is written, into paragraphs and the
+# sentences inside them. Only the offsets are stored (lessons.segments, packed
+# (paragraph, start, end) triples); the text is cut from the lesson content
+# when segments are served by GET /lessons/{id}/segments and .../stream.
+import os
+import re
+import sys
+from array import array
+
+# Sentences longer than this are cut at the last space before the limit, so a
+# client never waits for speech synthesis of one huge run-on sentence
+SEGMENT_MAX_CHARS = int(os.getenv("SEGMENT_MAX_CHARS", "400"))
+SEGMENTS_MAX_PAGE_SIZE = 200
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+# End of a sentence: . ! ? or … (plus closing quotes/brackets) followed by
+# whitespace and something that can start a sentence - "e.g. the" stays whole
+SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s+[A-Z0-9\"'“‘(\[])")
+# Titles that end with a period but not a sentence ("Dr. Smith")
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "mt", "no", "vs", "fig"}
+WORD_BEFORE = re.compile(r"(\w+)\.$")
+
+
+def split_segments(text: str) -> list:
+    """
+    (paragraph, start, end) for each sentence of text, in reading order
+    start/end are character offsets into text, surrounding whitespace excluded
+    """
+    segments = []
+    paragraph_start = 0
+    paragraph = 0
+    for paragraph_end, next_start in _paragraph_breaks(text):
+        sentences = _sentences(text, paragraph_start, paragraph_end)
+        if sentences:
+            segments.extend((paragraph, start, end) for start, end in sentences)
+            paragraph += 1
+        paragraph_start = next_start
+    return segments
+
+
+def _paragraph_breaks(text: str):
+    for match in PARAGRAPH_BREAK.finditer(text):
+        yield match.start(), match.end()
+    yield len(text), len(text)
+
+
+def _sentences(text: str, start: int, end: int) -> list:
+    spans = []
+    for match in SENTENCE_END.finditer(text, start, end):
+        word = WORD_BEFORE.search(text, max(start, match.start() - 10), match.end())
+        if word and word.group(1).lower() in ABBREVIATIONS:
+            continue
+        spans.extend(_trimmed(text, start, match.end()))
+        start = match.end()
+    spans.extend(_trimmed(text, start, end))
+    return spans
+
+
+def _trimmed(text: str, start: int, end: int) -> list:
+    """
+    The span without surrounding whitespace, cut into pieces of at most SEGMENT_MAX_CHARS
+    """
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    spans = []
+    while end - start > SEGMENT_MAX_CHARS:
+        cut = text.rfind(" ", start + 1, start + SEGMENT_MAX_CHARS)
+        if cut == -1:
+            cut = start + SEGMENT_MAX_CHARS
+        spans.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+
+def pack_segments(segments: list) -> bytes:
+    """
+    Segments as little-endian uint32 triples (the lessons.segments column)
+    """
+    packed = array("I", (value for segment in segments for value in segment))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_segments(data: bytes) -> list:
+    packed = array("I")
+    packed.frombytes(data)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return [tuple(packed[i:i + 3]) for i in range(0, len(packed), 3)]
+
+
+def lesson_segments(content: str) -> bytes:
+    """
+    Value for lessons.segments - set it wherever lessons.content is written
+    """
+    return pack_segments(split_segments(content))
+
+
+def segment_spans(content: str, segments) -> list:
+    """
+    (paragraph, start, end) of every segment of a lesson from its stored
+    lessons.segments value; None means not split yet, so split now
+    """
+    return unpack_segments(segments) if segments is not None else split_segments(content)
+
+
+def segment_items(content: str, spans: list, start: int = 0, limit: int = None) -> list:
+    """
+    Response items (with their text) for the spans from index start on
+    """
+    stop = len(spans) if limit is None else start + limit
+    return [
+        {"index": index, "paragraph": paragraph, "start": begin, "end": end, "text": content[begin:end]}
+        for index, (paragraph, begin, end) in enumerate(spans[start:stop], start)
+    ]
@@ -0,0 +1,92 @@
+# startup.py - Cold start timing and background pre-warming
+import time
+
+# main.py imports this module first, so this is roughly when the app import began
+import_started = time.perf_counter()
+
+import asyncio  # noqa: E402
+import os  # noqa: E402
+
+# Warm up heavy imports, bcrypt and hot queries in the background after startup
+PREWARM = os.getenv("PREWARM", "1") == "1"
+# Give the server a moment to start accepting connections first
+PREWARM_DELAY_SECONDS = float(os.getenv("PREWARM_DELAY_SECONDS", "0.5"))
+
+# Filled in by main.py and the first request
+startup_stats = {
+    "import_ms": None,
+    "schema_check_ms": None,
+    "prewarm_ms": None,
+    "first_response_ms": None,
+}
+
+
+def mark(name: str, started: float):
+    startup_stats[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def mark_first_response():
+    """
+    Record time from import to the first response (only the first call counts)
+    """
+    if startup_stats["first_response_ms"] is None:
+        mark("first_response_ms", import_started)
+
+
+class FirstResponseTimer:
+    """
+    Tiny ASGI middleware that notes when the first response goes out,
+    then gets out of the way
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.done = False
+
+    async def __call__(self, scope, receive, send):
+        if self.done or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_mark(message):
+            if message["type"] == "http.response.start" and not self.done:
+                self.done = True
+                mark_first_response()
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
+
+
+def _prewarm_sync():
+    # Heavy libraries deferred by auth.py
+    from .auth import get_pwd_context
+    from jose import jwt  # noqa: F401
+
+    get_pwd_context().handler("bcrypt").get_backend()
+
+    # Open a pooled connection (applies the pragmas) and run the hot
+    # catalog queries so SQLAlchemy's compiled cache and SQLite's page cache are warm
+    from .database import ReadSessionLocal
+    from .models import Subject, Lesson, Quiz
+
+    db = ReadSessionLocal()
+    try:
+        db.query(Subject).filter(Subject.is_deleted == False).all()
+        db.query(Lesson).limit(100).all()
+        db.query(Quiz).limit(100).all()
+    finally:
+        db.close()
+
+
+async def prewarm():
+    """
+    Background task started from the lifespan hook
+    """
+    await asyncio.sleep(PREWARM_DELAY_SECONDS)
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_prewarm_sync)
+    except Exception as e:
+        print(f"Prewarm failed: {e}")
+        return
+    mark("prewarm_ms", started)
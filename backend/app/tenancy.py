@@ -0,0 +1,351 @@
+# tenancy.py - One SQLite database per school
+# The school ("tenant") comes from the "tenant" claim in the JWT, or from the
+# X-Tenant header on login/register (before there is a token). Every school
+# gets its own database file, engines and write queue, so an exam-day write
+# burst at one school never holds the write lock of another.
+# The default tenant is the original DATABASE_URL, so single-school setups
+# and tokens issued before tenancy keep working unchanged.
+# Clients send the header along with their token as well: proxies keep catalog
+# copies per X-Tenant (catalog.py) and never share a token-only response.
+#
+# Command line (run from the backend folder):
+#   python -m app.tenancy create <school>   create and migrate a school database
+#   python -m app.tenancy migrate           migrate every school database
+#   python -m app.tenancy list
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import sessionmaker
+
+from .database import engine, read_engine, make_engine, ensure_schema, SessionLocal, ReadSessionLocal
+from .write_queue import WriteBehindQueue, write_queue, WRITE_BATCH_SIZE, WRITE_BATCH_DELAY_MS, WRITE_QUEUE_MAX_PENDING
+
+# School databases live here as <tenant>.db
+TENANT_DB_DIR = os.getenv("TENANT_DB_DIR", "./tenants")
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant")
+# Open school databases kept at once (least recently used are closed first)
+TENANT_MAX_OPEN = int(os.getenv("TENANT_MAX_OPEN", "32"))
+# Create unknown schools on first use instead of answering 404
+TENANT_AUTO_CREATE = os.getenv("TENANT_AUTO_CREATE", "0") == "1"
+# Threads used by cross-school admin queries
+TENANT_FANOUT_WORKERS = int(os.getenv("TENANT_FANOUT_WORKERS", "8"))
+# Per-school pools are smaller than the main database's
+TENANT_READ_POOL_SIZE = int(os.getenv("TENANT_READ_POOL_SIZE", "4"))
+TENANT_WRITE_POOL_SIZE = int(os.getenv("TENANT_WRITE_POOL_SIZE", "1"))
+
+TENANT_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class UnknownTenant(Exception):
+    """
+    Raised when a school has no database (and auto-create is off)
+    """
+
+
+class Shard:
+    """
+    Everything needed to talk to one school's database
+    """
+
+    def __init__(self, tenant: str, write_engine, reader_engine, queue: WriteBehindQueue,
+                 queue_engine=None, owned: bool = True):
+        self.tenant = tenant
+        self.engine = write_engine
+        self.read_engine = reader_engine
+        self.write_queue = queue
+        self.queue_engine = queue_engine
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+        self.ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=reader_engine)
+        # The default shard wraps the app-wide engines, which main.py shuts down
+        self.owned = owned
+        # Requests and jobs using the shard right now (see ShardRegistry.acquire)
+        self.users = 0
+        # Evicted while in use - closed by the last release
+        self.retired = False
+
+    def close(self):
+        """
+        Flush the write queue and close every pooled connection
+        """
+        if not self.owned:
+            return
+        self.write_queue.stop()
+        for owned_engine in (self.engine, self.read_engine, self.queue_engine):
+            if owned_engine is not None:
+                owned_engine.dispose()
+
+
+def tenant_path(tenant: str) -> str:
+    return os.path.join(TENANT_DB_DIR, f"{tenant}.db")
+
+
+def open_shard(tenant: str, create: bool = TENANT_AUTO_CREATE) -> Shard:
+    """
+    Build engines for a school database and bring its schema up to date
+    """
+    path = tenant_path(tenant)
+    if not os.path.exists(path):
+        if not create:
+            raise UnknownTenant(tenant)
+        os.makedirs(TENANT_DB_DIR, exist_ok=True)
+
+    url = f"sqlite:///{path}"
+    write_engine = make_engine(TENANT_WRITE_POOL_SIZE, TENANT_WRITE_POOL_SIZE, url=url)
+    ensure_schema(write_engine)
+    reader_engine = make_engine(TENANT_READ_POOL_SIZE, TENANT_READ_POOL_SIZE, read_only=True, url=url)
+    queue_engine = make_engine(1, 0, url=url)
+    queue = WriteBehindQueue(
+        session_factory=sessionmaker(autocommit=False, autoflush=False, bind=queue_engine),
+        batch_size=WRITE_BATCH_SIZE,
+        batch_delay_ms=WRITE_BATCH_DELAY_MS,
+        max_pending=WRITE_QUEUE_MAX_PENDING
+    )
+    return Shard(tenant, write_engine, reader_engine, queue, queue_engine)
+
+
+class ShardRegistry:
+    """
+    Opens school databases lazily and keeps at most max_open of them,
+    closing the least recently used one when a new school comes in
+    """
+
+    def __init__(self, default: Shard, max_open: int = 32):
+        self.default = default
+        self.max_open = max(1, max_open)
+        self._open = OrderedDict()
+        self._opening = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evicted = 0
+
+    def acquire(self, tenant: str) -> Shard:
+        """
+        The school's shard, opened if needed and held until release(shard)
+        An evicted shard is only closed once nobody holds it any more
+        """
+        if tenant == DEFAULT_TENANT:
+            return self.default
+
+        with self._lock:
+            shard = self._open.get(tenant)
+            if shard is not None:
+                self._open.move_to_end(tenant)
+                shard.users += 1
+                return shard
+            opening = self._opening.setdefault(tenant, threading.Lock())
+
+        # Only one thread opens (and migrates) a given school, others wait for it
+        evicted = []
+        with opening:
+            with self._lock:
+                shard = self._open.get(tenant)
+            if shard is None:
+                try:
+                    shard = open_shard(tenant)
+                finally:
+                    with self._lock:
+                        self._opening.pop(tenant, None)
+                with self._lock:
+                    self._open[tenant] = shard
+                    self.opened += 1
+                    shard.users += 1
+                    while len(self._open) > self.max_open:
+                        old = self._open.popitem(last=False)[1]
+                        self.evicted += 1
+                        if old.users:
+                            old.retired = True
+                        else:
+                            evicted.append(old)
+            else:
+                with self._lock:
+                    shard.users += 1
+        for old in evicted:
+            old.close()
+        return shard
+
+    def release(self, shard: Shard) -> bool:
+        """
+        Give back a shard from acquire()
+        True means it was evicted meanwhile and the caller must now close() it
+        """
+        if shard is self.default:
+            return False
+        with self._lock:
+            shard.users -= 1
+            return shard.retired and shard.users == 0
+
+    @contextmanager
+    def lease(self, tenant: str):
+        """
+        with shard_registry.lease(tenant) as shard: - acquire/release for jobs and scripts
+        """
+        shard = self.acquire(tenant)
+        try:
+            yield shard
+        finally:
+            if self.release(shard):
+                shard.close()
+
+    def tenants(self) -> list:
+        """
+        Every school with a database, default first
+        """
+        names = []
+        if os.path.isdir(TENANT_DB_DIR):
+            names = sorted(
+                name[:-3] for name in os.listdir(TENANT_DB_DIR)
+                if name.endswith(".db") and TENANT_NAME.match(name[:-3])
+            )
+        return [DEFAULT_TENANT] + [name for name in names if name != DEFAULT_TENANT]
+
+    def fan_out(self, operation, tenants: list = None) -> dict:
+        """
+        Run operation(db) on every school in parallel, each with its own read session
+        Returns {tenant: result}
+        """
+        tenants = tenants or self.tenants()
+
+        def run(tenant):
+            with self.lease(tenant) as shard:
+                db = shard.ReadSessionLocal()
+                try:
+                    return operation(db)
+                finally:
+                    db.close()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(TENANT_FANOUT_WORKERS, len(tenants)))) as pool:
+            return dict(zip(tenants, pool.map(run, tenants)))
+
+    def close_all(self):
+        with self._lock:
+            shards = list(self._open.values())
+            self._open.clear()
+        for shard in shards:
+            shard.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            open_tenants = list(self._open)
+        return {
+            "default": DEFAULT_TENANT,
+            "open": open_tenants,
+            "max_open": self.max_open,
+            "opened": self.opened,
+            "evicted": self.evicted,
+        }
+
+
+# The main database is the default school
+shard_registry = ShardRegistry(
+    Shard(DEFAULT_TENANT, engine, read_engine, write_queue, owned=False),
+    max_open=TENANT_MAX_OPEN
+)
+# Reuse the app-wide sessionmakers for the main database
+shard_registry.default.SessionLocal = SessionLocal
+shard_registry.default.ReadSessionLocal = ReadSessionLocal
+
+
+def resolve_tenant(request: Request) -> str:
+    """
+    School for this request: the token's tenant claim, else the X-Tenant header, else default
+    """
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is not None:
+        return tenant
+
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        from .auth import decode_token
+
+        claims = decode_token(authorization[7:])
+        if claims is not None:
+            tenant = claims[1]
+    if tenant is None:
+        tenant = request.headers.get(TENANT_HEADER)
+
+    tenant = (tenant or DEFAULT_TENANT).lower()
+    if not TENANT_NAME.match(tenant):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid school name"
+        )
+    request.state.tenant = tenant
+    return tenant
+
+
+def get_shard(request: Request) -> Shard:
+    """
+    Shard of the request's school, held until the response is sent (ShardLeases)
+    """
+    shard = getattr(request.state, "shard", None)
+    if shard is not None:
+        return shard
+    try:
+        shard = shard_registry.acquire(resolve_tenant(request))
+    except UnknownTenant as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"School '{e}' does not exist!"
+        )
+    request.state.shard = shard
+    return shard
+
+
+class ShardLeases:
+    """
+    ASGI middleware - releases the shard a request acquired once its response
+    (streamed bodies included) has been sent
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shard = state.pop("shard", None)
+            if shard is not None and shard_registry.release(shard):
+                await run_in_threadpool(shard.close)
+
+
+def get_write_queue(request: Request) -> WriteBehindQueue:
+    """
+    Dependency - the write queue of the request's school
+    """
+    return get_shard(request).write_queue
+
+
+def main(argv):
+    command = argv[0] if argv else "list"
+    if command == "create" and len(argv) == 2 and TENANT_NAME.match(argv[1]):
+        open_shard(argv[1], create=True).close()
+        print(f"School database ready: {tenant_path(argv[1])}")
+    elif command == "migrate":
+        ensure_schema()
+        for tenant in shard_registry.tenants()[1:]:
+            open_shard(tenant).close()
+            print(f"Migrated {tenant}")
+    elif command == "list":
+        for tenant in shard_registry.tenants():
+            print(tenant)
+    else:
+        print("Usage: python -m app.tenancy [create <school> | migrate | list]")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
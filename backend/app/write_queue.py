@@ -0,0 +1,194 @@
+# write_queue.py - Single writer thread that group-commits small, frequent writes
+# SQLite only has one writer at a time; instead of dozens of routes each
+# committing their own tiny transaction, they hand their write to this queue
+# and wait for the batch it lands in to be committed
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .database import make_engine
+
+# Commit after this many writes, or when the queue has been idle this long
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+WRITE_BATCH_DELAY_MS = float(os.getenv("WRITE_BATCH_DELAY_MS", "5"))
+# Writes waiting for the writer before submit() starts refusing
+WRITE_QUEUE_MAX_PENDING = int(os.getenv("WRITE_QUEUE_MAX_PENDING", "10000"))
+# How long a route waits for its commit acknowledgement
+WRITE_ACK_TIMEOUT_SECONDS = float(os.getenv("WRITE_ACK_TIMEOUT_SECONDS", "30"))
+
+# The writer thread owns its own connection, so routes holding connections
+# from the write pool while they wait for an ack can never starve it
+queue_engine = make_engine(pool_size=1, max_overflow=0)
+QueueSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=queue_engine)
+
+
+class WriteQueueFull(Exception):
+    """
+    Raised when the writer is too far behind to accept more work
+    """
+
+
+class WriteBehindQueue:
+    """
+    One background thread drains queued write operations and commits them
+    in batches. Every submit() returns a Future that resolves only after the
+    batch holding that write is committed (a durable acknowledgement).
+    Writes are applied in the order they were submitted.
+    """
+
+    def __init__(self, session_factory=QueueSessionLocal, batch_size: int = 100,
+                 batch_delay_ms: float = 5, max_pending: int = 10000):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        # Set by stop() - a closed school's queue must not spawn a new writer
+        self._stopped = False
+        # Checked by the writer after every batch, so stop() never waits for queue space
+        self._stop_event = threading.Event()
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.last_commit_ms = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Commit everything already queued, then stop the writer thread
+        Later submissions are refused
+        """
+        self._stopped = True
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                # Wakes an idle writer; a full queue means it is busy and sees the event
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=WRITE_ACK_TIMEOUT_SECONDS)
+        self._thread = None
+
+    def submit(self, operation: Callable[[Session], Any]) -> Future:
+        """
+        Queue operation(db) for the writer
+        The Future's result is the operation's return value, set after commit
+        """
+        if self._stopped:
+            raise WriteQueueFull("Write queue is stopped")
+        self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait((operation, future))
+        except queue.Full:
+            raise WriteQueueFull("Write queue is full")
+        return future
+
+    def write(self, operation: Callable[[Session], Any]) -> Any:
+        """
+        Submit and block until committed (for sync routes)
+        """
+        try:
+            return self.submit(operation).result(timeout=WRITE_ACK_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            # The writer is far behind - same answer as a full queue (503 + Retry-After)
+            raise WriteQueueFull("Write was not committed in time")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            if self._stop_event.is_set() and self._queue.empty():
+                break
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+        # Submitted while stop() ran, after the writer's last batch
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(WriteQueueFull("Write queue is stopped"))
+
+    def _commit(self, batch):
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            results = [operation(db) for operation, _ in batch]
+            db.commit()
+        except Exception:
+            db.rollback()
+            db.close()
+            # Something in the batch failed - run each write on its own
+            # so only the bad one gets the error
+            self._commit_one_by_one(batch)
+            return
+        db.close()
+        self._record(len(batch), started)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit_one_by_one(self, batch):
+        for operation, future in batch:
+            started = time.perf_counter()
+            db = self.session_factory()
+            try:
+                result = operation(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.failed += 1
+                future.set_exception(e)
+            else:
+                self._record(1, started)
+                future.set_result(result)
+            finally:
+                db.close()
+
+    def _record(self, size: int, started: float):
+        self.batches += 1
+        self.writes += size
+        self.last_commit_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed": self.failed,
+            "avg_batch_size": round(self.writes / self.batches, 2) if self.batches else 0,
+            "last_commit_ms": self.last_commit_ms,
+        }
+
+
+# Shared writer for progress and other high-frequency inserts
+write_queue = WriteBehindQueue(
+    batch_size=WRITE_BATCH_SIZE,
+    batch_delay_ms=WRITE_BATCH_DELAY_MS,
+    max_pending=WRITE_QUEUE_MAX_PENDING
+)
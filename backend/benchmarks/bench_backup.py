@@ -0,0 +1,111 @@
+# bench_backup.py - Snapshot duration and its effect on request latency
+# Run from the backend folder:  python -m benchmarks.bench_backup
+# Starts uvicorn on a temp database padded to BENCH_DB_MB, measures p50/p99
+# of catalog reads, then measures them again while snapshots run back to back
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_cold_start import BACKEND_DIR, free_port
+from benchmarks.bench_concurrency import PATHS, seed
+from app.compression import register_sqlite_functions
+
+DURATION = float(os.getenv("BENCH_SECONDS", "5"))
+CLIENTS = int(os.getenv("BENCH_CLIENTS", "8"))
+DB_MB = int(os.getenv("BENCH_DB_MB", "50"))
+SNAPSHOT_LOOP = (
+    "import signal, sys\n"
+    "from app.backup import create_snapshot, prune_snapshots\n"
+    "signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))\n"
+    "while True:\n"
+    "    print(create_snapshot()['duration_ms'], flush=True)\n"
+    "    prune_snapshots(1)\n"
+)
+
+
+def pad_database(path):
+    """
+    Grow the database with extra lesson text so a snapshot has real work to do
+    Topic 0 does not exist, so the padding never shows up in the measured routes
+    """
+    conn = sqlite3.connect(path)
+    # The search index triggers read lesson text through lesson_text()
+    register_sqlite_functions(conn)
+    text = "Plants need light, water and air. " * 300
+    rows = DB_MB * 1024 * 1024 // len(text)
+    conn.executemany(
+        'INSERT INTO lessons (topic_id, title, content, "order") VALUES (0, ?, ?, 0)',
+        ((f"Padding {i}", text) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+async def measure(base):
+    latencies = []
+    stop = time.perf_counter() + DURATION
+
+    async def worker(n):
+        async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+            i = n
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                await client.get(PATHS[i % len(PATHS)])
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+    await asyncio.gather(*(worker(n) for n in range(CLIENTS)))
+    latencies.sort()
+    pick = lambda q: latencies[int(len(latencies) * q) - 1] * 1000  # noqa: E731
+    return len(latencies) / DURATION, pick(0.50), pick(0.99)
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "backup.db")
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + db_path
+    env["BACKUP_DIR"] = os.path.join(workdir, "snapshots")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                httpx.get(base + "/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        seed(base)
+        pad_database(db_path)
+        print(f"database size: {os.path.getsize(db_path) / 1024 / 1024:.1f} MB")
+
+        throughput, p50, p99 = asyncio.run(measure(base))
+        print(f"no snapshot:     {throughput:6.0f} req/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms")
+
+        # Snapshots run back to back in their own process (worst case for the API)
+        snapshotter = subprocess.Popen(
+            [sys.executable, "-c", SNAPSHOT_LOOP], cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.PIPE, text=True
+        )
+        throughput, p50, p99 = asyncio.run(measure(base))
+        snapshotter.terminate()
+        durations = sorted(float(line) for line in snapshotter.communicate()[0].split())
+        print(f"with snapshots:  {throughput:6.0f} req/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms")
+        print(f"snapshots taken: {len(durations)}, median duration {durations[len(durations) // 2]:.0f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench_cold_start.py - Import time and time-to-first-response of the API
+# Run from the backend folder:  python -m benchmarks.bench_cold_start
+# Needs uvicorn and httpx (both in requirements.txt)
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(os.getenv("BENCH_RUNS", "5"))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(env):
+    out = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env)
+    return float(out.decode().strip().splitlines()[-1])
+
+
+def first_response(env):
+    """
+    Seconds from spawning uvicorn until /health answers, plus the server's own startup report
+    """
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                res = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+                elapsed = time.perf_counter() - started
+                return elapsed, res.json().get("startup", {})
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "cold.db")
+    env["PREWARM_DELAY_SECONDS"] = "0.1"
+
+    # First import creates the schema; the rest measure the normal cold start
+    first = import_time(env)
+    imports = [import_time(env) for _ in range(RUNS)]
+    responses = [first_response(env) for _ in range(RUNS)]
+
+    print(f"first import (runs migrations): {first * 1000:7.1f} ms")
+    print(f"import app.main (median of {RUNS}): {sorted(imports)[RUNS // 2] * 1000:7.1f} ms")
+    seconds = sorted(r[0] for r in responses)
+    print(f"spawn -> first /health (median):  {seconds[RUNS // 2] * 1000:7.1f} ms")
+    print("server startup report (last run):", json.dumps(responses[-1][1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# bench_compression.py - Bytes on the wire and CPU cost of lesson compression
+# Run from the backend folder:  python -m benchmarks.bench_compression
+# Starts uvicorn on a temp database, seeds lessons of varied text, then compares
+# identity vs gzip transfers and per-request vs pre-compressed gzip CPU
+import gzip
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import httpx
+
+from benchmarks.bench_cold_start import BACKEND_DIR, free_port
+from app.compression import CATALOG_GZIP_LEVEL, GZIP_LEVEL, LESSON_COMPRESS_LEVEL, decompress_text
+
+LESSONS = int(os.getenv("BENCH_LESSONS", "100"))
+WORDS_PER_LESSON = int(os.getenv("BENCH_LESSON_WORDS", "1500"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+VOCABULARY = (
+    "plants need light water air soil roots leaves grow sun energy food green "
+    "the a of and to in is it that for on with as by at from cells animals eat "
+    "river rain cloud weather season summer winter farm harvest seed flower bee"
+).split()
+
+
+def lesson_text(rng):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(WORDS_PER_LESSON)).capitalize() + "."
+
+
+def seed(base):
+    rng = random.Random(1)
+    with httpx.Client(base_url=base, timeout=30) as client:
+        client.post("/auth/register", json={
+            "username": "bench", "email": "bench@example.com", "password": "bench",
+            "first_name": "Bench", "role": "teacher"
+        })
+        token = client.post("/auth/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        subject = client.post("/lessons/subjects", json={"name": "Science"}, headers=headers).json()
+        for i in range(LESSONS):
+            client.post("/lessons/", json={
+                "topic_id": subject["id"], "title": f"Lesson {i}", "content": lesson_text(rng), "order": i
+            }, headers=headers)
+    return subject["id"]
+
+
+def fetch(client, path, encoding):
+    """
+    Average latency (ms) and bytes on the wire for REQUESTS gets of path
+    """
+    wire = 0
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        wire = response.num_bytes_downloaded
+    return (time.perf_counter() - started) / REQUESTS * 1000, wire
+
+
+def cpu_ms(operation, repeat=20):
+    started = time.process_time()
+    for _ in range(repeat):
+        operation()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "compression.db")
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + db_path
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                httpx.get(base + "/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        subject_id = seed(base)
+
+        # Storage: what the lessons table holds vs the raw text
+        conn = sqlite3.connect(db_path)
+        rows = [row[0] for row in conn.execute("SELECT content FROM lessons")]
+        conn.close()
+        stored = sum(len(row) if isinstance(row, bytes) else len(row.encode()) for row in rows)
+        texts = [decompress_text(row) for row in rows]
+        raw = sum(len(text.encode()) for text in texts)
+        print(f"lesson storage:   {raw / 1024:8.0f} KB raw -> {stored / 1024:6.0f} KB stored "
+              f"({stored / raw:.0%})")
+
+        # Wire: the same cached listing with and without gzip
+        path = f"/lessons/by-subject/{subject_id}"
+        with httpx.Client(base_url=base, timeout=30) as client:
+            identity_ms, identity_bytes = fetch(client, path, "identity")
+            gzip_ms, gzip_bytes = fetch(client, path, "gzip")
+        print(f"identity:         {identity_bytes / 1024:8.0f} KB on the wire   {identity_ms:6.2f} ms/request")
+        print(f"gzip (cached):    {gzip_bytes / 1024:8.0f} KB on the wire   {gzip_ms:6.2f} ms/request")
+
+        # CPU: compressing the listing per request vs once per catalog version
+        body = httpx.get(base + path, headers={"Accept-Encoding": "identity"}).content
+        per_request = cpu_ms(lambda: gzip.compress(body, GZIP_LEVEL, mtime=0))
+        once = cpu_ms(lambda: gzip.compress(body, CATALOG_GZIP_LEVEL, mtime=0))
+        print(f"gzip level {GZIP_LEVEL} per request:    {per_request:6.2f} ms CPU every time, "
+              f"{len(gzip.compress(body, GZIP_LEVEL, mtime=0)) / 1024:.0f} KB")
+        print(f"gzip level {CATALOG_GZIP_LEVEL} pre-compressed: {once:6.2f} ms CPU once per catalog version, "
+              f"{len(gzip.compress(body, CATALOG_GZIP_LEVEL, mtime=0)) / 1024:.0f} KB")
+
+        # CPU: storing and reading one lesson body
+        sample = texts[0].encode()
+        packed = zlib.compress(sample, LESSON_COMPRESS_LEVEL)
+        write = cpu_ms(lambda: zlib.compress(sample, LESSON_COMPRESS_LEVEL), repeat=200)
+        read = cpu_ms(lambda: zlib.decompress(packed), repeat=200)
+        print(f"lesson body:      compress {write * 1000:6.0f} us   decompress {read * 1000:6.0f} us "
+              f"({len(sample) / 1024:.1f} KB text)")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_concurrency.py - Catalog read throughput as the number of concurrent clients grows
+# Run from the backend folder:  python -m benchmarks.bench_concurrency
+# Starts uvicorn on a temp database, seeds a small catalog and hammers the read routes
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_cold_start import BACKEND_DIR, free_port
+
+DURATION = float(os.getenv("BENCH_SECONDS", "5"))
+LEVELS = [int(n) for n in os.getenv("BENCH_CLIENTS", "1,4,16,64").split(",")]
+PATHS = ["/lessons/subjects", "/lessons/?topic_id=1", "/quizzes/?lesson_id=1", "/lessons/1"]
+
+
+def seed(base):
+    with httpx.Client(base_url=base, timeout=30) as client:
+        client.post("/auth/register", json={
+            "username": "bench", "email": "bench@example.com", "password": "bench",
+            "first_name": "Bench", "role": "teacher"
+        })
+        token = client.post("/auth/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        subject = client.post("/lessons/subjects", json={"name": "Science"}, headers=headers).json()
+        for i in range(50):
+            lesson = client.post("/lessons/", json={
+                "topic_id": subject["id"], "title": f"Lesson {i}", "content": "Plants need light. " * 100
+            }, headers=headers).json()
+            client.post("/quizzes/", json={
+                "lesson_id": lesson["id"], "question": "What do plants need?",
+                "option_a": "Light", "option_b": "Noise", "option_c": "Sand", "option_d": "Ice",
+                "correct_answer": "A"
+            }, headers=headers)
+
+
+async def run_level(base, clients):
+    latencies = []
+    stop = time.perf_counter() + DURATION
+
+    async def worker(n):
+        async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+            i = n
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                await client.get(PATHS[i % len(PATHS)])
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    latencies.sort()
+    return len(latencies) / DURATION, latencies[int(len(latencies) * 0.95) - 1] * 1000
+
+
+def main():
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "concurrency.db")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                httpx.get(base + "/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        seed(base)
+        for clients in LEVELS:
+            throughput, p95 = asyncio.run(run_level(base, clients))
+            print(f"{clients:3d} clients: {throughput:8.0f} req/s   p95 {p95:7.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_search.py - Latency of GET /lessons/search over a few thousand lessons
+# Run from the backend folder:  python -m benchmarks.bench_search
+# Starts uvicorn on a temp database, imports SUBJECTS x LESSONS lessons of varied
+# text through /lessons/import, then times searches for random word pairs
+# (all different, so every request misses the catalog cache and hits FTS5)
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_cold_start import BACKEND_DIR, free_port
+
+SUBJECTS = int(os.getenv("BENCH_SUBJECTS", "20"))
+LESSONS = int(os.getenv("BENCH_LESSONS", "250"))
+WORDS_PER_LESSON = int(os.getenv("BENCH_LESSON_WORDS", "400"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "300"))
+COMMON = "the a of and to in is it that for on with as by at from".split()
+# Topic words: each lesson uses a handful of them, so queries match some lessons, not all
+TOPICS = [f"topic{n}" for n in range(2000)]
+
+
+def lesson_text(rng):
+    topics = rng.sample(TOPICS, 8)
+    return " ".join(rng.choice(topics if rng.random() < 0.2 else COMMON) for _ in range(WORDS_PER_LESSON))
+
+
+def seed(base):
+    rng = random.Random(1)
+    subjects = [
+        {"name": f"Subject {s}", "lessons": [
+            {"title": f"{rng.choice(TOPICS)} lesson {n}", "content": lesson_text(rng)}
+            for n in range(LESSONS)
+        ]}
+        for s in range(SUBJECTS)
+    ]
+    with httpx.Client(base_url=base, timeout=300) as client:
+        client.post("/auth/register", json={
+            "username": "bench", "email": "bench@example.com", "password": "bench",
+            "first_name": "Bench", "role": "teacher"
+        })
+        token = client.post("/auth/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+        started = time.perf_counter()
+        result = client.post(
+            "/lessons/import", content=json.dumps(subjects),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        ).json()
+        print(f"imported {result['created']} items (indexed by the triggers) "
+              f"in {time.perf_counter() - started:.2f} s")
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "search.db")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                httpx.get(base + "/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        seed(base)
+
+        rng = random.Random(2)
+        latencies = []
+        hits = 0
+        with httpx.Client(base_url=base, timeout=30) as client:
+            for _ in range(REQUESTS):
+                q = " ".join(rng.sample(TOPICS, 2))
+                started = time.perf_counter()
+                response = client.get("/lessons/search", params={"q": q})
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(response.json())
+        latencies.sort()
+        print(f"{REQUESTS} searches over {SUBJECTS * LESSONS} lessons, {hits / REQUESTS:.1f} hits each")
+        print(f"median {statistics.median(latencies):6.2f} ms   "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:6.2f} ms   max {latencies[-1]:6.2f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# bench_sqlite_profile.py - Concurrent read/write throughput, default SQLite vs our profile
+# Run from the backend folder:  python -m benchmarks.bench_sqlite_profile
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.database import SQLITE_PRAGMAS  # noqa: E402
+
+DURATION = float(os.getenv("BENCH_SECONDS", "5"))
+READERS = int(os.getenv("BENCH_READERS", "8"))
+WRITERS = int(os.getenv("BENCH_WRITERS", "2"))
+
+# What SQLite does with no pragmas at all (what database.py used before)
+DEFAULT_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def setup(path, pragmas):
+    conn = connect(path, pragmas)
+    conn.execute("CREATE TABLE lessons (id INTEGER PRIMARY KEY, topic_id INTEGER, title TEXT, content TEXT)")
+    conn.execute("CREATE INDEX ix_lessons_topic ON lessons (topic_id)")
+    conn.execute("CREATE TABLE progress (id INTEGER PRIMARY KEY, student_id INTEGER, lesson_id INTEGER, score INTEGER)")
+    conn.executemany(
+        "INSERT INTO lessons (topic_id, title, content) VALUES (?, ?, ?)",
+        [(i % 50, f"Lesson {i}", "lorem ipsum " * 200) for i in range(5000)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(pragmas):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    setup(path, pragmas)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + DURATION
+
+    def reader(n):
+        conn = connect(path, pragmas)
+        done = 0
+        while time.monotonic() < stop:
+            try:
+                conn.execute("SELECT id, title FROM lessons WHERE topic_id = ?", (done % 50,)).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        with lock:
+            counts["reads"] += done
+
+    def writer(n):
+        conn = connect(path, pragmas)
+        done = 0
+        while time.monotonic() < stop:
+            try:
+                conn.execute("INSERT INTO progress (student_id, lesson_id, score) VALUES (?, ?, ?)", (n, done, 5))
+                conn.commit()
+                done += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        with lock:
+            counts["writes"] += done
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {key: value / DURATION if key != "errors" else value for key, value in counts.items()}
+
+
+if __name__ == "__main__":
+    print(f"{READERS} readers, {WRITERS} writers, {DURATION:.0f}s per run")
+    for label, pragmas in (("default", DEFAULT_PRAGMAS), ("profile", SQLITE_PRAGMAS)):
+        result = run(pragmas)
+        print(f"{label:8s} reads/s={result['reads']:10.0f}  writes/s={result['writes']:8.0f}  errors={result['errors']}")
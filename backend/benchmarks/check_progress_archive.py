@@ -0,0 +1,82 @@
+# check_progress_archive.py - Report totals stay right when an archived lesson is retaken
+# Run from the backend folder:  python -m benchmarks.check_progress_archive
+# Archives a student's rows, retakes one lesson, archives again and checks the
+# report after each step. Exits with status 1 if a total is off.
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.archive import archive_progress  # noqa: E402
+from app.database import run_migrations  # noqa: E402
+from app.models import User, StudentProgress, ProgressSummary  # noqa: E402
+from app.routes_progress import build_report  # noqa: E402
+
+# (started, completed, average_score) expected after each step
+EXPECTED = {
+    "before archival": (2, 2, 70.0),
+    "archived": (2, 2, 70.0),
+    "lesson 1 retaken": (2, 2, 55.0),
+    "retake archived": (2, 2, 55.0),
+}
+
+
+def progress(student_id: int, lesson_id: int, percentage: int, days_ago: int) -> StudentProgress:
+    return StudentProgress(student_id=student_id, lesson_id=lesson_id, score=percentage // 10,
+                           total_questions=10, percentage=percentage,
+                           completed_at=datetime.utcnow() - timedelta(days=days_ago))
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "archive.db")
+    url = f"sqlite:///{path}"
+    run_migrations(url)
+
+    engine = create_engine(url)
+    failures = 0
+    with Session(engine) as db:
+        student = User(username="s", email="s@x.com", password_hash="x", first_name="S", role="student")
+        db.add(student)
+        db.flush()
+        student_id = student.id
+        db.add_all([progress(student_id, 1, 80, 400), progress(student_id, 2, 60, 400)])
+        db.commit()
+
+        def check(step: str):
+            nonlocal failures
+            # archive_progress expunges the session, so load the student again
+            db.expire_all()
+            report = build_report(db, db.get(User, student_id))
+            got = (report["total_lessons_started"], report["completed_lessons"], report["average_score"])
+            ok = got == EXPECTED[step]
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {step}: started/completed/average {got}, expected {EXPECTED[step]}")
+
+        check("before archival")
+        archive_progress(db)
+        check("archived")
+
+        # Retake lesson 1 - a new hot row next to the archived one
+        db.add(progress(student_id, 1, 50, 0))
+        db.commit()
+        check("lesson 1 retaken")
+
+        db.query(StudentProgress).update({StudentProgress.completed_at: datetime.utcnow() - timedelta(days=400)})
+        db.commit()
+        archive_progress(db)
+        check("retake archived")
+
+        summary = db.get(ProgressSummary, student_id)
+        print(f"summary: {summary.lessons_started} started, {summary.lessons_completed} completed, "
+              f"percentage_sum {summary.percentage_sum}")
+
+    print(f"\n{failures} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
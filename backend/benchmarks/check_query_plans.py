@@ -0,0 +1,153 @@
+# check_query_plans.py - EXPLAIN QUERY PLAN for every router query, fails on full table scans
+# Run from the backend folder:  python -m benchmarks.check_query_plans
+# Exits with status 1 if a query that should use an index scans a whole table
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import and_, create_engine, func, or_, select, text, tuple_  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.database import run_migrations  # noqa: E402
+from app.search import FTS_QUERY  # noqa: E402
+from app.models import User, Subject, Lesson, Quiz, DeletedItem, StudentProgress, ProgressSummary, ArchivedLesson  # noqa: E402
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def router_queries(db: Session):
+    """
+    (name, query, allow_full_scan) for the queries the routers run
+    allow_full_scan is only for listings that really return the whole table
+    """
+    prefix, upper = "al", "al\uffff"
+    since = datetime(2026, 1, 1)
+    return [
+        ("auth.get_current_user", db.query(User).filter(User.username == "x"), False),
+        ("auth.register username check", db.query(User).filter(User.username == "x"), False),
+        ("auth.register email check", db.query(User).filter(User.email == "x@x.com"), False),
+        ("auth.register_bulk conflicts", db.query(User.username, User.email).filter(
+            or_(User.username.in_(["a", "b"]), User.email.in_(["a@x.com", "b@x.com"]))), False),
+        ("auth.get_users page", db.query(User).filter(User.role == "student", User.id > 10)
+            .order_by(User.id).limit(101), False),
+        ("auth.get_users search", db.query(User).filter(or_(*(
+            and_(func.lower(column) >= prefix, func.lower(column) < upper)
+            for column in (User.username, User.first_name, User.surname, User.email)
+        ))).order_by(User.id).limit(101), False),
+        ("auth.delete_user", db.query(User).filter(User.id == 1), False),
+        ("lessons.get_subjects", db.query(Subject).filter(Subject.is_deleted == False), False),
+        ("lessons.get_trash_subjects", db.query(Subject).filter(
+            Subject.is_deleted == True, Subject.teacher_id == 1), False),
+        ("lessons.get_subject", db.query(Subject).filter(
+            Subject.id == 1, Subject.is_deleted == False), False),
+        ("lessons.get_subject_bundle lessons", db.query(Lesson).filter(
+            Lesson.topic_id.in_([1]), Lesson.is_deleted == False)
+            .order_by(Lesson.order, Lesson.id), False),
+        ("lessons.get_subject_bundle quizzes", db.query(Quiz).filter(
+            Quiz.lesson_id.in_([1, 2, 3]), Quiz.is_deleted == False)
+            .order_by(Quiz.id), False),
+        ("lessons.get_lessons_by_subject", db.query(Lesson).filter(Lesson.topic_id == 1), False),
+        ("lessons.get_all_lessons topic", db.query(Lesson).filter(Lesson.topic_id == 1)
+            .offset(0).limit(100), False),
+        ("lessons.get_all_lessons", db.query(Lesson).offset(0).limit(100), True),
+        ("lessons.get_all_lessons cursor", db.query(Lesson.id, Lesson.title).filter(
+            Lesson.is_deleted == False).order_by(
+            Lesson.topic_id, Lesson.order, Lesson.id).filter(
+            tuple_(Lesson.topic_id, Lesson.order, Lesson.id) > (3, 1, 500)).limit(101), False),
+        ("lessons.get_all_lessons topic cursor", db.query(Lesson.id, Lesson.title).filter(
+            Lesson.topic_id == 3, Lesson.is_deleted == False).order_by(Lesson.topic_id, Lesson.order, Lesson.id).filter(
+            tuple_(Lesson.order, Lesson.id) > (1, 500)).limit(101), False),
+        ("lessons.get_live_lesson", db.query(Lesson.title, Lesson.content, Lesson.segments).filter(
+            Lesson.id == 1, Lesson.is_deleted == False), False),
+        ("lessons.cascade_trash lessons", db.query(Lesson.id).filter(Lesson.topic_id == 1), False),
+        ("lessons.cascade_trash quizzes", db.query(Quiz.id).filter(
+            Quiz.lesson_id.in_(select(Lesson.id).where(Lesson.topic_id == 1))), False),
+        ("lessons.delete_lesson", db.query(Lesson).filter(Lesson.id == 1), False),
+        ("quiz.get_quizzes lesson", db.query(Quiz).filter(Quiz.lesson_id == 1), False),
+        ("quiz.get_quizzes", db.query(Quiz), True),
+        ("quiz.get_quiz", db.query(Quiz).filter(Quiz.id == 1, Quiz.is_deleted == False), False),
+        ("quiz.get_quizzes_by_lesson", db.query(Quiz).filter(Quiz.lesson_id == 1), False),
+        ("progress.get_my_progress", db.query(StudentProgress).filter(
+            StudentProgress.student_id == 1), False),
+        ("progress.get_lesson_progress", db.query(StudentProgress).filter(
+            StudentProgress.student_id == 1, StudentProgress.lesson_id == 1), False),
+        ("progress.get_all_students_progress", db.query(User).filter(User.role == "student"), False),
+        ("progress.build_report summary", db.query(ProgressSummary).filter(ProgressSummary.student_id == 1), False),
+        ("archive.archive_student_rows archived lessons", db.query(ArchivedLesson).filter(
+            ArchivedLesson.student_id == 1, ArchivedLesson.lesson_id.in_([1, 2])), False),
+        ("archive.retaken_totals student", db.query(ArchivedLesson.student_id, func.count(ArchivedLesson.lesson_id))
+            .join(StudentProgress, and_(StudentProgress.student_id == ArchivedLesson.student_id,
+                                        StudentProgress.lesson_id == ArchivedLesson.lesson_id))
+            .filter(ArchivedLesson.student_id == 1).group_by(ArchivedLesson.student_id), False),
+        ("archive.archive_progress batch", db.query(StudentProgress).filter(
+            StudentProgress.completed_at < "2025-01-01").order_by(StudentProgress.completed_at).limit(5000), False),
+        ("purge.purge_trash batch", db.query(Subject.id).filter(
+            Subject.is_deleted == True, Subject.deleted_at < since).order_by(Subject.deleted_at).limit(100), False),
+        ("purge.purge_subjects lesson counts", db.query(Lesson.topic_id, func.count(Lesson.id)).filter(
+            Lesson.topic_id.in_([1, 2])).group_by(Lesson.topic_id), False),
+        ("purge.purge_subjects progress", db.query(StudentProgress).filter(StudentProgress.lesson_id.in_(
+            select(Lesson.id).where(Lesson.topic_id.in_([1, 2])))), False),
+        ("purge.purge_subjects archived lessons", db.query(ArchivedLesson).filter(ArchivedLesson.lesson_id.in_(
+            select(Lesson.id).where(Lesson.topic_id.in_([1, 2])))), False),
+        ("purge.purge_trash old deleted items", db.query(DeletedItem.id).filter(
+            DeletedItem.deleted_at < since).order_by(DeletedItem.deleted_at).limit(100), False),
+        ("sync.get_changes subjects", db.query(Subject).filter(Subject.updated_at > since), False),
+        ("sync.get_changes lessons", db.query(Lesson).filter(Lesson.updated_at > since), False),
+        ("sync.get_changes quizzes", db.query(Quiz).filter(Quiz.updated_at > since), False),
+        ("sync.get_changes tombstones", db.query(DeletedItem.item_type, DeletedItem.item_id).filter(
+            DeletedItem.deleted_at > since, DeletedItem.item_type.in_(("lesson", "quiz"))), False),
+        ("search.search_lessons", text(FTS_QUERY.format(subject_filter="")).bindparams(
+            match='"plants"', words=16, title_weight=10.0, limit=21, offset=0), False),
+        ("search.search_lessons subject", text(FTS_QUERY.format(
+            subject_filter="AND lessons.topic_id = :subject_id")).bindparams(
+            match='"plants"', words=16, title_weight=10.0, limit=21, offset=0, subject_id=1), False),
+        ("lessons.check_name_free", db.query(Subject.id).filter(
+            Subject.name_key == "english", Subject.is_deleted == False), False),
+        ("curriculum.save existing subjects", db.query(Subject.id, Subject.name_key, func.max(Lesson.order))
+            .outerjoin(Lesson, Lesson.topic_id == Subject.id).filter(
+            or_(Subject.id.in_([1, 2]), and_(Subject.name_key.in_(["english", "science"]),
+                                             Subject.is_deleted == False)),
+            Subject.is_deleted == False).group_by(Subject.id), False),
+        ("catalog.subject_names build", db.query(Subject.name_key, Subject.id, select(Lesson.id).where(
+            Lesson.topic_id == Subject.id).order_by(Lesson.order, Lesson.id).limit(1)
+            .correlate(Subject).scalar_subquery()).filter(
+            Subject.is_deleted == False, Subject.name_key.isnot(None)), False),
+        ("main.get_lesson by id", db.query(Lesson).filter(Lesson.id == 1), False),
+    ]
+
+
+def explain(db: Session, query):
+    # ORM queries, or text() for the raw SQL ones
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled)).fetchall()
+    return [row[3] for row in rows]
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "plans.db")
+    url = f"sqlite:///{path}"
+    run_migrations(url)
+
+    engine = create_engine(url)
+    failures = 0
+    with Session(engine) as db:
+        for name, query, allow_full_scan in router_queries(db):
+            plan = explain(db, query)
+            scans = [step for step in plan if FULL_SCAN.match(step)]
+            if scans and not allow_full_scan:
+                failures += 1
+                status = "FAIL"
+            else:
+                status = "ok  "
+            print(f"{status} {name}: {' | '.join(plan)}")
+
+    print(f"\n{failures} query(s) with full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# env.py - Alembic environment for the backend database
+import warnings
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import Base, SQLALCHEMY_DATABASE_URL, engine, make_engine
+from app import models  # noqa: F401 - registers all tables on Base.metadata
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# SQLite reflection can't read the lower() indexes on users - nothing to worry about
+warnings.filterwarnings("ignore", message="Skipped unsupported reflection of expression-based index")
+
+
+def get_url():
+    # An explicit URL (e.g. from the query plan check) wins over DATABASE_URL
+    return config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+
+
+def run_migrations_offline():
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Reuse a connection handed over by app.database.run_migrations()
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    url = get_url()
+    # make_engine registers lesson_text(), which the lesson search triggers call
+    connectable = engine if url == SQLALCHEMY_DATABASE_URL else make_engine(1, 0, url=url)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,107 @@
+"""baseline schema (what Base.metadata.create_all used to build)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("first_name", sa.String(50), nullable=False),
+        sa.Column("surname", sa.String(50)),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "subjects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("is_deleted", sa.Boolean()),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_subjects_id", "subjects", ["id"])
+
+    op.create_table(
+        "deleted_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("item_type", sa.String(50), nullable=False),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("item_data", sa.Text(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime()),
+    )
+    op.create_index("ix_deleted_items_id", "deleted_items", ["id"])
+
+    op.create_table(
+        "topics",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("subject_id", sa.Integer(), sa.ForeignKey("subjects.id")),
+        sa.Column("name", sa.String()),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_topics_id", "topics", ["id"])
+
+    op.create_table(
+        "lessons",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("topic_id", sa.Integer(), sa.ForeignKey("subjects.id"), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("duration", sa.String(50)),
+        sa.Column("order", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_lessons_id", "lessons", ["id"])
+
+    op.create_table(
+        "quizzes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id"), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("option_a", sa.String(200), nullable=False),
+        sa.Column("option_b", sa.String(200), nullable=False),
+        sa.Column("option_c", sa.String(200), nullable=False),
+        sa.Column("option_d", sa.String(200), nullable=False),
+        sa.Column("correct_answer", sa.String(1), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_quizzes_id", "quizzes", ["id"])
+
+    op.create_table(
+        "student_progress",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id"), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("total_questions", sa.Integer(), nullable=False),
+        sa.Column("percentage", sa.Integer()),
+        sa.Column("completed_at", sa.DateTime()),
+    )
+    op.create_index("ix_student_progress_id", "student_progress", ["id"])
+
+
+def downgrade():
+    for table in ("student_progress", "quizzes", "lessons", "topics", "deleted_items", "subjects", "users"):
+        op.drop_table(table)
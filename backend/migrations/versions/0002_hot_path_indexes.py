@@ -0,0 +1,85 @@
+"""indexes for the hot router queries + one progress row per student/lesson
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def merge_duplicate_progress(conn):
+    """
+    Fold repeated (student, lesson) rows into one before the unique constraint
+    The newest row is kept with the best scored attempt and the earliest start;
+    nothing a student achieved is lost, only the duplicate rows go
+    """
+    groups = conn.execute(sa.text(
+        "SELECT student_id, lesson_id FROM student_progress "
+        "GROUP BY student_id, lesson_id HAVING COUNT(*) > 1"
+    )).all()
+    for student_id, lesson_id in groups:
+        rows = conn.execute(sa.text(
+            "SELECT id, score, total_questions, percentage, completed_at FROM student_progress "
+            "WHERE student_id = :student_id AND lesson_id = :lesson_id ORDER BY id"
+        ), {"student_id": student_id, "lesson_id": lesson_id}).all()
+        keep = rows[-1]
+        # Rows with total_questions = 0 were only started, never scored
+        scored = [row for row in rows if row.total_questions > 0]
+        best = max(scored, key=lambda row: (row.percentage or 0, row.id)) if scored else keep
+        started = [row.completed_at for row in rows if row.completed_at is not None]
+        conn.execute(sa.text(
+            "UPDATE student_progress SET score = :score, total_questions = :total_questions, "
+            "percentage = :percentage, completed_at = :completed_at WHERE id = :id"
+        ), {
+            "id": keep.id,
+            "score": best.score,
+            "total_questions": best.total_questions,
+            "percentage": best.percentage,
+            "completed_at": min(started) if started else keep.completed_at,
+        })
+        conn.execute(
+            sa.text("DELETE FROM student_progress WHERE id IN :ids").bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": [row.id for row in rows[:-1]]}
+        )
+
+
+def upgrade():
+    # User directory (/auth/users) - may already exist from create_missing_indexes()
+    op.create_index("ix_users_role_id", "users", ["role", "id"], if_not_exists=True)
+    for column in ("username", "email", "first_name", "surname"):
+        op.create_index(f"ix_users_{column}_lower", "users", [sa.text(f"lower({column})")], if_not_exists=True)
+
+    # Live subjects only (partial index), and the per-teacher trash view
+    op.create_index(
+        "ix_subjects_live", "subjects", ["id"],
+        sqlite_where=sa.text("is_deleted = 0"), if_not_exists=True
+    )
+    op.create_index("ix_subjects_teacher_deleted", "subjects", ["teacher_id", "is_deleted"], if_not_exists=True)
+
+    op.create_index("ix_lessons_topic_order", "lessons", ["topic_id", "order", "id"], if_not_exists=True)
+    op.create_index("ix_quizzes_lesson_id", "quizzes", ["lesson_id"], if_not_exists=True)
+
+    merge_duplicate_progress(op.get_bind())
+    with op.batch_alter_table("student_progress") as batch:
+        batch.create_unique_constraint("uq_student_progress_student_lesson", ["student_id", "lesson_id"])
+    op.create_index("ix_student_progress_lesson_id", "student_progress", ["lesson_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_student_progress_lesson_id", table_name="student_progress")
+    with op.batch_alter_table("student_progress") as batch:
+        batch.drop_constraint("uq_student_progress_student_lesson", type_="unique")
+    op.drop_index("ix_quizzes_lesson_id", table_name="quizzes")
+    op.drop_index("ix_lessons_topic_order", table_name="lessons")
+    op.drop_index("ix_subjects_teacher_deleted", table_name="subjects")
+    op.drop_index("ix_subjects_live", table_name="subjects")
+    for column in ("username", "email", "first_name", "surname"):
+        op.drop_index(f"ix_users_{column}_lower", table_name="users")
+    op.drop_index("ix_users_role_id", table_name="users")
@@ -0,0 +1,48 @@
+"""hot/cold archive for student progress
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_student_progress_completed_at", "student_progress", ["completed_at"], if_not_exists=True)
+
+    op.create_table(
+        "student_progress_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("oldest_at", sa.DateTime()),
+        sa.Column("newest_at", sa.DateTime()),
+        sa.Column("archived_at", sa.DateTime()),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_student_progress_archive_id", "student_progress_archive", ["id"])
+    op.create_index("ix_student_progress_archive_student_id", "student_progress_archive", ["student_id"])
+
+    op.create_table(
+        "student_progress_summary",
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("lessons_started", sa.Integer(), nullable=False),
+        sa.Column("lessons_completed", sa.Integer(), nullable=False),
+        sa.Column("percentage_sum", sa.Integer(), nullable=False),
+        sa.Column("last_completed_at", sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table("student_progress_summary")
+    op.drop_index("ix_student_progress_archive_student_id", table_name="student_progress_archive")
+    op.drop_index("ix_student_progress_archive_id", table_name="student_progress_archive")
+    op.drop_table("student_progress_archive")
+    op.drop_index("ix_student_progress_completed_at", table_name="student_progress")
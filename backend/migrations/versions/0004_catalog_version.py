@@ -0,0 +1,30 @@
+"""catalog version row for ETag / Last-Modified
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table = op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.bulk_insert(table, [{"id": 1, "version": 1, "updated_at": datetime.utcnow()}])
+
+
+def downgrade():
+    op.drop_table("catalog_version")
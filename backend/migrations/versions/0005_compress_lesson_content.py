@@ -0,0 +1,52 @@
+"""compress existing lesson content
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Same threshold and level as compression.py at the time of this migration
+MIN_BYTES = 512
+LEVEL = 6
+BATCH = 500
+
+
+def rewrite(select_sql, convert):
+    conn = op.get_bind()
+    if conn.dialect.name != "sqlite":
+        return
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(select_sql), {"last_id": last_id, "batch": BATCH}).fetchall()
+        if not rows:
+            break
+        for row_id, content in rows:
+            new = convert(content)
+            if new is not None:
+                conn.execute(sa.text("UPDATE lessons SET content = :content WHERE id = :id"),
+                             {"content": new, "id": row_id})
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    def compress(content):
+        data = content.encode()
+        return zlib.compress(data, LEVEL) if len(data) >= MIN_BYTES else None
+
+    rewrite("SELECT id, content FROM lessons WHERE id > :last_id AND typeof(content) = 'text' "
+            "ORDER BY id LIMIT :batch", compress)
+
+
+def downgrade():
+    rewrite("SELECT id, content FROM lessons WHERE id > :last_id AND typeof(content) = 'blob' "
+            "ORDER BY id LIMIT :batch", lambda content: zlib.decompress(content).decode())
@@ -0,0 +1,37 @@
+"""updated_at on subjects, lessons and quizzes for delta sync
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+TABLES = ("subjects", "lessons", "quizzes")
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+    # Existing rows count as changed when they were created (or trashed)
+    op.execute("UPDATE subjects SET updated_at = COALESCE(deleted_at, created_at, CURRENT_TIMESTAMP)")
+    for table in TABLES[1:]:
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    for table in TABLES:
+        op.create_index(f"ix_{table}_updated_at", table, ["updated_at"], if_not_exists=True)
+    op.create_index("ix_deleted_items_deleted_at", "deleted_items", ["deleted_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_deleted_items_deleted_at", table_name="deleted_items")
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_updated_at", table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("updated_at")
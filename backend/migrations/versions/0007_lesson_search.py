@@ -0,0 +1,64 @@
+"""full-text search index over lesson titles and content (SQLite FTS5)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import zlib
+
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# lessons.content may be zlib-compressed (0005), so the index reads it through
+# lesson_text(), a Python function the app registers on every connection.
+# lessons_fts_source is the readable view of the lessons table; the index keeps
+# no copy of the text (external content) and snippets are cut from the view.
+STATEMENTS = (
+    "CREATE VIEW lessons_fts_source AS "
+    "SELECT id, title, lesson_text(content) AS content FROM lessons",
+    "CREATE VIRTUAL TABLE lessons_fts USING fts5("
+    "title, content, content='lessons_fts_source', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER lessons_fts_insert AFTER INSERT ON lessons BEGIN "
+    "INSERT INTO lessons_fts (rowid, title, content) "
+    "VALUES (new.id, new.title, lesson_text(new.content)); END",
+    "CREATE TRIGGER lessons_fts_delete AFTER DELETE ON lessons BEGIN "
+    "INSERT INTO lessons_fts (lessons_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, lesson_text(old.content)); END",
+    "CREATE TRIGGER lessons_fts_update AFTER UPDATE OF title, content ON lessons BEGIN "
+    "INSERT INTO lessons_fts (lessons_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, lesson_text(old.content)); "
+    "INSERT INTO lessons_fts (rowid, title, content) "
+    "VALUES (new.id, new.title, lesson_text(new.content)); END",
+)
+
+
+def lesson_text(value):
+    # Same as compression.decompress_text at the time of this migration
+    return zlib.decompress(value).decode() if isinstance(value, bytes) else value
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != "sqlite":
+        return
+    # The migration may run on a plain engine (per-school databases)
+    conn.connection.driver_connection.create_function("lesson_text", 1, lesson_text, deterministic=True)
+    for statement in STATEMENTS:
+        op.execute(statement)
+    # Index the lessons that already exist
+    op.execute("INSERT INTO lessons_fts (lessons_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("lessons_fts_insert", "lessons_fts_delete", "lessons_fts_update"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS lessons_fts")
+    op.execute("DROP VIEW IF EXISTS lessons_fts_source")
@@ -0,0 +1,27 @@
+"""sentence segments (offsets) for progressive lesson playback
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+# Existing lessons keep segments NULL and are split when first served
+# (segments.segment_spans); every write from now on stores them.
+# Plain ADD/DROP COLUMN on purpose: a batch (copy and rename) rebuild of
+# lessons would drop the search triggers of 0007.
+
+def upgrade():
+    op.add_column("lessons", sa.Column("segments", sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("lessons", "segments")
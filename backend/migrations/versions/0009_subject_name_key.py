@@ -0,0 +1,51 @@
+"""normalized subject name with a unique index over live subjects
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def name_key(name):
+    # Same as models.subject_name_key at the time of this migration
+    return " ".join((name or "").split()).casefold()
+
+
+def upgrade():
+    op.add_column("subjects", sa.Column("name_key", sa.String(100), nullable=True))
+
+    # Live subjects whose name only differs in case/spacing from an older live
+    # subject keep name_key NULL: the unique index allows it, and name lookups
+    # already resolved to the older one
+    conn = op.get_bind()
+    taken = set()
+    keys = []
+    for subject_id, name, is_deleted in conn.execute(
+        sa.text("SELECT id, name, is_deleted FROM subjects ORDER BY id")
+    ):
+        key = name_key(name)
+        if not is_deleted:
+            if key in taken:
+                continue
+            taken.add(key)
+        keys.append({"id": subject_id, "name_key": key})
+    if keys:
+        conn.execute(sa.text("UPDATE subjects SET name_key = :name_key WHERE id = :id"), keys)
+
+    op.create_index(
+        "ux_subjects_name_key_live", "subjects", ["name_key"], unique=True,
+        sqlite_where=sa.text("is_deleted = 0"), postgresql_where=sa.text("is_deleted = false")
+    )
+
+
+def downgrade():
+    op.drop_index("ux_subjects_name_key_live", table_name="subjects")
+    op.drop_column("subjects", "name_key")
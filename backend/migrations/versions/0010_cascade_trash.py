@@ -0,0 +1,43 @@
+"""is_deleted on lessons and quizzes (subject trash cascades), trash purge index
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+# Plain ADD/DROP COLUMN on purpose: a batch (copy and rename) rebuild of
+# lessons would drop the search triggers of 0007.
+
+def upgrade():
+    for table in ("lessons", "quizzes"):
+        op.add_column(table, sa.Column("is_deleted", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    # Lessons and quizzes of subjects already in the trash go to the trash too
+    op.execute(sa.text(
+        "UPDATE lessons SET is_deleted = :yes "
+        "WHERE topic_id IN (SELECT id FROM subjects WHERE is_deleted = :yes)"
+    ).bindparams(yes=True))
+    op.execute(sa.text(
+        "UPDATE quizzes SET is_deleted = :yes "
+        "WHERE lesson_id IN (SELECT id FROM lessons WHERE is_deleted = :yes)"
+    ).bindparams(yes=True))
+
+    op.create_index(
+        "ix_subjects_trash_deleted_at", "subjects", ["deleted_at"],
+        sqlite_where=sa.text("is_deleted = 1"), postgresql_where=sa.text("is_deleted = true")
+    )
+
+
+def downgrade():
+    op.drop_index("ix_subjects_trash_deleted_at", table_name="subjects")
+    for table in ("quizzes", "lessons"):
+        op.drop_column(table, "is_deleted")
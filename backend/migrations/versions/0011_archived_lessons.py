@@ -0,0 +1,70 @@
+"""archived result per (student, lesson), so retaken lessons are counted once
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+"""
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "student_progress_archived_lessons",
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), primary_key=True),
+        sa.Column("completed", sa.Boolean(), nullable=False),
+        sa.Column("percentage", sa.Integer(), nullable=False),
+    )
+
+    # Latest archived row of each (student, lesson), oldest archive first
+    conn = op.get_bind()
+    latest = {}
+    for student_id, data in conn.execute(sa.text(
+        "SELECT student_id, data FROM student_progress_archive ORDER BY id"
+    )):
+        for row in json.loads(zlib.decompress(data)):
+            completed = row["total_questions"] > 0
+            latest[(student_id, row["lesson_id"])] = (completed, (row["percentage"] or 0) if completed else 0)
+    if not latest:
+        return
+
+    conn.execute(
+        sa.text(
+            "INSERT INTO student_progress_archived_lessons (student_id, lesson_id, completed, percentage) "
+            "VALUES (:student_id, :lesson_id, :completed, :percentage)"
+        ),
+        [
+            {"student_id": student_id, "lesson_id": lesson_id, "completed": completed, "percentage": percentage}
+            for (student_id, lesson_id), (completed, percentage) in latest.items()
+        ]
+    )
+
+    # Summaries counted a lesson archived twice twice - recount from the latest rows
+    totals = {}
+    for (student_id, _), (completed, percentage) in latest.items():
+        started, completed_count, percentage_sum = totals.get(student_id, (0, 0, 0))
+        totals[student_id] = (started + 1, completed_count + completed, percentage_sum + percentage)
+    conn.execute(
+        sa.text(
+            "UPDATE student_progress_summary SET lessons_started = :started, "
+            "lessons_completed = :completed, percentage_sum = :percentage_sum WHERE student_id = :student_id"
+        ),
+        [
+            {"student_id": student_id, "started": started, "completed": completed, "percentage_sum": percentage_sum}
+            for student_id, (started, completed, percentage_sum) in totals.items()
+        ]
+    )
+
+
+def downgrade():
+    op.drop_table("student_progress_archived_lessons")
@@ -0,0 +1,23 @@
+"""index for the trash purge on archived lesson results
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_student_progress_archived_lessons_lesson_id", "student_progress_archived_lessons", ["lesson_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_student_progress_archived_lessons_lesson_id", table_name="student_progress_archived_lessons")
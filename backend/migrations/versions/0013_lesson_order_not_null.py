@@ -0,0 +1,42 @@
+"""lessons.order is never NULL (the lesson list's keyset cursor pages on it)
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+# SQLite can only add NOT NULL by rebuilding the table, and a batch (copy and
+# rename) rebuild of lessons would drop the search triggers of 0007 - so there
+# triggers reject NULL instead.
+TRIGGERS = [
+    'CREATE TRIGGER lessons_order_insert BEFORE INSERT ON lessons WHEN new."order" IS NULL BEGIN '
+    "SELECT RAISE(ABORT, 'NOT NULL constraint failed: lessons.order'); END",
+    'CREATE TRIGGER lessons_order_update BEFORE UPDATE OF "order" ON lessons WHEN new."order" IS NULL BEGIN '
+    "SELECT RAISE(ABORT, 'NOT NULL constraint failed: lessons.order'); END",
+]
+
+
+def upgrade():
+    op.execute(sa.text('UPDATE lessons SET "order" = 0 WHERE "order" IS NULL'))
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in TRIGGERS:
+            op.execute(trigger)
+    else:
+        op.alter_column("lessons", "order", existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS lessons_order_update")
+        op.execute("DROP TRIGGER IF EXISTS lessons_order_insert")
+    else:
+        op.alter_column("lessons", "order", existing_type=sa.Integer(), nullable=True)
@@ -7,6 +7,7 @@ import threading
 import requests
 import speech_recognition as sr
 import json
+import re
 import sqlite3
 from PySide6.QtCore import Qt
 import pygame 
@@ -21,6 +22,8 @@ from PySide6.QtCore import Qt, Signal, QObject, QTimer
 from PySide6.QtGui import QTextCursor, QTextCharFormat, QColor
 
 API_URL = "http://localhost:8001"
+# School to log in to when the backend hosts several schools (empty = default school)
+SCHOOL = os.getenv("AUDIO_LEARNING_SCHOOL", "")
 DB_FILE = "offline_lessons.db"
 
 # ================= QMETA AI CONFIGURATION =================
@@ -50,10 +53,22 @@ class QmetaVoiceProcessor:
             "answer": None,
             "speed_change": None,
             "subject_number": None,
+            "query": None,
             "confidence": "medium",
             "original_command": command
         }
         
+        # Lesson search - "find lesson about volcanoes", "search for photosynthesis"
+        search_match = re.search(
+            r'\b(?:find|search(?:\s+for)?|look\s+for)\s+(?:(?:a|the|me)\s+)*(?:lessons?\s+)?(?:about\s+|on\s+)?(.+)',
+            command_lower
+        )
+        if search_match and search_match.group(1).strip():
+            intent["query"] = search_match.group(1).strip()
+            intent["intent"] = "search_lessons"
+            intent["confidence"] = "high"
+            return intent
+        
         # Subject detection - IMPROVED
         subjects = ["math", "mathematics", "science", "history", "english", "computer", "physics", "chemistry", "biology"]
         for subj in subjects:
@@ -64,7 +79,6 @@ class QmetaVoiceProcessor:
                 return intent
         
         # Subject number detection
-        import re
         subject_num_match = re.search(r'(?:subject\s+)?(\d+)', command_lower)
         if subject_num_match and ("select" in command_lower or "choose" in command_lower or "subject" in command_lower):
             intent["subject_number"] = int(subject_num_match.group(1))
@@ -134,6 +148,52 @@ class QmetaVoiceProcessor:
         return intent
 
 
+# ================= LESSON SEGMENTS =================
+# Same rules as the server's backend/app/segments.py, so segment indices from
+# the server (resume points) mean the same sentence in a lesson split here
+SEGMENT_MAX_CHARS = 400
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s+[A-Z0-9\"'“‘(\[])")
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "mt", "no", "vs", "fig"}
+WORD_BEFORE = re.compile(r"(\w+)\.$")
+
+
+def split_segments(text):
+    """Sentences of a lesson in reading order, as the server splits them"""
+    spans = []
+    start = 0
+    for match in PARAGRAPH_BREAK.finditer(text + "\n\n"):
+        end = min(match.start(), len(text))
+        for sentence in SENTENCE_END.finditer(text, start, end):
+            word = WORD_BEFORE.search(text, max(start, sentence.start() - 10), sentence.end())
+            if word and word.group(1).lower() in ABBREVIATIONS:
+                continue
+            spans.extend(_trimmed_spans(text, start, sentence.end()))
+            start = sentence.end()
+        spans.extend(_trimmed_spans(text, start, end))
+        start = match.end()
+    return [text[start:end] for start, end in spans]
+
+
+def _trimmed_spans(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    spans = []
+    while end - start > SEGMENT_MAX_CHARS:
+        cut = text.rfind(" ", start + 1, start + SEGMENT_MAX_CHARS)
+        if cut == -1:
+            cut = start + SEGMENT_MAX_CHARS
+        spans.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+
 # ================= OFFLINE DATABASE =================
 class OfflineStorage:
     def __init__(self):
@@ -187,29 +247,82 @@ class OfflineStorage:
             )
         """)
         
+        # Lesson segments as the server sent them (text by segment index)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lesson_segments (
+                lesson_id INTEGER,
+                segment_index INTEGER,
+                text TEXT,
+                PRIMARY KEY (lesson_id, segment_index)
+            )
+        """)
+        
+        # Delta sync state (cursor and school of the last /sync/changes)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        
+        # Lesson order within a subject (older offline databases lack it)
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(lessons)")]
+        if "lesson_order" not in columns:
+            cursor.execute("ALTER TABLE lessons ADD COLUMN lesson_order INTEGER DEFAULT 0")
+        # Number of segments of the lesson on the server, NULL until streamed once
+        if "segment_count" not in columns:
+            cursor.execute("ALTER TABLE lessons ADD COLUMN segment_count INTEGER")
+        
         self.conn.commit()
     
-    def save_subject(self, subject_id, name, description):
-        cursor = self.conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO subjects (id, name, description) VALUES (?, ?, ?)",
-                      (subject_id, name, description))
-        self.conn.commit()
-    
-    def save_lesson(self, lesson_id, subject_id, title, content):
-        cursor = self.conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO lessons (id, subject_id, title, content) VALUES (?, ?, ?, ?)",
-                      (lesson_id, subject_id, title, content))
-        self.conn.commit()
+    def get_sync_cursor(self, school):
+        """Cursor of the last sync, or None if there was none for this school"""
+        rows = dict(self.conn.execute("SELECT key, value FROM sync_state").fetchall())
+        if rows.get("school", "") != school:
+            return None
+        return rows.get("cursor")
     
-    def save_quiz(self, quiz):
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO quizzes 
-            (id, lesson_id, question, option_a, option_b, option_c, option_d, correct_answer)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (quiz['id'], quiz['lesson_id'], quiz['question'], quiz['option_a'],
-              quiz['option_b'], quiz['option_c'], quiz['option_d'], quiz['correct_answer']))
-        self.conn.commit()
+    def apply_changes(self, changes, school, full=False):
+        """
+        Apply one /sync/changes answer in a single transaction:
+        deletions first, then upserts, then the new cursor
+        """
+        with self.conn:
+            cursor = self.conn.cursor()
+            if full or changes.get("reset"):
+                cursor.execute("DELETE FROM quizzes")
+                cursor.execute("DELETE FROM lesson_segments")
+                cursor.execute("DELETE FROM lessons")
+                cursor.execute("DELETE FROM subjects")
+            
+            deleted = changes.get("deleted", {})
+            cursor.executemany("DELETE FROM subjects WHERE id = ?", [(i,) for i in deleted.get("subjects", [])])
+            cursor.executemany("DELETE FROM quizzes WHERE lesson_id = ?", [(i,) for i in deleted.get("lessons", [])])
+            cursor.executemany("DELETE FROM lessons WHERE id = ?", [(i,) for i in deleted.get("lessons", [])])
+            cursor.executemany("DELETE FROM quizzes WHERE id = ?", [(i,) for i in deleted.get("quizzes", [])])
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO subjects (id, name, description) VALUES (?, ?, ?)",
+                [(s['id'], s['name'], s.get('description', '')) for s in changes.get("subjects", [])]
+            )
+            # Changed lessons are split again by the server (REPLACE clears segment_count too)
+            cursor.executemany(
+                "DELETE FROM lesson_segments WHERE lesson_id = ?",
+                [(i,) for i in deleted.get("lessons", [])] + [(l['id'],) for l in changes.get("lessons", [])]
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO lessons (id, subject_id, title, content, lesson_order) VALUES (?, ?, ?, ?, ?)",
+                [(l['id'], l['topic_id'], l['title'], l['content'], l.get('order', 0)) for l in changes.get("lessons", [])]
+            )
+            cursor.executemany("""
+                INSERT OR REPLACE INTO quizzes
+                (id, lesson_id, question, option_a, option_b, option_c, option_d, correct_answer)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(q['id'], q['lesson_id'], q['question'], q['option_a'], q['option_b'],
+                   q['option_c'], q['option_d'], q['correct_answer']) for q in changes.get("quizzes", [])])
+            
+            cursor.executemany("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                               [("cursor", changes["cursor"]), ("school", school)])
     
     def get_subjects(self):
         cursor = self.conn.cursor()
@@ -218,9 +331,50 @@ class OfflineStorage:
     
     def get_lessons_by_subject(self, subject_id):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT id, title, content FROM lessons WHERE subject_id = ?", (subject_id,))
+        cursor.execute("SELECT id, title, content FROM lessons WHERE subject_id = ? ORDER BY lesson_order, id",
+                       (subject_id,))
         return [{"id": row[0], "title": row[1], "content": row[2]} for row in cursor.fetchall()]
     
+    def get_lesson(self, lesson_id):
+        row = self.conn.execute("SELECT id, title, content FROM lessons WHERE id = ?", (lesson_id,)).fetchone()
+        return {"id": row[0], "title": row[1], "content": row[2]} if row else None
+    
+    def save_segments(self, lesson_id, segments, total):
+        """Keep streamed segments ((index, text) pairs) and the lesson's segment count"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO lesson_segments (lesson_id, segment_index, text) VALUES (?, ?, ?)",
+                [(lesson_id, index, text) for index, text in segments]
+            )
+            self.conn.execute("UPDATE lessons SET segment_count = ? WHERE id = ?", (total, lesson_id))
+    
+    def get_segments(self, lesson_id):
+        """The server's segments of a lesson, None unless every one of them is stored"""
+        row = self.conn.execute("SELECT segment_count FROM lessons WHERE id = ?", (lesson_id,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        texts = [text for (text,) in self.conn.execute(
+            "SELECT text FROM lesson_segments WHERE lesson_id = ? ORDER BY segment_index", (lesson_id,)
+        )]
+        return texts if len(texts) == row[0] else None
+    
+    def search_lessons(self, query, limit=5):
+        """Offline search - lessons whose title or content has every word of the query"""
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        where = " AND ".join(["(lower(l.title) LIKE ? OR lower(l.content) LIKE ?)"] * len(words))
+        params = [f"%{word}%" for word in words for _ in range(2)]
+        cursor = self.conn.execute(f"""
+            SELECT l.id, l.subject_id, s.name, l.title, substr(l.content, 1, 120)
+            FROM lessons l JOIN subjects s ON s.id = l.subject_id
+            WHERE {where} ORDER BY l.id LIMIT ?
+        """, params + [limit])
+        return [
+            {"id": row[0], "topic_id": row[1], "subject_name": row[2], "title": row[3], "snippet": row[4]}
+            for row in cursor.fetchall()
+        ]
+    
     def get_quizzes(self, lesson_id):
         cursor = self.conn.cursor()
         cursor.execute("""
@@ -243,12 +397,18 @@ class OfflineStorage:
                       (lesson_id, score, total, percentage))
         self.conn.commit()
         return cursor.lastrowid
+    
+    def mark_progress_synced(self, progress_id):
+        cursor = self.conn.cursor()
+        cursor.execute("UPDATE progress SET synced = 1 WHERE id = ?", (progress_id,))
+        self.conn.commit()
 
 
 # ================= AUDIO ENGINE =================
 class AudioPlayer(QObject):
     word_highlight = Signal(str)
     playback_finished = Signal()
+    segment_started = Signal(int)  # index of the lesson segment now playing
     
     def __init__(self):
         super().__init__()
@@ -265,13 +425,16 @@ class AudioPlayer(QObject):
         pygame.mixer.init()
         
         while True:
-            text = self.queue.get()
-            if text is None:
+            item = self.queue.get()
+            if item is None:
                 break
+            text, segment = item
             
             self.stopped = False
             self.paused = False
             self.last_spoken = text
+            if segment is not None:
+                self.segment_started.emit(segment)
             
             try:
                 filename = f"tts_{uuid.uuid4()}.mp3"
@@ -306,8 +469,9 @@ class AudioPlayer(QObject):
             except Exception as e:
                 print(f"Audio error: {e}")
     
-    def speak(self, text):
-        self.queue.put(text)
+    def speak(self, text, segment=None):
+        """Queue text to be spoken; segment is the lesson segment index it belongs to"""
+        self.queue.put((text, segment))
     
     def pause(self):
         self.paused = True
@@ -316,6 +480,9 @@ class AudioPlayer(QObject):
         self.paused = False
     
     def stop(self):
+        """Stop speaking and drop whatever is still queued (e.g. the rest of a lesson)"""
+        with self.queue.mutex:
+            self.queue.queue.clear()
         self.stopped = True
     
     def set_speed(self, speed):
@@ -450,6 +617,7 @@ class LoginScreen(QWidget):
             response = requests.post(
                 f"{API_URL}/auth/login",
                 json={"username": username, "password": password},
+                headers={"X-Tenant": SCHOOL} if SCHOOL else {},
                 timeout=10
             )
             
@@ -498,6 +666,9 @@ class StudentApp(QMainWindow):
         self.selected_subject_id = None
         self.selected_subject_name = None
         self.current_lesson = None
+        self.segment_index = 0  # lesson segment being spoken, to resume from
+        self.lesson_stopped = False
+        self.segment_reader = 0  # bumped per play_lesson, older segment readers stop
         self.current_quiz = []
         self.quiz_index = 0
         self.score = 0
@@ -509,16 +680,21 @@ class StudentApp(QMainWindow):
         self.app_state = "initial"
         
         self.setup_ui()
+        self.audio.segment_started.connect(self.on_segment_started)
         
         # AUTO-LOAD ON LAUNCH
         QTimer.singleShot(1000, self.auto_load_on_launch)
     
     def get_headers(self):
         """Return authorization headers for API requests"""
-        return {
+        headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         }
+        if SCHOOL:
+            # Proxies keep catalog copies per X-Tenant, not per token
+            headers["X-Tenant"] = SCHOOL
+        return headers
     
     def auto_load_on_launch(self):
         """Automatically load subjects and lessons on app launch"""
@@ -685,26 +861,9 @@ class StudentApp(QMainWindow):
             QApplication.processEvents()
             
             if self.online_mode:
-                # Load subjects (no auth required)
-                res = requests.get(f"{API_URL}/lessons/subjects", timeout=10)
-                subjects = res.json()
-                
-                for subj in subjects:
-                    self.storage.save_subject(subj['id'], subj['name'], subj.get('description', ''))
-                
-                # Load ALL lessons
-                lessons_res = requests.get(f"{API_URL}/lessons/", timeout=10)
-                all_lessons = lessons_res.json()
-                
-                for lesson in all_lessons:
-                    self.storage.save_lesson(
-                        lesson['id'],
-                        lesson['topic_id'],
-                        lesson['title'],
-                        lesson['content']
-                    )
-            else:
-                subjects = self.storage.get_subjects()
+                self.sync_catalog()
+            
+            subjects = self.storage.get_subjects()
             
             self.subjects_list = subjects
             self.subject_list.clear()
@@ -743,14 +902,8 @@ class StudentApp(QMainWindow):
         
         try:
             if self.online_mode:
-                res = requests.get(f"{API_URL}/lessons/", timeout=10)
-                all_lessons = res.json()
-                lessons = [l for l in all_lessons if l['topic_id'] == subject_id]
-                
-                for lesson in lessons:
-                    self.storage.save_lesson(lesson['id'], subject_id, lesson['title'], lesson['content'])
-            else:
-                lessons = self.storage.get_lessons_by_subject(subject_id)
+                self.sync_catalog()
+            lessons = self.storage.get_lessons_by_subject(subject_id)
             
             if lessons:
                 self.current_lesson = lessons[0]
@@ -767,6 +920,27 @@ class StudentApp(QMainWindow):
             self.status.setText(f"❌ Error: {str(e)}")
             self.audio.speak("Error loading lessons. Please try again.")
     
+    def sync_catalog(self):
+        """
+        Bring the offline store up to date with one /sync/changes request
+        Only what changed since the last sync is downloaded; when the server
+        can't be reached the app keeps going with the offline copy
+        """
+        cursor = self.storage.get_sync_cursor(SCHOOL)
+        try:
+            res = requests.get(
+                f"{API_URL}/sync/changes",
+                params={"since": cursor} if cursor else None,
+                headers=self.get_headers(),
+                timeout=30
+            )
+            res.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Sync failed, using offline copy: {e}")
+            return False
+        self.storage.apply_changes(res.json(), SCHOOL, full=cursor is None)
+        return True
+    
     def select_subject_by_name(self, subject_name):
         """Select subject by name from voice"""
         subject_name_lower = subject_name.lower()
@@ -778,6 +952,45 @@ class StudentApp(QMainWindow):
         
         self.audio.speak(f"Subject {subject_name} not found.")
     
+    def search_lessons(self, query):
+        """Find a lesson by topic ("find lesson about ...") and play the best match"""
+        self.status.setText(f"🔍 Searching lessons about {query}...")
+        QApplication.processEvents()
+        
+        hits = None
+        if self.online_mode:
+            # The lesson must be in the offline store to play it
+            self.sync_catalog()
+            try:
+                res = requests.get(
+                    f"{API_URL}/lessons/search",
+                    params={"q": query, "limit": 5},
+                    headers=self.get_headers(),
+                    timeout=10
+                )
+                res.raise_for_status()
+                hits = res.json()
+            except requests.exceptions.RequestException as e:
+                print(f"Search failed, searching offline copy: {e}")
+        if hits is None:
+            hits = self.storage.search_lessons(query)
+        
+        lesson = self.storage.get_lesson(hits[0]['id']) if hits else None
+        if not lesson:
+            self.status.setText(f"❌ No lessons about {query}")
+            self.audio.speak(f"No lessons found about {query}. Please try other words.")
+            return
+        
+        results = "".join(
+            f"<p><b>{hit['title']}</b> ({hit['subject_name']})<br>{hit['snippet']}</p>" for hit in hits
+        )
+        self.display.setHtml(f"<div style='padding: 10px;'><h2>🔍 {query}</h2>{results}</div>")
+        self.current_lesson = lesson
+        self.status.setText(f"✅ {len(hits)} lessons about {query}")
+        
+        self.audio.speak(f"Found {lesson['title']}, in {hits[0]['subject_name']}. Starting lesson.")
+        QTimer.singleShot(2000, self.play_lesson)
+    
     def select_subject_by_number(self, number):
         """Select subject by number from voice"""
         if 1 <= number <= len(self.subjects_list):
@@ -786,13 +999,15 @@ class StudentApp(QMainWindow):
         else:
             self.audio.speak(f"Subject number {number} not found.")
     
-    def play_lesson(self):
-        """Read lesson aloud"""
+    def play_lesson(self, start=0):
+        """Read lesson aloud sentence by sentence, from segment index start"""
         if not self.current_lesson:
             self.audio.speak("Please select a subject first.")
             return
         
         self.app_state = "lesson_playing"
+        self.segment_index = start
+        self.lesson_stopped = False
         
         title = self.current_lesson['title']
         content = self.current_lesson['content']
@@ -808,13 +1023,77 @@ class StudentApp(QMainWindow):
         self.status.setText("🔊 Playing lesson...")
         QApplication.processEvents()
         
-        self.audio.speak(f"Lesson title: {title}.")
-        self.audio.speak(content)
+        if start:
+            self.audio.speak(f"Continuing {title}.")
+        else:
+            self.audio.speak(f"Lesson title: {title}.")
+        self.speak_segments(start)
         
         prompt = "Lesson complete. Say start quiz to take the quiz, or say repeat lesson to listen again."
         QTimer.singleShot(len(content) * 50, lambda: self.audio.speak(prompt))
         QTimer.singleShot(len(content) * 50, lambda: self.status.setText("✅ Lesson complete! Say 'start quiz' or 'repeat lesson'"))
     
+    def speak_segments(self, start):
+        """
+        Queue the lesson's sentences for speech as they arrive from the
+        segment stream, so the first one plays before the rest is downloaded
+        The stream is read on a worker thread, so the window stays responsive
+        """
+        self.segment_reader += 1
+        threading.Thread(
+            target=self._read_segments,
+            args=(self.current_lesson, start, self.segment_reader),
+            daemon=True
+        ).start()
+    
+    def _read_segments(self, lesson, start, reader):
+        """
+        Worker thread of speak_segments - streamed segments are kept in the
+        offline store; offline (or if the stream breaks) playback goes on from
+        there, or from the lesson split the way the server splits it
+        """
+        def current():
+            return reader == self.segment_reader and not self.lesson_stopped
+        
+        if self.online_mode:
+            received = []
+            total = None
+            try:
+                with requests.get(
+                    f"{API_URL}/lessons/{lesson['id']}/segments/stream",
+                    params={"start": start},
+                    headers=self.get_headers(),
+                    stream=True,
+                    timeout=10
+                ) as res:
+                    res.raise_for_status()
+                    total = int(res.headers.get("X-Segment-Count", 0))
+                    for line in res.iter_lines():
+                        if not current():
+                            return
+                        if line:
+                            segment = json.loads(line)
+                            received.append((segment['index'], segment['text']))
+                            self.audio.speak(segment['text'], segment['index'])
+                            start = segment['index'] + 1
+                return
+            except requests.exceptions.RequestException as e:
+                print(f"Segment stream failed, using offline copy: {e}")
+            finally:
+                if total is not None:
+                    self.storage.save_segments(lesson['id'], received, total)
+        
+        sentences = self.storage.get_segments(lesson['id']) or split_segments(lesson['content'])
+        for index, sentence in enumerate(sentences[start:], start):
+            if not current():
+                return
+            self.audio.speak(sentence, index)
+    
+    def on_segment_started(self, index):
+        self.segment_index = index
+        if self.app_state == "lesson_playing":
+            self.status.setText(f"🔊 Playing lesson... sentence {index + 1}")
+    
     def start_quiz(self):
         """Start quiz"""
         if not self.current_lesson:
@@ -826,15 +1105,8 @@ class StudentApp(QMainWindow):
             self.status.setText("🔄 Loading quiz...")
             QApplication.processEvents()
             
-            if self.online_mode:
-                res = requests.get(f"{API_URL}/quizzes/", timeout=10)
-                all_quizzes = res.json()
-                self.current_quiz = [q for q in all_quizzes if q['lesson_id'] == lesson_id]
-                
-                for quiz in self.current_quiz:
-                    self.storage.save_quiz(quiz)
-            else:
-                self.current_quiz = self.storage.get_quizzes(lesson_id)
+            # Quizzes arrive with the catalog sync
+            self.current_quiz = self.storage.get_quizzes(lesson_id)
             
             if self.current_quiz:
                 self.quiz_index = 0
@@ -937,8 +1209,21 @@ class StudentApp(QMainWindow):
         self.audio.speak(result)
         
         try:
-            self.storage.save_progress(self.current_lesson['id'], self.score, total)
+            progress_id = self.storage.save_progress(self.current_lesson['id'], self.score, total)
         except:
+            return
+        
+        # Send the result to the server too; if offline it stays unsynced locally
+        try:
+            res = requests.post(
+                f"{API_URL}/progress/submit",
+                json={"lesson_id": self.current_lesson['id'], "score": self.score, "total_questions": total},
+                headers=self.get_headers(),
+                timeout=10
+            )
+            if res.status_code == 201:
+                self.storage.mark_progress_synced(progress_id)
+        except requests.exceptions.RequestException:
             pass
     
     def toggle_voice_navigation(self, state):
@@ -1032,6 +1317,10 @@ class StudentApp(QMainWindow):
                     elif intent.get('subject'):
                         self.select_subject_by_name(intent['subject'])
                 
+                elif command == "search_lessons":
+                    if intent.get('query'):
+                        self.search_lessons(intent['query'])
+                
                 elif command == "start_lesson":
                     self.play_lesson()
                 
@@ -1060,10 +1349,15 @@ class StudentApp(QMainWindow):
                     self.audio.pause()
                 
                 elif command == "resume_audio":
-                    self.audio.resume()
+                    if self.lesson_stopped and self.app_state == "lesson_playing":
+                        # Pick the lesson up again at the sentence it was stopped on
+                        self.play_lesson(self.segment_index)
+                    else:
+                        self.audio.resume()
                 
                 elif command == "stop_audio":
                     self.audio.stop()
+                    self.lesson_stopped = self.app_state == "lesson_playing"
                 
                 elif command == "increase_speed":
                     current = self.speed_slider.value()